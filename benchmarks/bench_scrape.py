@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# Google My Business Scraper - Benchmark de extremo a extremo
+#
+# Arranca benchmarks/mock_places.py en otro proceso (para que su memoria y
+# CPU no cuenten) y ejecuta en este proceso un trabajo completo de
+# ScraperEngine sin GUI: búsqueda, detalles, imágenes, emails y guardado.
+# Informa de negocios/s, latencias p50/p99 por endpoint, CPU y pico de RSS.
+# Con --min-places-per-s o --max-rss-mb devuelve código 1 si no se cumple
+# el umbral, para detectar regresiones.
+#
+# Uso:
+#   python benchmarks/bench_scrape.py
+#   python benchmarks/bench_scrape.py --keywords 20 --workers 4 --latency-ms 80 --error-rate 0.02
+#   python benchmarks/bench_scrape.py --fields title,phone,place_id --json
+#   python benchmarks/bench_scrape.py --backend new   # Places API (New) del servidor simulado
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from scraper_core import DEFAULT_FIELDS, ScrapeOptions, ScraperEngine  # noqa: E402
+from scraper_places_new import BACKENDS, BACKEND_LEGACY, BACKEND_NEW, MAX_PAGE_SIZE  # noqa: E402
+
+MOCK_API_KEY = 'MOCK-BENCHMARK-KEY'
+
+def peak_rss_mb():
+    """Pico de memoria residente del proceso (None si no se puede medir)"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KB y macOS en bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def start_mock(args):
+    """Lanza el servidor simulado y devuelve (proceso, URL de la API)"""
+    cmd = [sys.executable, os.path.join(BENCH_DIR, 'mock_places.py'), '--port', '0',
+           '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms),
+           '--error-rate', str(args.error_rate), '--results-per-query', str(args.results_per_query),
+           '--token-delay', str(args.token_delay), '--website-rate', str(args.website_rate),
+           '--email-rate', str(args.email_rate), '--seed', str(args.seed)]
+    if args.site_latency_ms is not None:
+        cmd += ['--site-latency-ms', str(args.site_latency_ms)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    line = proc.stdout.readline().strip()
+    if not line.startswith('API_URL='):
+        proc.kill()
+        raise RuntimeError("No se pudo arrancar el servidor simulado")
+    return proc, line[len('API_URL='):]
+
+def mock_stats(api_url):
+    root = api_url.split('/maps/api/place')[0]
+    try:
+        with urllib.request.urlopen(root + '/__stats', timeout=5) as response:
+            return json.loads(response.read())
+    except (OSError, ValueError):
+        return {}
+
+def run_job(args, api_url, data_dir):
+    """Ejecuta el trabajo de scraping y devuelve (RunSummary, métricas, segundos, CPU)"""
+    fields = frozenset(f.strip() for f in args.fields.split(',') if f.strip())
+    options = ScrapeOptions(
+        fields=fields,
+        min_delay=args.delay,
+        max_delay=args.delay,
+        batch_size=max(1, args.batch_size),
+        batch_delay=0.0,
+        workers=args.workers,
+        data_dir=data_dir,
+        search_cache_ttl=0,  # Sin cache: cada ejecución busca de verdad
+        search_qps=args.search_qps,
+        backend=args.backend,
+        page_size=args.page_size,
+        # El servidor simulado sirve Places API (New) bajo /v1
+        api_base_url=api_url.replace('/maps/api/place', '/v1') if args.backend == BACKEND_NEW else api_url,
+        profile=args.profile
+    )
+    log = print if args.verbose else (lambda message: None)
+    engine = ScraperEngine(MOCK_API_KEY, options, on_log=log)
+    keywords = [f"benchmark {i + 1}" for i in range(args.keywords)]
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    summary = engine.run(keywords, 'benchmark.json', 'json')
+    elapsed = time.perf_counter() - start
+    snapshot = engine.metrics.snapshot()
+    if engine.profiler:
+        snapshot['phases'] = engine.profiler.snapshot()
+    return summary, snapshot, elapsed, time.process_time() - cpu_start
+
+def build_report(args, summary, snapshot, elapsed, cpu_s, server_requests):
+    endpoints = {}
+    for name, stats in snapshot['endpoints'].items():
+        endpoints[name] = {
+            'calls': stats['calls'],
+            'errors': sum(stats['errors'].values()),
+            'p50_ms': stats['latency_ms']['p50'],
+            'p99_ms': stats['latency_ms']['p99']
+        }
+    return {
+        'config': {
+            'keywords': args.keywords, 'results_per_query': args.results_per_query,
+            'workers': args.workers, 'fields': args.fields, 'backend': args.backend, 'latency_ms': args.latency_ms,
+            'error_rate': args.error_rate
+        },
+        'found': summary.found,
+        'processed': summary.processed,
+        'elapsed_s': round(elapsed, 2),
+        'places_per_s': round(summary.processed / elapsed, 2) if elapsed > 0 else None,
+        'cpu_s': round(cpu_s, 2),
+        'peak_rss_mb': peak_rss_mb(),
+        'endpoints': endpoints,
+        'stages': snapshot['stages'],
+        'phases': snapshot.get('phases'),
+        'server_requests': server_requests
+    }
+
+def print_report(report):
+    print(f"🏁 {report['processed']} negocios de {report['found']} resultados "
+          f"en {report['elapsed_s']:.2f} s → {report['places_per_s']} negocios/s")
+    rss = f"{report['peak_rss_mb']} MB" if report['peak_rss_mb'] is not None else 'no disponible'
+    print(f"   CPU: {report['cpu_s']:.2f} s | Pico RSS: {rss}")
+    for name, stats in report['endpoints'].items():
+        print(f"   {name:12} {stats['calls']:6} llamadas {stats['errors']:4} errores | "
+              f"p50 {stats['p50_ms'] or 0:7.1f} ms | p99 {stats['p99_ms'] or 0:7.1f} ms")
+    for name, stats in (report['phases'] or {}).items():
+        print(f"   fase {name:8} {stats['count']:6}× | real {stats['wall_s']:8.2f} s | CPU {stats['cpu_s']:7.2f} s")
+    if report['server_requests']:
+        served = ', '.join(f"{k}={v}" for k, v in sorted(report['server_requests'].items()))
+        print(f"   Peticiones servidas: {served}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de scraping contra una API simulada')
+    parser.add_argument('--keywords', type=int, default=5, help='Palabras clave a buscar (por defecto: 5)')
+    parser.add_argument('--results-per-query', type=int, default=60, help='Resultados por keyword (máx 60)')
+    parser.add_argument('--fields', default=','.join(DEFAULT_FIELDS),
+                        help='Campos a extraer, separados por comas (por defecto: todos)')
+    parser.add_argument('--backend', choices=BACKENDS, default=BACKEND_LEGACY,
+                        help='API de Places simulada: legacy o new (por defecto: legacy)')
+    parser.add_argument('--page-size', type=int, default=MAX_PAGE_SIZE,
+                        help=f'Con --backend new: resultados por página (por defecto: {MAX_PAGE_SIZE})')
+    parser.add_argument('-w', '--workers', type=int, default=4, help='Negocios en paralelo (por defecto: 4)')
+    parser.add_argument('--delay', type=float, default=0.0, help='Delay entre negocios (por defecto: 0)')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Tamaño de lote (por defecto: 1000)')
+    parser.add_argument('--search-qps', type=float, default=50.0, help='Ritmo máximo de búsqueda')
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='Latencia media de la API simulada')
+    parser.add_argument('--jitter-ms', type=float, default=20.0, help='Variación (±) de la latencia')
+    parser.add_argument('--site-latency-ms', type=float, default=None, help='Latencia de los sitios web')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fracción de respuestas HTTP 500')
+    parser.add_argument('--token-delay', type=float, default=2.0, help='Activación del next_page_token (s)')
+    parser.add_argument('--website-rate', type=float, default=0.7, help='Fracción de negocios con web')
+    parser.add_argument('--email-rate', type=float, default=0.5, help='Fracción de webs con email')
+    parser.add_argument('--seed', type=int, default=1, help='Semilla de los datos simulados')
+    parser.add_argument('--min-places-per-s', type=float, help='Umbral mínimo de negocios/s')
+    parser.add_argument('--max-rss-mb', type=float, help='Umbral máximo de pico de RSS')
+    parser.add_argument('--profile', action='store_true',
+                        help='Perfilar por fases (el resumen se muestra con --verbose)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Mostrar el registro del motor')
+    parser.add_argument('--json', action='store_true', help='Salida en JSON')
+    args = parser.parse_args(argv)
+
+    unknown = {f.strip() for f in args.fields.split(',') if f.strip()} - set(DEFAULT_FIELDS)
+    if unknown:
+        parser.error(f"Campos desconocidos: {', '.join(sorted(unknown))}")
+
+    proc, api_url = start_mock(args)
+    try:
+        with tempfile.TemporaryDirectory(prefix='gmb-bench-') as data_dir:
+            summary, snapshot, elapsed, cpu_s = run_job(args, api_url, data_dir)
+        server_requests = mock_stats(api_url)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=5)
+
+    report = build_report(args, summary, snapshot, elapsed, cpu_s, server_requests)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    # Umbrales de regresión
+    failures = []
+    if args.min_places_per_s is not None and (report['places_per_s'] or 0) < args.min_places_per_s:
+        failures.append(f"{report['places_per_s']} negocios/s < {args.min_places_per_s}")
+    if args.max_rss_mb is not None and report['peak_rss_mb'] is not None \
+            and report['peak_rss_mb'] > args.max_rss_mb:
+        failures.append(f"pico RSS {report['peak_rss_mb']} MB > {args.max_rss_mb} MB")
+    for failure in failures:
+        print(f"❌ {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
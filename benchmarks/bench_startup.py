@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# Google My Business Scraper - Benchmark de arranque
+#
+# Mide en procesos nuevos (arranque en frío real):
+#   - import scraper_core
+#   - scraper_cli.py --help
+#   - tiempo hasta mostrar la ventana de la GUI (requiere display)
+# y comprueba que requests, BeautifulSoup, PIL y cryptography no se cargan
+# al arrancar. Con --max-*-ms devuelve código 1 si la mediana supera el
+# umbral, para detectar regresiones en CI o antes de publicar.
+#
+# Uso:
+#   python benchmarks/bench_startup.py
+#   python benchmarks/bench_startup.py --runs 10 --max-import-ms 150 --max-cli-ms 250
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ['requests', 'bs4', 'PIL.Image', 'cryptography.fernet']
+
+# Imprime los módulos pesados realmente ejecutados (los registrados con
+# lazy_import siguen siendo _LazyModule hasta su primer uso)
+LOADED_CHECK = (
+    "import sys, importlib.util\n"
+    "loaded = [m for m in %r if m in sys.modules\n"
+    "          and not isinstance(sys.modules[m], importlib.util._LazyModule)]\n"
+    "print('LOADED=' + ','.join(loaded))\n" % HEAVY_MODULES
+)
+
+IMPORT_SCRIPT = "import scraper_core\n" + LOADED_CHECK
+
+CLI_SCRIPT = (
+    "import sys\n"
+    "sys.argv = ['scraper_cli.py', '--help']\n"
+    "import scraper_cli\n"
+    "try:\n"
+    "    scraper_cli.main()\n"
+    "except SystemExit:\n"
+    "    pass\n"
+    + LOADED_CHECK
+)
+
+GUI_SCRIPT = (
+    "import sys, tkinter as tk\n"
+    "try:\n"
+    "    root = tk.Tk()\n"
+    "except tk.TclError:\n"
+    "    sys.exit(3)  # Sin display\n"
+    "import scraper_gui\n"
+    "app = scraper_gui.GoogleMyBusinessScraperGUI(root)\n"
+    "root.update()\n"
+    + LOADED_CHECK +
+    "root.destroy()\n"
+)
+
+KDF_SCRIPT = (
+    "import time, scraper_core\n"
+    "config = scraper_core.SecureConfig()\n"
+    "start = time.perf_counter()\n"
+    "config.fernet\n"
+    "print('KDF_MS=%.1f' % ((time.perf_counter() - start) * 1000))\n"
+)
+
+def run_child(script):
+    """Ejecuta un script en un intérprete nuevo y devuelve (ms, código, salida)"""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-c', script], cwd=REPO_DIR,
+                          capture_output=True, text=True)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return elapsed_ms, proc.returncode, proc.stdout
+
+def parse_value(output, key):
+    for line in output.splitlines():
+        if line.startswith(key + '='):
+            return line[len(key) + 1:]
+    return None
+
+def measure(name, script, runs):
+    """Mediana y mínimo de varias ejecuciones; None si no se puede medir"""
+    timings = []
+    loaded = ''
+    for _ in range(runs):
+        elapsed_ms, returncode, output = run_child(script)
+        if returncode == 3:
+            return None
+        if returncode != 0:
+            raise RuntimeError(f"{name}: el proceso terminó con código {returncode}")
+        timings.append(elapsed_ms)
+        loaded = parse_value(output, 'LOADED') or ''
+    return {
+        'median_ms': round(statistics.median(timings), 1),
+        'min_ms': round(min(timings), 1),
+        'heavy_modules_loaded': [m for m in loaded.split(',') if m]
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de arranque en frío')
+    parser.add_argument('--runs', type=int, default=5, help='Ejecuciones por medida (por defecto: 5)')
+    parser.add_argument('--skip-gui', action='store_true', help='No medir la GUI')
+    parser.add_argument('--max-import-ms', type=float, help='Umbral para import scraper_core')
+    parser.add_argument('--max-cli-ms', type=float, help='Umbral para scraper_cli.py --help')
+    parser.add_argument('--max-gui-ms', type=float, help='Umbral para mostrar la ventana')
+    parser.add_argument('--json', action='store_true', help='Salida en JSON')
+    args = parser.parse_args(argv)
+
+    results = {
+        'python_startup': measure('python', 'pass', args.runs),
+        'import_core': measure('import', IMPORT_SCRIPT, args.runs),
+        'cli_help': measure('cli', CLI_SCRIPT, args.runs),
+        'gui_window': None if args.skip_gui else measure('gui', GUI_SCRIPT, args.runs)
+    }
+    _, _, kdf_output = run_child(KDF_SCRIPT)
+    results['key_derivation_ms'] = float(parse_value(kdf_output, 'KDF_MS') or 0)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, result in results.items():
+            if name == 'key_derivation_ms':
+                print(f"{'key_derivation':16} {result:8.1f} ms (diferida hasta el primer uso)")
+            elif result is None:
+                print(f"{name:16} {'-':>8}    (no disponible)")
+            else:
+                heavy = ', '.join(result['heavy_modules_loaded']) or 'ninguno'
+                print(f"{name:16} {result['median_ms']:8.1f} ms mediana "
+                      f"(mín {result['min_ms']:.1f}) | módulos pesados: {heavy}")
+
+    # Umbrales de regresión
+    failures = []
+    for key, limit in (('import_core', args.max_import_ms),
+                       ('cli_help', args.max_cli_ms),
+                       ('gui_window', args.max_gui_ms)):
+        result = results[key]
+        if limit is not None and result is not None and result['median_ms'] > limit:
+            failures.append(f"{key}: {result['median_ms']} ms > {limit} ms")
+    for key in ('import_core', 'cli_help'):
+        if results[key] and results[key]['heavy_modules_loaded']:
+            failures.append(f"{key}: carga {', '.join(results[key]['heavy_modules_loaded'])} al arrancar")
+
+    for failure in failures:
+        print(f"❌ {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+# Google My Business Scraper - Servidor simulado de la API de Places
+#
+# Imita los endpoints que usa ScraperEngine (Text Search con
+# next_page_token, Place Details y Place Photo, y los de Places API (New)
+# bajo /v1 con máscara de campos) y sirve sitios web falsos
+# para la extracción de emails. Todo es determinista a partir de la
+# consulta y la semilla, con latencia y tasa de errores configurables,
+# para medir el rendimiento del motor sin gastar cuota de Google.
+#
+# Los sitios web cuelgan de /sites/<id>/ en el mismo servidor: las páginas
+# de contacto (/contact, /contacto...) responden 404 y el email, si lo
+# hay, está en la portada. Es el peor caso del extractor de emails.
+#
+# Uso:
+#   python benchmarks/mock_places.py --port 8765 --latency-ms 80
+#   GMB_PLACES_API_URL=http://127.0.0.1:8765/maps/api/place python scraper_cli.py -k "cafe"
+#   GMB_PLACES_NEW_API_URL=http://127.0.0.1:8765/v1 python scraper_cli.py -k "cafe" --backend new
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import parse_qs, urlparse
+
+API_PREFIX = '/maps/api/place'
+NEW_API_PREFIX = '/v1'
+PAGE_SIZE = 20
+MAX_RESULTS_PER_QUERY = 60
+
+# GIF de 1x1 por si PIL no está instalado
+FALLBACK_IMAGE = base64.b64decode('R0lGODlhAQABAIAAAP///wAAACH5BAEAAAAALAAAAAABAAEAAAICRAEAOw==')
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+PRICE_LEVELS = ['PRICE_LEVEL_FREE', 'PRICE_LEVEL_INEXPENSIVE', 'PRICE_LEVEL_MODERATE',
+                'PRICE_LEVEL_EXPENSIVE', 'PRICE_LEVEL_VERY_EXPENSIVE']
+
+
+def build_image():
+    """Imagen apaisada de prueba (JPEG si PIL está disponible)"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return FALLBACK_IMAGE, 'image/gif'
+    buffer = BytesIO()
+    Image.new('RGB', (400, 300), (70, 130, 180)).save(buffer, 'JPEG', quality=70)
+    return buffer.getvalue(), 'image/jpeg'
+
+
+class MockPlacesServer:
+    """
+    Servidor HTTP simulado en un hilo propio.
+
+    Args:
+        port: Puerto de escucha (0 = uno libre)
+        latency_ms: Latencia media de la API
+        jitter_ms: Variación uniforme (±) de la latencia
+        site_latency_ms: Latencia media de los sitios web
+        error_rate: Fracción de respuestas HTTP 500 (API y sitios)
+        results_per_query: Resultados de cada Text Search (máx 60)
+        token_delay: Segundos hasta que un next_page_token es válido
+        website_rate: Fracción de negocios con sitio web
+        email_rate: Fracción de sitios web con email en la portada
+        seed: Semilla de los datos y de la latencia
+    """
+
+    def __init__(self, port=0, latency_ms=0.0, jitter_ms=0.0, site_latency_ms=None,
+                 error_rate=0.0, results_per_query=MAX_RESULTS_PER_QUERY, token_delay=2.0,
+                 website_rate=0.7, email_rate=0.5, seed=1):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.site_latency_ms = latency_ms if site_latency_ms is None else site_latency_ms
+        self.error_rate = error_rate
+        self.results_per_query = max(0, min(MAX_RESULTS_PER_QUERY, results_per_query))
+        self.token_delay = token_delay
+        self.website_rate = website_rate
+        self.email_rate = email_rate
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = {}  # tipo de petición -> número (GET /__stats)
+        self.image, self.image_type = build_image()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def api_url(self):
+        """Valor para GMB_PLACES_API_URL / --api-base-url"""
+        return self.url + API_PREFIX
+
+    @property
+    def new_api_url(self):
+        """Valor para GMB_PLACES_NEW_API_URL / --api-base-url con --backend new"""
+        return self.url + NEW_API_PREFIX
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def count(self, kind):
+        with self.lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+
+    def delay(self, mean_ms):
+        """Espera la latencia simulada y decide si la respuesta es un error"""
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms)
+            failed = self.random.random() < self.error_rate
+        if mean_ms > 0:
+            time.sleep(max(0.0, mean_ms + jitter) / 1000)
+        return failed
+
+    # --- Datos deterministas ---
+
+    def _hash(self, text):
+        return int(hashlib.sha1(f"{self.seed}|{text}".encode()).hexdigest()[:12], 16)
+
+    def place_ids(self, query):
+        digest = hashlib.sha1(f"{self.seed}|{query.lower()}".encode()).hexdigest()[:10]
+        return [f"mock-{digest}-{i}" for i in range(self.results_per_query)]
+
+    def place_result(self, place_id):
+        h = self._hash(place_id)
+        return {
+            'place_id': place_id,
+            'name': f"Negocio {place_id[-14:]}",
+            'formatted_address': f"Calle Falsa {h % 500 + 1}, Madrid",
+            'rating': round(3 + (h % 21) / 10, 1),
+            'user_ratings_total': h % 2000,
+            'price_level': h % 4 + 1,
+            'geometry': {'location': {'lat': 40.4 + (h % 1000) / 10000, 'lng': -3.7 + (h // 1000 % 1000) / 10000}},
+            'photos': [{'photo_reference': f"photo-{place_id}", 'width': 400, 'height': 300}]
+        }
+
+    def place_details(self, place_id):
+        h = self._hash(place_id)
+        result = self.place_result(place_id)
+        result.pop('photos')
+        result.pop('geometry')
+        result.update({
+            'formatted_phone_number': f"91 {h % 900 + 100} {h // 900 % 90 + 10} {h // 81000 % 90 + 10}",
+            'opening_hours': {
+                'periods': [{'open': {'day': d, 'time': '0900'}, 'close': {'day': d, 'time': '2000'}}
+                            for d in range(1, 6)],
+                'weekday_text': [f"{day}: {'9:00 AM – 8:00 PM' if i < 5 else 'Closed'}"
+                                 for i, day in enumerate(WEEKDAYS)]
+            }
+        })
+        if (h % 1000) / 1000 < self.website_rate:
+            result['website'] = f"{self.url}/sites/{place_id}/"
+        return result
+
+    def new_place(self, place_id):
+        """El mismo negocio en el formato de Places API (New)"""
+        legacy = dict(self.place_result(place_id), **self.place_details(place_id))
+        location = legacy['geometry']['location']
+        place = {
+            'id': place_id,
+            'displayName': {'text': legacy['name'], 'languageCode': 'es'},
+            'formattedAddress': legacy['formatted_address'],
+            'nationalPhoneNumber': legacy['formatted_phone_number'],
+            'rating': legacy['rating'],
+            'userRatingCount': legacy['user_ratings_total'],
+            'priceLevel': PRICE_LEVELS[legacy['price_level']],
+            'regularOpeningHours': {'periods': [
+                {'open': {'day': d, 'hour': 9, 'minute': 0}, 'close': {'day': d, 'hour': 20, 'minute': 0}}
+                for d in range(1, 6)]},
+            'location': {'latitude': location['lat'], 'longitude': location['lng']},
+            'photos': [{'name': f"places/{place_id}/photos/photo-{place_id}", 'widthPx': 400, 'heightPx': 300}]
+        }
+        if legacy.get('website'):
+            place['websiteUri'] = legacy['website']
+        return place
+
+    def site_page(self, site_id):
+        h = self._hash('site|' + site_id)
+        email = ''
+        if (h % 1000) / 1000 < self.email_rate:
+            email = f'<footer><a href="mailto:info@{site_id}.example.org">Escríbenos</a></footer>'
+        filler = ''.join(f"<p>Sección {i} del negocio {site_id}.</p>" for i in range(40))
+        return f"<html><head><title>{site_id}</title></head><body><h1>{site_id}</h1>{filler}{email}</body></html>"
+
+    # --- Endpoints ---
+
+    def text_search(self, params):
+        token = params.get('pagetoken')
+        if token:
+            try:
+                query, page, issued_at = json.loads(base64.urlsafe_b64decode(token.encode()))
+            except ValueError:
+                return {'status': 'INVALID_REQUEST', 'results': []}
+            if time.time() - issued_at < self.token_delay:
+                return {'status': 'INVALID_REQUEST', 'results': []}
+        else:
+            query, page = params.get('query', ''), 0
+
+        ids = self.place_ids(query)
+        chunk = ids[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]
+        payload = {'status': 'OK' if chunk else 'ZERO_RESULTS',
+                   'results': [self.place_result(pid) for pid in chunk]}
+        if (page + 1) * PAGE_SIZE < len(ids):
+            raw = json.dumps([query, page + 1, time.time()]).encode()
+            payload['next_page_token'] = base64.urlsafe_b64encode(raw).decode()
+        return payload
+
+    def details(self, params):
+        place_id = params.get('place_id', '')
+        if not place_id.startswith('mock-'):
+            return {'status': 'NOT_FOUND'}
+        return {'status': 'OK', 'result': self.place_details(place_id)}
+
+    @staticmethod
+    def apply_mask(place, mask, prefix=''):
+        """Solo los campos de la máscara (places.<campo> en searchText)"""
+        names = {name.strip()[len(prefix):] for name in mask.split(',') if name.strip().startswith(prefix)}
+        return place if '*' in names else {k: v for k, v in place.items() if k in names}
+
+    def search_text(self, body, mask):
+        """places:searchText: el nextPageToken vale en el acto"""
+        token = body.get('pageToken')
+        page_size = max(1, min(PAGE_SIZE, int(body.get('pageSize') or PAGE_SIZE)))
+        if token:
+            try:
+                query, offset = json.loads(base64.urlsafe_b64decode(token.encode()))
+            except ValueError:
+                return None
+        else:
+            query, offset = body.get('textQuery', ''), 0
+
+        ids = self.place_ids(query)
+        chunk = ids[offset:offset + page_size]
+        payload = {}
+        if chunk:
+            payload['places'] = [self.apply_mask(self.new_place(pid), mask, 'places.') for pid in chunk]
+        if offset + page_size < len(ids) and 'nextPageToken' in mask:
+            payload['nextPageToken'] = base64.urlsafe_b64encode(
+                json.dumps([query, offset + page_size]).encode()).decode()
+        return payload
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def send(self, code, body, content_type='application/json'):
+                if isinstance(body, str):
+                    body = body.encode('utf-8')
+                self.send_response(code)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def send_error_json(self, code, status, message):
+                self.send(code, json.dumps({'error': {'code': code, 'message': message, 'status': status}}))
+
+            def new_api(self, method, path, params):
+                """Places API (New): key y máscara en las cabeceras (o en la URL)"""
+                endpoint = path[len(NEW_API_PREFIX):]
+                kind = ('v1' + endpoint[endpoint.rindex('/'):] if endpoint.endswith('/media')
+                        else 'v1/places:searchText' if method == 'POST' else 'v1/places')
+                server.count(kind)
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                if server.delay(server.latency_ms):
+                    return self.send_error_json(500, 'INTERNAL', 'Error simulado')
+                if not (self.headers.get('X-Goog-Api-Key') or params.get('key')):
+                    return self.send_error_json(403, 'PERMISSION_DENIED', 'Falta la API key')
+                mask = self.headers.get('X-Goog-FieldMask') or params.get('fields') or ''
+
+                if method == 'POST' and endpoint == '/places:searchText':
+                    if not mask:
+                        return self.send_error_json(400, 'INVALID_ARGUMENT', 'Falta la máscara de campos')
+                    try:
+                        payload = server.search_text(json.loads(raw or b'{}'), mask)
+                    except ValueError:
+                        payload = None
+                    if payload is None:
+                        return self.send_error_json(400, 'INVALID_ARGUMENT', 'Petición no válida')
+                    return self.send(200, json.dumps(payload))
+
+                parts = endpoint.strip('/').split('/')
+                if method == 'GET' and parts[0] == 'places' and len(parts) > 1 and parts[1].startswith('mock-'):
+                    if len(parts) == 5 and parts[2] == 'photos' and parts[4] == 'media':
+                        return self.send(200, server.image, server.image_type)
+                    if len(parts) == 2:
+                        if not mask:
+                            return self.send_error_json(400, 'INVALID_ARGUMENT', 'Falta la máscara de campos')
+                        return self.send(200, json.dumps(server.apply_mask(server.new_place(parts[1]), mask)))
+                return self.send_error_json(404, 'NOT_FOUND', 'No encontrado')
+
+            def do_POST(self):
+                parsed = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                if parsed.path.startswith(NEW_API_PREFIX + '/'):
+                    return self.new_api('POST', parsed.path, params)
+                return self.send(404, '{"status": "NOT_FOUND"}')
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                path = parsed.path
+
+                if path.startswith(NEW_API_PREFIX + '/'):
+                    return self.new_api('GET', path, params)
+
+                if path.startswith(API_PREFIX):
+                    endpoint = path[len(API_PREFIX):]
+                    server.count(endpoint)
+                    if server.delay(server.latency_ms):
+                        return self.send(500, '{"status": "UNKNOWN_ERROR"}')
+                    if not params.get('key'):
+                        return self.send(200, json.dumps({'status': 'REQUEST_DENIED'}))
+                    if endpoint == '/textsearch/json':
+                        return self.send(200, json.dumps(server.text_search(params)))
+                    if endpoint == '/details/json':
+                        return self.send(200, json.dumps(server.details(params)))
+                    if endpoint == '/photo':
+                        return self.send(200, server.image, server.image_type)
+                    return self.send(404, '{"status": "NOT_FOUND"}')
+
+                if path == '/__stats':
+                    with server.lock:
+                        return self.send(200, json.dumps(server.requests))
+
+                server.count('site')
+                if server.delay(server.site_latency_ms):
+                    return self.send(500, 'Internal Server Error', 'text/plain')
+                parts = path.strip('/').split('/')
+                if len(parts) == 2 and parts[0] == 'sites':
+                    return self.send(200, server.site_page(parts[1]), 'text/html; charset=utf-8')
+                return self.send(404, '<html><body>Not found</body></html>', 'text/html')
+
+        return Handler
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Servidor simulado de la API de Places para benchmarks')
+    parser.add_argument('--port', type=int, default=8765, help='Puerto (0 = uno libre)')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Latencia media de la API')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Variación (±) de la latencia')
+    parser.add_argument('--site-latency-ms', type=float, default=None,
+                        help='Latencia media de los sitios web (por defecto, la de la API)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fracción de respuestas HTTP 500')
+    parser.add_argument('--results-per-query', type=int, default=MAX_RESULTS_PER_QUERY,
+                        help='Resultados por búsqueda (máx 60)')
+    parser.add_argument('--token-delay', type=float, default=2.0,
+                        help='Segundos hasta que el next_page_token es válido')
+    parser.add_argument('--website-rate', type=float, default=0.7, help='Fracción de negocios con web')
+    parser.add_argument('--email-rate', type=float, default=0.5, help='Fracción de webs con email')
+    parser.add_argument('--seed', type=int, default=1, help='Semilla de los datos simulados')
+    return parser
+
+
+def server_from_args(args):
+    return MockPlacesServer(
+        port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        site_latency_ms=args.site_latency_ms, error_rate=args.error_rate,
+        results_per_query=args.results_per_query, token_delay=args.token_delay,
+        website_rate=args.website_rate, email_rate=args.email_rate, seed=args.seed)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    server = server_from_args(args)
+    # La primera línea la lee bench_scrape.py para conocer el puerto
+    print(f"API_URL={server.api_url}", flush=True)
+    print(f"🧪 Servidor simulado escuchando en {server.url} (Ctrl+C para salir)", file=sys.stderr)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
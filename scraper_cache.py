@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# Google My Business Scraper - Cache persistente de búsquedas
+#
+# Guarda los resultados de Text Search (place_id y nombre de cada página)
+# en una base SQLite dentro del directorio de datos, indexados por la
+# consulta normalizada y los parámetros de ubicación. Repetir la misma
+# keyword dentro del TTL no hace llamadas a la API ni espera los 2 s de
+# cada next_page_token.
+#
+# Los next_page_token caducan a los pocos minutos, así que no sirven como
+# clave: se guardan las páginas en orden y se indica si quedaban más.
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+SEARCH_CACHE_FILE = '.search_cache.sqlite3'
+DEFAULT_SEARCH_CACHE_TTL_HOURS = 24.0
+
+
+def normalize_query(query):
+    """Normaliza la consulta: minúsculas, Unicode NFKC y espacios simples"""
+    query = unicodedata.normalize('NFKC', str(query)).lower()
+    return re.sub(r'\s+', ' ', query).strip()
+
+
+def cache_key(query, location=None, radius=None):
+    """Clave de cache para una consulta y, opcionalmente, su zona"""
+    key = normalize_query(query)
+    if location:
+        key += f"|{location[0]:.6f},{location[1]:.6f}|{int(radius or 0)}"
+    return key
+
+
+class SearchCache:
+    """Cache de resultados de Text Search con caducidad (seguro entre hilos)"""
+
+    def __init__(self, filepath, ttl_hours=DEFAULT_SEARCH_CACHE_TTL_HOURS):
+        self.filepath = filepath
+        self.ttl = ttl_hours * 3600
+        self.lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def conn(self):
+        # La base se abre en el primer uso, no al crear el motor
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.filepath) or '.', exist_ok=True)
+            self._conn = sqlite3.connect(self.filepath, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                " key TEXT PRIMARY KEY,"
+                " fetched_at REAL NOT NULL,"
+                " has_more INTEGER NOT NULL,"
+                " results TEXT NOT NULL)")
+            self._conn.execute("DELETE FROM search_cache WHERE fetched_at < ?",
+                               (time.time() - self.ttl,))
+            self._conn.commit()
+        return self._conn
+
+    def get(self, query, location=None, radius=None):
+        """
+        Devuelve (resultados, has_more) si hay una entrada vigente, o None.
+
+        has_more indica que la búsqueda se cortó por max_results y la API
+        tenía más páginas.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT fetched_at, has_more, results FROM search_cache WHERE key = ?",
+                (cache_key(query, location, radius),)).fetchone()
+        if row is None or time.time() - row[0] > self.ttl:
+            return None
+        return json.loads(row[2]), bool(row[1])
+
+    def put(self, query, results, has_more, location=None, radius=None):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, fetched_at, has_more, results) "
+                "VALUES (?, ?, ?, ?)",
+                (cache_key(query, location, radius), time.time(), int(has_more),
+                 json.dumps(results, ensure_ascii=False)))
+            self.conn.commit()
+
+    def clear(self):
+        """Elimina todas las entradas"""
+        with self.lock:
+            self.conn.execute("DELETE FROM search_cache")
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+# Google My Business Scraper - Línea de comandos
+#
+# Ejecuta el mismo motor que la GUI (scraper_core.ScraperEngine) sin Tk,
+# para servidores sin entorno gráfico o tareas programadas (cron).
+#
+# Ejemplos:
+#   python scraper_cli.py -k "restaurantes Madrid Centro" -k "restaurantes Madrid Norte"
+#   python scraper_cli.py --keywords-file keywords.txt --format csv --fields title,phone,email
+#   python scraper_cli.py -k restaurantes --area "Madrid"
+#   python scraper_cli.py -k restaurantes --backend new --fields title,phone,website,rating
+#   python scraper_cli.py -o restaurantes-data --refresh-stale --max-age-days 30 --refresh-limit 500
+#   python scraper_cli.py --dedup-existing --dedup merge       # todos los datasets de data/
+#
+# Trabajo compartido entre procesos/máquinas (cola SQLite persistente):
+#   python scraper_cli.py --queue trabajo.sqlite3 --keywords-file keywords.txt --enqueue-only
+#   python scraper_cli.py --queue trabajo.sqlite3 -w 4     # en cada proceso/máquina
+#
+# Códigos de salida:
+#   0   Completado (también si no había negocios nuevos)
+#   1   Error inesperado
+#   2   Argumentos inválidos
+#   3   API Key no encontrada o no válida
+#   4   Ninguna búsqueda devolvió resultados
+#   130 Interrumpido (Ctrl+C)
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from scraper_core import (parse_keywords, build_output_filename, setup_logging, get_app_dir,
+                          find_api_keys, ScrapeOptions, ScraperEngine, DEFAULT_FIELDS, APP_VERSION,
+                          DEFAULT_SEARCH_CACHE_TTL_HOURS, DEFAULT_SEARCH_QPS, DEFAULT_REFRESH_AGE_DAYS,
+                          DEFAULT_SITE_BUDGET_SECONDS, DEFAULT_HOST_COOLDOWN_SECONDS)
+from scraper_queue import JobQueue, DEFAULT_LEASE_SECONDS, DEFAULT_MAX_ATTEMPTS, JOURNAL_MODES
+from scraper_keys import parse_key_entry
+from scraper_dedup import DEDUP_MODES, DEDUP_FLAG
+from scraper_storage import COMPRESSIONS
+from scraper_places_new import BACKENDS, BACKEND_LEGACY, MAX_PAGE_SIZE
+from scraper_websites import EMAIL_SCOPES, DEFAULT_EMAIL_SCOPE
+from scraper_refresh import MissingPlaceIds
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_API_KEY = 3
+EXIT_NO_RESULTS = 4
+EXIT_INTERRUPTED = 130
+
+def build_parser():
+    default_fields = ','.join(f for f, enabled in DEFAULT_FIELDS.items() if enabled)
+    parser = argparse.ArgumentParser(
+        prog='scraper_cli.py',
+        description='Google My Business Scraper sin interfaz gráfica'
+    )
+    parser.add_argument('-k', '--keyword', action='append', default=[],
+                        help='Palabra clave a buscar (repetible; admite comas y punto y coma)')
+    parser.add_argument('--keywords-file',
+                        help='Archivo de texto con una palabra clave por línea')
+    parser.add_argument('-o', '--output', default='',
+                        help='Nombre del archivo de salida (por defecto: <primera-keyword>-data)')
+    parser.add_argument('-f', '--format', choices=['json', 'csv'], default='json',
+                        help='Formato de salida (por defecto: json)')
+    parser.add_argument('--compress', choices=COMPRESSIONS, default=None,
+                        help='Guardar los datasets nuevos comprimidos (.json.gz, .csv.xz...); '
+                             'los comprimidos se leen siempre sin esta opción')
+    parser.add_argument('--fields', default=default_fields,
+                        help=f"Campos a extraer separados por comas (por defecto: {default_fields}). "
+                             f"Disponibles: {', '.join(DEFAULT_FIELDS)}")
+    parser.add_argument('--data-dir', default=os.path.join(get_app_dir(), 'data'),
+                        help='Directorio de datos (por defecto: data/ junto al script)')
+    parser.add_argument('--area',
+                        help='Búsqueda por cuadrícula en una ciudad o rectángulo "lat1,lng1,lat2,lng2" '
+                             '(supera el límite de 60 resultados por keyword)')
+    parser.add_argument('--search-cache-ttl', type=float, default=DEFAULT_SEARCH_CACHE_TTL_HOURS,
+                        help='Horas que se reutilizan los resultados de búsqueda guardados '
+                             f'(por defecto: {DEFAULT_SEARCH_CACHE_TTL_HOURS:g}; 0 = sin cache)')
+    parser.add_argument('--refresh-search', action='store_true',
+                        help='Ignorar la cache de búsquedas y volver a consultar la API')
+    parser.add_argument('--search-qps', type=float, default=DEFAULT_SEARCH_QPS,
+                        help=f'Llamadas de búsqueda por segundo como máximo (por defecto: {DEFAULT_SEARCH_QPS:g})')
+    parser.add_argument('--site-budget', type=float, default=DEFAULT_SITE_BUDGET_SECONDS,
+                        help='Segundos máximos buscando el email en un sitio web '
+                             f'(por defecto: {DEFAULT_SITE_BUDGET_SECONDS:g})')
+    parser.add_argument('--host-cooldown', type=float, default=DEFAULT_HOST_COOLDOWN_SECONDS,
+                        help='Segundos que se salta un sitio web que no responde '
+                             f'(por defecto: {DEFAULT_HOST_COOLDOWN_SECONDS:g}; 0 = solo en ese negocio)')
+    parser.add_argument('--email-scope', choices=EMAIL_SCOPES, default=DEFAULT_EMAIL_SCOPE,
+                        help='Compartir el email entre negocios con la misma web: url (cada URL por '
+                             'separado, por defecto), domain (un recorrido por host para todas las sucursales) '
+                             'o location (página de cada sucursal y, si no tiene email, el del host)')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='Negocios procesados en paralelo (por defecto: 1)')
+    parser.add_argument('--max-results', type=int, default=None,
+                        help='Máximo de resultados por keyword (por defecto: sin límite, máx 60)')
+    parser.add_argument('--min-delay', type=float, default=1.5,
+                        help='Delay mínimo entre negocios en segundos (por defecto: 1.5)')
+    parser.add_argument('--max-delay', type=float, default=3.0,
+                        help='Delay máximo entre negocios en segundos (por defecto: 3.0)')
+    parser.add_argument('--batch-size', type=int, default=5,
+                        help='Negocios por lote en modo secuencial (por defecto: 5)')
+    parser.add_argument('--batch-delay', type=float, default=10.0,
+                        help='Pausa base entre lotes en segundos (por defecto: 10)')
+    parser.add_argument('--budget', type=float, default=None, metavar='USD',
+                        help='Presupuesto máximo de la ejecución en USD (precio por SKU): '
+                             'al alcanzarlo se detiene y se guarda lo obtenido')
+    parser.add_argument('--estimate', action='store_true',
+                        help='Solo estimar llamadas por SKU, coste y duración a partir de las ejecuciones '
+                             'anteriores, sin llamar a la API')
+    parser.add_argument('--refresh-stale', action='store_true',
+                        help='Refrescar el dataset (-o o keywords): vuelve a pedir Details solo de los '
+                             'registros antiguos, los de más reseñas primero')
+    parser.add_argument('--max-age-days', type=float, default=DEFAULT_REFRESH_AGE_DAYS,
+                        help='Con --refresh-stale: antigüedad a partir de la cual se refresca (por defecto: 30)')
+    parser.add_argument('--refresh-limit', type=int, default=None,
+                        help='Con --refresh-stale: máximo de registros a refrescar en esta ejecución')
+    parser.add_argument('--dedup', choices=DEDUP_MODES, default=None,
+                        help='Al guardar, buscar negocios duplicados con distinto place_id y marcarlos '
+                             '(flag, columna duplicado_de) o fusionarlos (merge)')
+    parser.add_argument('--dedup-existing', action='store_true',
+                        help='Solo buscar duplicados en el dataset de -o (o en todos los de --data-dir) '
+                             'sin llamar a la API; modo de --dedup (por defecto: flag)')
+    parser.add_argument('--queue', metavar='ARCHIVO',
+                        help='Cola de trabajo SQLite compartida: encola las keywords (si se indican) '
+                             'y procesa tareas junto con otros procesos que usen el mismo archivo')
+    parser.add_argument('--enqueue-only', action='store_true',
+                        help='Con --queue: solo encolar las keywords, sin procesar')
+    parser.add_argument('--retry-failed', action='store_true',
+                        help='Con --queue: volver a encolar las tareas fallidas')
+    parser.add_argument('--lease-seconds', type=float, default=DEFAULT_LEASE_SECONDS,
+                        help=f'Con --queue: segundos antes de reasignar una tarea de un worker caído '
+                             f'(por defecto: {DEFAULT_LEASE_SECONDS})')
+    parser.add_argument('--queue-journal', choices=JOURNAL_MODES, default=None,
+                        help='Con --queue: modo del journal de SQLite. wal (por defecto) solo sirve para '
+                             'procesos de una misma máquina; delete es necesario si varias máquinas comparten '
+                             'el archivo en un disco de red. Se guarda en la cola y los demás workers lo adoptan')
+    parser.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS,
+                        help=f'Con --queue: intentos por tarea (por defecto: {DEFAULT_MAX_ATTEMPTS})')
+    parser.add_argument('--api-key', action='append', default=[],
+                        help='API Key, repetible para usar un pool; admite "KEY,qps,presupuesto_diario,etiqueta" '
+                             '(por defecto: GOOGLE_PLACES_API_KEY(S), configuración cifrada o archivo legacy)')
+    parser.add_argument('--backend', choices=BACKENDS, default=BACKEND_LEGACY,
+                        help='API de Places: legacy (textsearch/details) o new (Places API (New): los campos '
+                             'llegan en la búsqueda, sin Place Details) (por defecto: legacy)')
+    parser.add_argument('--page-size', type=int, default=MAX_PAGE_SIZE,
+                        help=f'Con --backend new: resultados por página de búsqueda, 1-{MAX_PAGE_SIZE} '
+                             f'(por defecto: {MAX_PAGE_SIZE})')
+    parser.add_argument('--api-base-url', default=None,
+                        help='URL base de la API de Places del backend, p. ej. un proxy o benchmarks/mock_places.py '
+                             '(por defecto: GMB_PLACES_API_URL / GMB_PLACES_NEW_API_URL o la API de Google)')
+    parser.add_argument('--record-http', metavar='ARCHIVO',
+                        help='Grabar todas las respuestas HTTP (API y webs) en un archivo para reproducirlas')
+    parser.add_argument('--replay-http', metavar='ARCHIVO',
+                        help='Reproducir una ejecución grabada sin red ni cuota (no requiere API Key)')
+    parser.add_argument('--replay-timing', type=float, default=0.0,
+                        help='Latencia en la reproducción: 1 = la original, 0.1 = diez veces más rápido, '
+                             '0 = sin esperas (por defecto)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Perfilar la ejecución: tiempo real y de CPU por fase y volcado de cProfile '
+                             'junto al dataset')
+    parser.add_argument('--run-log', action='store_true',
+                        help='Guardar un log estructurado (JSON Lines) de la ejecución junto al dataset, '
+                             'con run_id, place_id, fase y duración')
+    parser.add_argument('--skip-validation', action='store_true',
+                        help='No validar la API Key antes de empezar')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='Mostrar solo el progreso y el resumen final en stderr')
+    parser.add_argument('--version', action='version', version=f"%(prog)s {APP_VERSION}")
+    return parser
+
+def read_keywords(args, parser):
+    """Reúne las keywords de -k y de --keywords-file"""
+    keywords = []
+    for value in args.keyword:
+        keywords.extend(parse_keywords(value))
+
+    if args.keywords_file:
+        try:
+            with open(args.keywords_file, 'r', encoding='utf-8') as f:
+                keywords.extend(parse_keywords(f.read()))
+        except (IOError, OSError) as e:
+            parser.error(f"No se pudo leer {args.keywords_file}: {e}")
+
+    if not keywords and not args.queue and not args.dedup_existing \
+            and not (args.refresh_stale and args.output.strip()):
+        parser.error("Indica al menos una palabra clave con -k o --keywords-file")
+    return keywords
+
+def read_options(args, parser):
+    """Valida los argumentos y construye las ScrapeOptions"""
+    fields = frozenset(f.strip() for f in args.fields.split(',') if f.strip())
+    unknown = fields - set(DEFAULT_FIELDS)
+    if unknown:
+        parser.error(f"Campos desconocidos: {', '.join(sorted(unknown))}")
+    if not fields:
+        parser.error("Selecciona al menos un campo para extraer")
+    if args.workers < 1:
+        parser.error("--workers debe ser al menos 1")
+    if args.min_delay < 0 or args.max_delay < args.min_delay:
+        parser.error("Los delays deben cumplir 0 <= --min-delay <= --max-delay")
+
+    max_results = args.max_results if args.max_results and args.max_results > 0 else None
+    if args.replay_http and not os.path.exists(args.replay_http):
+        parser.error(f"No existe el archivo de grabación: {args.replay_http}")
+
+    try:
+        return ScrapeOptions(
+            fields=fields,
+            max_results=max_results,
+            min_delay=args.min_delay,
+            max_delay=args.max_delay,
+            batch_size=max(1, args.batch_size),
+            batch_delay=max(0.0, args.batch_delay),
+            workers=args.workers,
+            data_dir=args.data_dir,
+            area=args.area,
+            search_cache_ttl=max(0.0, args.search_cache_ttl),
+            refresh_search=args.refresh_search,
+            search_qps=args.search_qps,
+            backend=args.backend,
+            page_size=args.page_size,
+            api_base_url=args.api_base_url,
+            http_record=args.record_http,
+            http_replay=args.replay_http,
+            replay_timing=args.replay_timing,
+            profile=args.profile,
+            run_log=args.run_log,
+            dedup=args.dedup,
+            compression=args.compress,
+            site_budget=args.site_budget,
+            host_cooldown=args.host_cooldown,
+            email_scope=args.email_scope,
+            budget=args.budget
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    keywords = read_keywords(args, parser)
+    options = read_options(args, parser)
+    output = args.output.strip()
+    filename = build_output_filename(keywords, output, args.format) if keywords or output else None
+    if args.refresh_stale and args.queue:
+        parser.error("--refresh-stale no se puede combinar con --queue")
+    if args.dedup_existing and (args.queue or args.refresh_stale):
+        parser.error("--dedup-existing no se puede combinar con --queue ni --refresh-stale")
+    if args.max_age_days < 0:
+        parser.error("--max-age-days no puede ser negativo")
+    if args.enqueue_only and not args.queue:
+        parser.error("--enqueue-only requiere --queue")
+    if args.queue and (args.lease_seconds <= 0 or args.max_attempts < 1):
+        parser.error("--lease-seconds debe ser mayor que 0 y --max-attempts al menos 1")
+
+    logger = setup_logging()
+
+    def log(message):
+        logger.info(message)  # Sin emojis y en segundo plano (setup_logging)
+        if not args.quiet:
+            print(f"{time.strftime('%H:%M:%S')} - {message}", file=sys.stderr, flush=True)
+
+    # En modo silencioso se informa del progreso cada 5% aproximadamente
+    progress_total = {'value': 0}
+
+    def progress(message, value=None, maximum=None):
+        if maximum is not None:
+            progress_total['value'] = maximum
+        total = progress_total['value']
+        if not args.quiet or value is None or not total:
+            return
+        step = max(1, total // 20)
+        if value % step == 0 or value == total:
+            print(f"Progreso: {value}/{total}", file=sys.stderr, flush=True)
+
+    if args.estimate:
+        if args.queue or args.refresh_stale or args.dedup_existing:
+            parser.error("--estimate solo se aplica a una ejecución normal con keywords")
+        # No llama a la API: no hace falta API Key
+        estimate = ScraperEngine(None, options, on_log=log).estimate(keywords)
+        print('\n'.join(estimate.summary_lines()))
+        return EXIT_OK
+
+    if args.dedup_existing:
+        # No llama a la API: no hace falta API Key
+        return run_dedup(args, ScraperEngine(None, options, on_log=log), filename if output else None)
+
+    if args.api_key:
+        try:
+            key_entries = [entry for entry in map(parse_key_entry, args.api_key) if entry]
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        key_entries = find_api_keys()
+    if args.replay_http:
+        args.skip_validation = True  # La reproducción no consulta la API
+        if not key_entries:
+            key_entries = [{'key': 'REPLAY', 'label': 'Reproducción'}]  # La key grabada no se guarda
+    if not key_entries:
+        print("❌ No se encontró API Key. Usa --api-key o la variable GOOGLE_PLACES_API_KEY",
+              file=sys.stderr)
+        return EXIT_API_KEY
+
+    engine = ScraperEngine(key_entries, options, on_log=log, on_progress=progress)
+
+    if args.queue:
+        return run_queue(args, engine, keywords, filename, logger)
+
+    if not args.skip_validation and not engine.validate_api_key():
+        print("❌ La API Key no es válida o no tiene los permisos necesarios", file=sys.stderr)
+        return EXIT_API_KEY
+
+    if args.refresh_stale:
+        return run_refresh(args, engine, filename, logger)
+
+    try:
+        summary = engine.run(keywords, filename, args.format)
+    except KeyboardInterrupt:
+        engine.stop()
+        print("\n🛑 Interrumpido por el usuario", file=sys.stderr)
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        print(f"\n❌ Error inesperado: {e}", file=sys.stderr)
+        logger.exception("Error inesperado en la CLI")
+        return EXIT_ERROR
+
+    print(f"Encontrados: {summary.found} | Nuevos: {summary.new} | Procesados: {summary.processed} | "
+          f"API Calls: {engine.api_calls_count} | Costo estimado: ${engine.estimated_cost:.3f}",
+          file=sys.stderr)
+    if len(engine.key_pool) > 1:
+        print(engine.key_pool.summary_line(), file=sys.stderr)
+    if summary.filepath:
+        print(f"Archivo: {summary.filepath}", file=sys.stderr)
+
+    if summary.found == 0:
+        return EXIT_NO_RESULTS
+    return EXIT_OK
+
+def run_refresh(args, engine, filename, logger):
+    """Modo refresco: vuelve a pedir Details de los registros antiguos del dataset"""
+    if not os.path.exists(engine.output_path(filename)):
+        print(f"❌ No existe el dataset: {engine.output_path(filename)}", file=sys.stderr)
+        return EXIT_ERROR
+    try:
+        summary = engine.refresh_stale(filename, args.format, args.max_age_days, args.refresh_limit)
+    except MissingPlaceIds as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return EXIT_ERROR
+    except KeyboardInterrupt:
+        engine.stop()
+        print("\n🛑 Interrumpido por el usuario", file=sys.stderr)
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        print(f"\n❌ Error inesperado: {e}", file=sys.stderr)
+        logger.exception("Error inesperado refrescando el dataset")
+        return EXIT_ERROR
+
+    print(f"Antiguos: {summary.found} | Refrescados: {summary.processed} | Con cambios: {summary.changed} | "
+          f"API Calls: {engine.api_calls_count} | Costo estimado: ${engine.estimated_cost:.3f}",
+          file=sys.stderr)
+    if summary.filepath:
+        print(f"Archivo: {summary.filepath}", file=sys.stderr)
+    return EXIT_OK
+
+def run_dedup(args, engine, filename):
+    """Busca duplicados en un dataset existente o en todos los de --data-dir"""
+    mode = args.dedup or DEDUP_FLAG
+    datasets = [(filename, args.format)] if filename else engine.find_datasets()
+    if filename and not os.path.exists(engine.output_path(filename)):
+        print(f"❌ No existe el dataset: {engine.output_path(filename)}", file=sys.stderr)
+        return EXIT_ERROR
+    if not datasets:
+        print(f"❌ No hay datasets en {args.data_dir}", file=sys.stderr)
+        return EXIT_ERROR
+
+    duplicates = groups = 0
+    for dataset, output_format in datasets:
+        result = engine.dedup_dataset(dataset, output_format, mode)
+        if result is not None:
+            duplicates += result.duplicates
+            groups += len(result.groups)
+    print(f"Datasets: {len(datasets)} | Duplicados: {duplicates} | Grupos: {groups}", file=sys.stderr)
+    return EXIT_OK
+
+def run_queue(args, engine, keywords, filename, logger):
+    """Modo cola: encola keywords y/o procesa tareas del trabajo compartido"""
+    try:
+        queue = JobQueue(args.queue, lease_seconds=args.lease_seconds, max_attempts=args.max_attempts,
+                         journal_mode=args.queue_journal)
+    except sqlite3.Error as e:
+        print(f"❌ No se pudo abrir la cola: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+    if keywords:
+        engine.create_job(queue, keywords, filename, args.format)
+    if args.retry_failed:
+        print(f"🔁 {queue.retry_failed()} tareas fallidas vuelven a la cola", file=sys.stderr)
+    if args.enqueue_only:
+        print_queue_counts(queue)
+        return EXIT_OK
+
+    if not args.skip_validation and not engine.validate_api_key():
+        print("❌ La API Key no es válida o no tiene los permisos necesarios", file=sys.stderr)
+        return EXIT_API_KEY
+
+    try:
+        summary = engine.run_queue(queue)
+    except KeyboardInterrupt:
+        engine.stop()
+        print("\n🛑 Interrumpido por el usuario (las tareas en curso se reasignarán al caducar su lease)",
+              file=sys.stderr)
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        print(f"\n❌ Error inesperado: {e}", file=sys.stderr)
+        logger.exception("Error inesperado en el worker de cola")
+        return EXIT_ERROR
+
+    print(f"Este worker - Encontrados: {summary.found} | Nuevos: {summary.new} | "
+          f"Procesados: {summary.processed} | API Calls: {engine.api_calls_count} | "
+          f"Costo estimado: ${engine.estimated_cost:.3f}", file=sys.stderr)
+    if len(engine.key_pool) > 1:
+        print(engine.key_pool.summary_line(), file=sys.stderr)
+    print_queue_counts(queue)
+    if summary.filepath:
+        print(f"Archivo: {summary.filepath}", file=sys.stderr)
+    return EXIT_OK
+
+def print_queue_counts(queue):
+    for kind, statuses in sorted(queue.counts().items()):
+        detail = ', '.join(f"{status}: {count}" for status, count in sorted(statuses.items()))
+        print(f"Cola [{kind}] {detail}", file=sys.stderr)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,2662 @@
+#!/usr/bin/env python3
+# Google My Business Scraper - Motor de scraping
+#
+# Lógica de búsqueda, detalles, imágenes, emails y guardado, independiente
+# de Tk. La usan tanto la GUI (scraper_gui.py) como la línea de comandos
+# (scraper_cli.py). La GUI solo aporta callbacks para log, progreso y
+# contador de API calls.
+#
+# Arranque rápido: requests se carga en el primer uso (lazy_import) y PIL,
+# BeautifulSoup y cryptography se importan dentro de las funciones que los
+# necesitan, así la GUI y `scraper_cli.py --help` no pagan su importación.
+
+import json
+import csv
+import os
+import sys
+import threading
+import time
+import random
+import heapq
+import re
+import importlib.util
+import sqlite3
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field, asdict, replace
+from functools import lru_cache
+from collections import Counter, deque
+from typing import List, Optional, Dict, FrozenSet
+import unicodedata
+from urllib.parse import urljoin, urlparse
+import base64
+import platform
+from http import HTTPStatus
+import logging
+from logging.handlers import RotatingFileHandler
+from contextlib import nullcontext
+from scraper_metrics import (RunMetrics, API_OK_STATUSES, ENDPOINT_TEXT_SEARCH,
+                             ENDPOINT_DETAILS, ENDPOINT_PHOTO, ENDPOINT_WEBSITE)
+from scraper_cache import SearchCache, SEARCH_CACHE_FILE, DEFAULT_SEARCH_CACHE_TTL_HOURS, normalize_query
+from scraper_queue import (TASK_SEARCH, TASK_DETAILS, TASK_ENRICH, STATUS_DONE, STATUS_FAILED,
+                           default_worker_id)
+from scraper_keys import (ApiKeyPool, NoApiKeyAvailable, FAILOVER_STATUSES, KEY_USAGE_FILE,
+                          api_response_status, parse_key_entry)
+from scraper_geo import (BoundingBox, TEXT_SEARCH_MAX_RESULTS, MIN_TILE_RADIUS_M,
+                         MAX_TILE_DEPTH, MAX_SEARCH_RADIUS_M)
+from scraper_replay import HttpArchive, canonical_request
+from scraper_hosts import HostCircuitBreaker, SiteSkipped, DEFAULT_HOST_COOLDOWN_SECONDS, host_of
+from scraper_singleflight import SingleFlight
+from scraper_websites import (WebsiteResolver, EMAIL_SCOPES, EMAIL_SCOPE_LOCATION, EMAIL_SCOPE_URL,
+                              DEFAULT_EMAIL_SCOPE, origin_of, site_domain)
+from scraper_hours import Hours, parse_periods, intern_hours, is_open_at, hours_value
+from scraper_refresh import (RecordState, RECORD_STATE_FILE, DEFAULT_REFRESH_AGE_DAYS, MissingPlaceIds,
+                             comparable_row, content_hash, select_stale)
+from scraper_profile import (RunProfiler, profiled, PHASE_SEARCH, PHASE_DETAILS, PHASE_PHOTO,
+                             PHASE_EMAIL, PHASE_SAVE)
+from scraper_dedup import DEDUP_MODES, DEDUP_MERGE, MERGED_IDS_FIELD, MAX_BLOCK_SIZE, apply_dedup
+from scraper_storage import (COMPRESSIONS, DATASET_READ_ERRORS, open_dataset, resolve_dataset_path, temp_path,
+                             iter_json_array, write_json_dataset)
+from scraper_runlog import RunLog, AsciiFormatter, RUN_LOG_SUFFIX, new_run_id, start_background_logging
+from scraper_fields import SEARCH_PHOTOS_KEY, SEARCH_RESULT_FIELDS, plan_details_fields, search_payload
+from scraper_places_new import (BACKEND_LEGACY, BACKEND_NEW, BACKENDS, DEFAULT_PLACES_NEW_API_URL, API_KEY_HEADER,
+                                FIELD_MASK_HEADER, MAX_PAGE_SIZE, PHOTO_MAX_WIDTH, PHOTOS_FIELD, LOCATION_FIELD,
+                                VIEWPORT_FIELD, field_mask, search_body, request_identity, is_photo_name,
+                                legacy_place, legacy_search_response, legacy_status)
+from scraper_cost import (CALL_SEARCH, CALL_DETAILS, CALL_PHOTO_SEARCH, CALL_PHOTO, CALL_TYPE_ENDPOINTS,
+                          call_cost, call_skus, estimate_run, load_history)
+
+def lazy_import(name):
+    """Registra un módulo que se ejecuta al acceder a su primer atributo"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named '{name}'")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+requests = lazy_import('requests')
+
+def get_app_dir():
+    """Directorio del script o del ejecutable (PyInstaller)"""
+    if getattr(sys, 'frozen', False):
+        # Si está compilado con PyInstaller
+        return os.path.dirname(sys.executable)
+    # Si se ejecuta como script Python
+    return os.path.dirname(os.path.abspath(__file__))
+
+def normalize_filename(filename):
+    """Normaliza nombres de archivos: espacios -> guiones, minúsculas, sin caracteres especiales"""
+    # Convertir a minúsculas
+    filename = filename.lower()
+    # Reemplazar espacios con guiones
+    filename = filename.replace(' ', '-')
+    # Normalizar caracteres unicode (quitar acentos)
+    filename = unicodedata.normalize('NFD', filename)
+    filename = ''.join(c for c in filename if not unicodedata.combining(c))
+    # Remover caracteres no válidos para nombres de archivo
+    filename = re.sub(r'[^a-z0-9\-_.]', '', filename)
+    # Evitar guiones múltiples
+    filename = re.sub(r'-+', '-', filename)
+    # Quitar guiones al inicio/final
+    filename = filename.strip('-')
+    return filename
+
+def parse_keywords(text):
+    """Parsea texto con múltiples keywords y retorna lista limpia"""
+    # Reemplazar comas y punto y coma por saltos de línea
+    text = text.replace(',', '\n').replace(';', '\n')
+
+    # Dividir por líneas y limpiar
+    keywords = []
+    for line in text.split('\n'):
+        line = line.strip()
+        if line:  # Ignorar líneas vacías
+            keywords.append(line)
+
+    return keywords
+
+def build_output_filename(keywords, filename, output_format):
+    """Nombre de archivo normalizado con extensión según el formato"""
+    if not filename:
+        # Usar la primera keyword para el nombre de archivo
+        filename = f"{normalize_filename(keywords[0])}-data"
+    else:
+        # Normalizar nombre de archivo
+        filename = normalize_filename(filename)
+
+    # Agregar extensión apropiada
+    if output_format == "csv":
+        if not filename.endswith('.csv'):
+            filename += '.csv'
+    else:
+        if not filename.endswith('.json'):
+            filename += '.json'
+    return filename
+
+def setup_logging():
+    """
+    Configura el sistema de logging con rotación de archivos. La escritura
+    (y la limpieza de emojis) se hace en un hilo en segundo plano.
+    """
+    log_file = os.path.join(get_app_dir(), 'scraper.log')
+
+    # Configurar logger (una sola vez aunque se llame desde GUI y CLI)
+    logger = logging.getLogger('GMBScraper')
+    if logger.handlers:
+        return logger
+
+    # Configurar logging con rotación (max 5 archivos de 1MB cada uno)
+    handler = RotatingFileHandler(
+        log_file,
+        maxBytes=1024*1024,  # 1MB
+        backupCount=5,
+        encoding='utf-8'
+    )
+
+    # Formato del log (sin emojis)
+    formatter = AsciiFormatter(
+        '%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    handler.setFormatter(formatter)
+
+    logger.setLevel(logging.INFO)
+    start_background_logging(logger, handler)
+
+    return logger
+
+# Configuración por defecto
+DEFAULT_API_KEY_FILE = '.gmb_config.enc'  # Archivo cifrado
+KEY_POOL_FILE = '.gmb_keys.enc'  # Pool de API Keys adicionales (cifrado)
+LEGACY_API_KEY_FILE = 'google_api_key.txt'
+# URL base de la API de Places. GMB_PLACES_API_URL (o api_base_url en
+# ScrapeOptions) permite apuntar a un proxy o al servidor simulado de
+# benchmarks/mock_places.py
+DEFAULT_PLACES_API_URL = 'https://maps.googleapis.com/maps/api/place'
+PLACES_API_URL = os.environ.get('GMB_PLACES_API_URL', '').strip().rstrip('/') or DEFAULT_PLACES_API_URL
+URL_TEXT_SEARCH = f'{PLACES_API_URL}/textsearch/json'
+URL_PLACE_DETAILS = f'{PLACES_API_URL}/details/json'
+URL_PLACE_PHOTO = f'{PLACES_API_URL}/photo'
+# URL base de Places API (New) (backend 'new'); GMB_PLACES_NEW_API_URL la cambia
+PLACES_NEW_API_URL = os.environ.get('GMB_PLACES_NEW_API_URL', '').strip().rstrip('/') or DEFAULT_PLACES_NEW_API_URL
+HTTP_REASONS = {status.value: status.phrase for status in HTTPStatus}  # Para respuestas reproducidas
+APP_VERSION = "1.3.2"
+
+# Avisar cuando se ha gastado esta fracción del presupuesto
+BUDGET_WARNING_FRACTION = 0.9
+
+# Paginación de Text Search: el next_page_token tarda ~2 s en activarse y,
+# si se usa antes, la API responde INVALID_REQUEST
+PAGE_TOKEN_DELAY = 2.0
+PAGE_TOKEN_RETRY_DELAY = 1.0
+PAGE_TOKEN_MAX_RETRIES = 5
+DEFAULT_SEARCH_QPS = 10.0  # Llamadas de búsqueda por segundo como máximo
+
+# Búsqueda de email: tiempo total por sitio web (las páginas de contacto
+# dejan una reserva para la página principal) y timeouts por página
+DEFAULT_SITE_BUDGET_SECONDS = 30.0
+CONTACT_PAGE_TIMEOUT = 8.0
+HOMEPAGE_TIMEOUT = 12.0
+MIN_SITE_TIMEOUT = 1.0  # Por debajo no merece la pena lanzar otra petición
+
+# Espera de un worker de la cola cuando no hay tareas visibles pero otras siguen en curso
+QUEUE_POLL_SECONDS = 2.0
+
+# Campos seleccionables y su valor por defecto en la GUI
+DEFAULT_FIELDS = {
+    'title': True,
+    'phone': True,
+    'website': True,
+    'address': True,
+    'place_id': False,
+    'rating': True,
+    'total_ratings': True,
+    'opening_hours': False,
+    'price_level': False,
+    'email': False,
+    'imagen': False
+}
+
+# Nombre de cada campo en los archivos JSON/CSV
+OUTPUT_FIELD_NAMES = {
+    'title': 'titulo',
+    'phone': 'telefono',
+    'website': 'sitio_web',
+    'address': 'direccion',
+    'place_id': 'place_id',
+    'rating': 'rating',
+    'total_ratings': 'total_ratings',
+    'opening_hours': 'horarios',
+    'price_level': 'nivel_precios',
+    'email': 'email'
+}
+
+@lru_cache(maxsize=4)
+def derive_machine_key(machine_id: str) -> bytes:
+    """
+    Deriva la clave de cifrado con PBKDF2HMAC (100.000 iteraciones).
+
+    La clave solo se cachea en memoria del proceso: guardarla en disco
+    junto al archivo cifrado anularía el cifrado.
+    """
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=b'gmb_scraper_salt_v1',  # Salt fijo para consistencia
+        iterations=100000,
+    )
+    return base64.urlsafe_b64encode(kdf.derive(machine_id.encode()))
+
+class SecureConfig:
+    """Gestión segura de configuración con cifrado"""
+
+    def __init__(self):
+        # Usar ruta absoluta basada en el directorio del script o ejecutable
+        self.config_file = os.path.join(get_app_dir(), DEFAULT_API_KEY_FILE)
+        self.pool_file = os.path.join(get_app_dir(), KEY_POOL_FILE)
+        # La clave se deriva en el primer cifrado/descifrado, no al arrancar
+        self._fernet = None
+
+    @property
+    def fernet(self):
+        if self._fernet is None:
+            from cryptography.fernet import Fernet
+            self._fernet = Fernet(self._get_machine_key())
+        return self._fernet
+
+    def _get_machine_key(self):
+        """Genera una clave de cifrado única basada en la máquina"""
+        # Obtener un identificador único de la máquina
+        machine_id = platform.node() + platform.system() + os.path.expanduser("~")
+        return derive_machine_key(machine_id)
+
+    def save_api_key(self, api_key: str) -> bool:
+        """Guarda la API Key cifrada"""
+        try:
+            encrypted_key = self.fernet.encrypt(api_key.encode())
+            with open(self.config_file, 'wb') as f:
+                f.write(encrypted_key)
+            return True
+        except Exception as e:
+            print(f"Error guardando API Key: {e}")
+            return False
+
+    def load_api_key(self) -> Optional[str]:
+        """Carga y descifra la API Key"""
+        try:
+            if not os.path.exists(self.config_file):
+                return None
+
+            with open(self.config_file, 'rb') as f:
+                encrypted_key = f.read()
+
+            decrypted_key = self.fernet.decrypt(encrypted_key)
+            return decrypted_key.decode()
+        except Exception as e:
+            print(f"Error cargando API Key: {e}")
+            return None
+
+    def save_key_pool(self, entries) -> bool:
+        """Guarda cifrado el pool de keys adicionales (lista de dicts; vacía = eliminar)"""
+        try:
+            if not entries:
+                if os.path.exists(self.pool_file):
+                    os.remove(self.pool_file)
+                return True
+            encrypted = self.fernet.encrypt(json.dumps(entries).encode())
+            with open(self.pool_file, 'wb') as f:
+                f.write(encrypted)
+            return True
+        except Exception as e:
+            print(f"Error guardando pool de API Keys: {e}")
+            return False
+
+    def load_key_pool(self) -> List[Dict]:
+        """Carga y descifra el pool de keys adicionales"""
+        try:
+            if not os.path.exists(self.pool_file):
+                return []
+            with open(self.pool_file, 'rb') as f:
+                return json.loads(self.fernet.decrypt(f.read()).decode())
+        except Exception as e:
+            print(f"Error cargando pool de API Keys: {e}")
+            return []
+
+    def delete_api_key(self) -> bool:
+        """Elimina el archivo de configuración"""
+        try:
+            if os.path.exists(self.config_file):
+                os.remove(self.config_file)
+            return True
+        except Exception as e:
+            print(f"Error eliminando API Key: {e}")
+            return False
+
+def find_api_key(secure_config=None):
+    """
+    Busca la API Key en orden de prioridad.
+
+    Returns:
+        Tupla (api_key, origen) con origen 'env', 'config' o 'legacy';
+        (None, None) si no se encuentra
+    """
+    # Prioridad 1: Variable de entorno
+    api_key = os.environ.get('GOOGLE_PLACES_API_KEY')
+    if api_key and api_key.strip():
+        return api_key.strip(), 'env'
+
+    # Prioridad 2: Archivo cifrado
+    secure_config = secure_config or SecureConfig()
+    api_key = secure_config.load_api_key()
+    if api_key:
+        return api_key, 'config'
+
+    # Prioridad 3: Archivo de texto plano legacy (compatibilidad con versiones anteriores)
+    if os.path.isfile(LEGACY_API_KEY_FILE):
+        with open(LEGACY_API_KEY_FILE, 'r', encoding='utf-8') as f:
+            api_key = f.read().strip()
+        if api_key:
+            return api_key, 'legacy'
+
+    return None, None
+
+def find_api_keys(secure_config=None):
+    """
+    Reúne el pool de API Keys: la key principal (find_api_key), las de la
+    variable GOOGLE_PLACES_API_KEYS (entradas separadas por ';') y las del
+    pool cifrado. Cada entrada admite "KEY[,qps[,presupuesto_diario[,etiqueta]]]".
+
+    Returns:
+        Lista de dicts con key y, opcionalmente, qps, daily_budget y label
+    """
+    secure_config = secure_config or SecureConfig()
+    entries = []
+    api_key, source = find_api_key(secure_config)
+    if api_key:
+        entries.append({'key': api_key, 'label': 'Principal'})
+
+    for text in os.environ.get('GOOGLE_PLACES_API_KEYS', '').split(';'):
+        entry = parse_key_entry(text)
+        if entry:
+            entries.append(entry)
+
+    entries.extend(secure_config.load_key_pool())
+    return entries
+
+@dataclass(slots=True)
+class BusinessData:
+    """
+    Registro de un negocio. Con slots y cadenas compartidas para poder
+    mantener cientos de miles en memoria.
+    """
+    title: str
+    phone: Optional[str] = None
+    website: Optional[str] = None
+    address: Optional[str] = None
+    place_id: Optional[str] = None
+    rating: Optional[float] = None
+    total_ratings: Optional[int] = None
+    opening_hours: Optional[Hours] = None  # Rangos en minutos de la semana (scraper_hours)
+    price_level: Optional[int] = None
+    email: Optional[str] = None
+    image_path: Optional[str] = None
+
+    def __post_init__(self):
+        # Webs y emails se repiten en cadenas y franquicias: una sola copia
+        if self.website:
+            self.website = sys.intern(self.website)
+        if self.email:
+            self.email = sys.intern(self.email)
+        # Tras pasar por JSON (cola) los rangos llegan como listas
+        self.opening_hours = intern_hours(self.opening_hours)
+
+    def is_open_at(self, when) -> Optional[bool]:
+        """Indica si está abierto en `when` (hora local del negocio); None si no hay horarios"""
+        return is_open_at(self.opening_hours, when)
+
+@dataclass(frozen=True)
+class ScrapeOptions:
+    """Configuración inmutable de una ejecución de scraping"""
+    fields: FrozenSet[str] = field(
+        default_factory=lambda: frozenset(f for f, enabled in DEFAULT_FIELDS.items() if enabled))
+    max_results: Optional[int] = None  # None = sin límite (máx 60 por keyword)
+    min_delay: float = 1.5
+    max_delay: float = 3.0
+    batch_size: int = 5
+    batch_delay: float = 10.0
+    workers: int = 1  # Negocios procesados en paralelo
+    data_dir: str = 'data'
+    area: Optional[str] = None  # Ciudad o "lat1,lng1,lat2,lng2": búsqueda por cuadrícula
+    search_cache_ttl: float = DEFAULT_SEARCH_CACHE_TTL_HOURS  # Horas; 0 = sin cache
+    refresh_search: bool = False  # Ignorar la cache y volver a buscar
+    search_qps: float = DEFAULT_SEARCH_QPS  # Ritmo máximo de la fase de búsqueda
+    backend: str = BACKEND_LEGACY  # API de Places: 'legacy' o 'new' (Places API (New))
+    page_size: int = MAX_PAGE_SIZE  # Resultados por página de búsqueda (solo Places API (New))
+    api_base_url: Optional[str] = None  # URL base del backend; None = PLACES_API_URL / PLACES_NEW_API_URL
+    http_record: Optional[str] = None  # Archivo donde grabar las respuestas HTTP
+    http_replay: Optional[str] = None  # Archivo del que reproducirlas (sin red)
+    replay_timing: float = 0.0  # Fracción de la latencia grabada: 1 = original, 0 = sin esperas
+    profile: bool = False  # Tiempo real/CPU por fase y volcado de cProfile junto al dataset
+    run_log: bool = False  # Log estructurado (JSON Lines) de la ejecución junto al dataset
+    dedup: Optional[str] = None  # Duplicados al guardar: None, 'flag' (marcar) o 'merge' (fusionar)
+    compression: Optional[str] = None  # Datasets nuevos comprimidos: None, 'gzip' o 'xz'
+    site_budget: float = DEFAULT_SITE_BUDGET_SECONDS  # Segundos máximos buscando email en un sitio
+    host_cooldown: float = DEFAULT_HOST_COOLDOWN_SECONDS  # Segundos que se salta un host caído
+    email_scope: str = DEFAULT_EMAIL_SCOPE  # Email compartido: 'url', 'domain' (por host) o 'location' (página y host)
+    budget: Optional[float] = None  # USD máximos de la ejecución; al alcanzarlos se detiene
+
+    def __post_init__(self):
+        # Aceptar cualquier iterable de campos y validarlo
+        fields = frozenset(self.fields)
+        unknown = fields - set(DEFAULT_FIELDS)
+        if unknown:
+            raise ValueError(f"Campos desconocidos: {', '.join(sorted(unknown))}")
+        object.__setattr__(self, 'fields', fields)
+        if self.workers < 1:
+            raise ValueError("workers debe ser al menos 1")
+        if self.search_qps <= 0:
+            raise ValueError("search_qps debe ser mayor que 0")
+        if self.backend not in BACKENDS:
+            raise ValueError(f"backend debe ser uno de: {', '.join(BACKENDS)}")
+        if not 1 <= self.page_size <= MAX_PAGE_SIZE:
+            raise ValueError(f"page_size debe estar entre 1 y {MAX_PAGE_SIZE}")
+        area = (self.area or '').strip() or None
+        if area:
+            BoundingBox.parse(area)  # Valida las coordenadas si es un rectángulo
+        object.__setattr__(self, 'area', area)
+        base_url = (self.api_base_url or '').strip().rstrip('/') or None
+        if base_url and not base_url.startswith(('http://', 'https://')):
+            raise ValueError("api_base_url debe empezar por http:// o https://")
+        object.__setattr__(self, 'api_base_url', base_url)
+        if self.http_record and self.http_replay:
+            raise ValueError("No se puede grabar y reproducir a la vez")
+        if self.replay_timing < 0:
+            raise ValueError("replay_timing no puede ser negativo")
+        if self.site_budget < MIN_SITE_TIMEOUT:
+            raise ValueError(f"site_budget debe ser al menos {MIN_SITE_TIMEOUT:g} s")
+        if self.host_cooldown < 0:
+            raise ValueError("host_cooldown no puede ser negativo")
+        if self.email_scope not in EMAIL_SCOPES:
+            raise ValueError(f"email_scope debe ser uno de: {', '.join(EMAIL_SCOPES)}")
+        if self.dedup is not None and self.dedup not in DEDUP_MODES:
+            raise ValueError(f"dedup debe ser uno de: {', '.join(DEDUP_MODES)}")
+        if self.compression is not None and self.compression not in COMPRESSIONS:
+            raise ValueError(f"compression debe ser uno de: {', '.join(COMPRESSIONS)}")
+        if self.budget is not None and self.budget <= 0:
+            raise ValueError("budget debe ser mayor que 0")
+
+    def wants(self, field_name: str) -> bool:
+        """Indica si el campo está seleccionado"""
+        return field_name in self.fields
+
+@dataclass
+class RunSummary:
+    """Resultado de ScraperEngine.run()"""
+    found: int = 0      # Resultados de búsqueda (con duplicados)
+    new: int = 0        # Negocios nuevos a procesar
+    processed: int = 0  # Negocios con detalles obtenidos
+    changed: int = 0    # Refresco: filas que han cambiado
+    filepath: Optional[str] = None
+    stopped: bool = False
+
+class ScraperEngine:
+    """
+    Motor de scraping de Google Places sin dependencias de Tk.
+
+    Args:
+        api_key: API Key de Google Places
+        options: ScrapeOptions de la ejecución
+        on_log: callback(mensaje) para el registro de actividad
+        on_progress: callback(mensaje, valor, máximo) para el progreso
+        on_api_call: callback(tipo, costo) tras cada llamada facturable
+        metrics: RunMetrics compartido (se crea uno si no se indica)
+    """
+
+    def __init__(self, api_key, options=None, on_log=None, on_progress=None,
+                 on_api_call=None, metrics=None):
+        if isinstance(api_key, ApiKeyPool):
+            self.key_pool = api_key
+        else:
+            keys = list(api_key) if isinstance(api_key, (list, tuple)) else [api_key] if api_key else []
+            # Una reproducción no gasta cuota: no se anota en el consumo diario
+            replaying = options is not None and options.http_replay
+            usage_file = None if replaying else os.path.join(get_app_dir(), KEY_USAGE_FILE)
+            self.key_pool = ApiKeyPool(keys, usage_file=usage_file)
+        self.api_key = self.key_pool.primary_key  # Compatibilidad: primera key del pool
+        self.options = options or ScrapeOptions()
+        if self.options.http_replay:
+            self.http_archive = HttpArchive(self.options.http_replay, 'replay')
+        elif self.options.http_record:
+            self.http_archive = HttpArchive(self.options.http_record, 'record')
+        else:
+            self.http_archive = None
+        self.profiler = RunProfiler() if self.options.profile else None
+        self.run_id = new_run_id()
+        self.run_log = None  # RunLog abierto durante run(), run_queue() o refresh_stale()
+        self.on_log = on_log
+        self.on_progress = on_progress
+        self.on_api_call = on_api_call
+        self.metrics = metrics or RunMetrics()
+        self.logger = logging.getLogger('GMBScraper')
+
+        self.stop_event = threading.Event()
+        self.data_lock = threading.Lock()
+        self.scraped_data = []
+        self.api_calls_count = 0
+        self.estimated_cost = 0.0
+        self.calls_by_type = Counter()  # Tipo de llamada -> llamadas facturadas
+        self.sku_calls = Counter()      # SKU -> llamadas facturadas
+        self.budget_warned = False
+        self.budget_exhausted = False
+        self.run_info = None  # Datos de run() que se guardan en las métricas para estimar
+        self.visited_websites_no_email = set()  # Cache de URLs sin email (website_key)
+        self.inflight = SingleFlight()  # Details y webs en curso: las repetidas esperan a la primera
+        self.websites = WebsiteResolver()  # Redirecciones de las webs ya vistas
+        self.website_emails = {}  # Email encontrado por dominio o URL canónica
+        self.host_breaker = HostCircuitBreaker(self.options.host_cooldown)  # Hosts caídos
+        self.area_cache = {}  # Zona de búsqueda -> BoundingBox
+        self.backend = self.options.backend
+        if self.backend == BACKEND_NEW:
+            base_url, new_base_url = PLACES_API_URL, self.options.api_base_url or PLACES_NEW_API_URL
+            # El token de página de Places API (New) vale en el acto
+            self.page_token_delay = 0.0
+        else:
+            base_url, new_base_url = self.options.api_base_url or PLACES_API_URL, PLACES_NEW_API_URL
+            self.page_token_delay = PAGE_TOKEN_DELAY
+        self.search_covers = self.search_covered_fields()
+        self.url_text_search = f"{base_url}/textsearch/json"
+        self.url_place_details = f"{base_url}/details/json"
+        self.url_place_photo = f"{base_url}/photo"
+        self.url_new_api = new_base_url  # Places API (New): places:searchText, places/<id>, <foto>/media
+        self.url_search_text = f"{new_base_url}/places:searchText"
+        self._search_cache = None
+
+    def search_covered_fields(self):
+        """
+        Campos de Details que trae la búsqueda con los campos seleccionados:
+        con Places API (New) todos (van en la máscara), con la legacy los fijos
+        de Text Search. Se recalcula cada vez que cambian las opciones.
+        """
+        if self.backend == BACKEND_NEW:
+            return tuple(plan_details_fields(self.options.fields))
+        return SEARCH_RESULT_FIELDS
+
+    def log(self, message):
+        if self.run_log is not None:
+            self.run_log.message(message)
+        if self.on_log:
+            self.on_log(message)
+        else:
+            self.logger.info(message)
+
+    def progress(self, message, value=None, maximum=None):
+        if self.on_progress:
+            self.on_progress(message, value, maximum)
+
+    def stop(self):
+        """Solicita detener la ejecución en curso"""
+        self.stop_event.set()
+
+    @property
+    def is_stopped(self):
+        return self.stop_event.is_set()
+
+    def increment_api_calls(self, call_type=CALL_DETAILS, fields=None):
+        """
+        Incrementa contador de API calls y actualiza el costo según los SKUs
+        de la llamada (fields: campos de Details o máscara de Places API (New))
+        """
+        endpoint = CALL_TYPE_ENDPOINTS[call_type]
+        cost = call_cost(endpoint, fields, self.backend)
+        budget = self.options.budget
+        with self.data_lock:
+            self.api_calls_count += 1
+            self.estimated_cost += cost
+            self.calls_by_type[call_type] += 1
+            self.sku_calls.update(call_skus(endpoint, fields, self.backend))
+            spent = self.estimated_cost
+            warn = bool(budget) and not self.budget_warned and spent >= budget * BUDGET_WARNING_FRACTION
+            if warn:
+                self.budget_warned = True
+        if warn:
+            self.log(f"💸 Gastado ${spent:.2f} de un presupuesto de ${budget:.2f}")
+        if self.on_api_call:
+            self.on_api_call(call_type, cost)
+
+    def check_budget(self, endpoint, fields=None):
+        """
+        Indica si la llamada cabe en el presupuesto; si no, detiene la
+        ejecución. Las llamadas ya en curso en otros workers pueden
+        superarlo como mucho en su propio coste.
+        """
+        budget = self.options.budget
+        if not budget:
+            return True
+        with self.data_lock:
+            if self.estimated_cost + call_cost(endpoint, fields, self.backend) <= budget + 1e-9:
+                return True
+            first = not self.budget_exhausted
+            self.budget_exhausted = True
+        if first:
+            self.log(f"💸 Presupuesto de ${budget:.2f} alcanzado (${self.estimated_cost:.2f}). Deteniendo la ejecución")
+            self.stop()
+        return False
+
+    def http_get(self, endpoint, url, **kwargs):
+        """requests.get con registro de latencia, estado y bytes por endpoint"""
+        return self.http_request('GET', endpoint, url, kwargs.get('params'), **kwargs)
+
+    def http_request(self, method, endpoint, url, identity=None, **kwargs):
+        """
+        requests.request con registro de latencia, estado y bytes por
+        endpoint. identity son los parámetros que identifican la petición al
+        grabarla o reproducirla (en un GET, los de la URL).
+        """
+        archive = self.http_archive
+        if archive is not None and not archive.recording:
+            return self._replay_get(endpoint, url, identity)
+
+        start = time.perf_counter()
+        try:
+            response = requests.request(method, url, **kwargs)
+        except requests.RequestException as e:
+            latency = time.perf_counter() - start
+            self.metrics.record_call(endpoint, latency, type(e).__name__)
+            if archive is not None:
+                archive.record(url, identity, 0, None, b'', latency, type(e).__name__)
+            raise
+
+        latency = time.perf_counter() - start
+        status = response.status_code if response.status_code >= 400 else None
+        self.metrics.record_call(endpoint, latency, status, len(response.content))
+        if archive is not None:
+            archive.record(url, identity, response.status_code,
+                           response.headers.get('Content-Type'), response.content, latency)
+        return response
+
+    def _replay_get(self, endpoint, url, params):
+        """http_request en modo reproducción: respuesta grabada en lugar de la red"""
+        start = time.perf_counter()
+        recorded = self.http_archive.replay(url, params)
+        if recorded is None:
+            self.metrics.record_call(endpoint, time.perf_counter() - start, 'NotRecorded')
+            raise requests.ConnectionError(f"Petición no grabada: {canonical_request(url, params)}")
+
+        if self.options.replay_timing > 0:
+            self.stop_event.wait(recorded.latency * self.options.replay_timing)
+        if recorded.error:
+            self.metrics.record_call(endpoint, time.perf_counter() - start, recorded.error)
+            error_class = getattr(requests.exceptions, recorded.error, requests.RequestException)
+            raise error_class(f"{recorded.error} (reproducido)")
+
+        response = requests.models.Response()
+        response.status_code = recorded.status
+        response.reason = HTTP_REASONS.get(recorded.status, '')
+        response.url = canonical_request(url, params)
+        response._content = recorded.body
+        if recorded.content_type:
+            response.headers['Content-Type'] = recorded.content_type
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        status = recorded.status if recorded.status >= 400 else None
+        self.metrics.record_call(endpoint, time.perf_counter() - start, status, len(recorded.body))
+        return response
+
+    def api_get(self, endpoint, url, params, **kwargs):
+        """
+        GET a la API de Places con una key del pool.
+
+        Si la respuesta indica un problema de la key (REQUEST_DENIED,
+        OVER_QUERY_LIMIT o HTTP 403/429) y hay otra key disponible, la
+        petición se repite con ella. Con una sola key se devuelve la
+        respuesta tal cual y el llamador aplica su propio manejo.
+        """
+        return self._call_with_key(
+            endpoint, params.get('fields'),
+            lambda key: self.http_get(endpoint, url, params=dict(params, key=key), **kwargs))
+
+    def places_request(self, endpoint, url, mask=None, body=None, params=None, **kwargs):
+        """
+        Petición a Places API (New) con una key del pool, como api_get: POST
+        con body JSON (places:searchText) o GET sin él (detalles, fotos). La
+        key y la máscara de campos van en las cabeceras.
+        """
+        identity = request_identity(params, body, mask)
+
+        def send(key):
+            headers = {API_KEY_HEADER: key}
+            if mask:
+                headers[FIELD_MASK_HEADER] = mask
+            return self.http_request('POST' if body is not None else 'GET', endpoint, url, identity,
+                                     params=params, json=body, headers=headers, **kwargs)
+
+        return self._call_with_key(endpoint, mask, send)
+
+    def _call_with_key(self, endpoint, fields, send):
+        """send(key) con una key del pool y cambio de key si la respuesta indica un problema de la key"""
+        if not self.check_budget(endpoint, fields):
+            raise requests.RequestException("Presupuesto agotado")
+        attempts = max(1, len(self.key_pool))
+        for attempt in range(attempts):
+            try:
+                key_state = self.key_pool.acquire(self.stop_event)
+            except NoApiKeyAvailable as e:
+                if not self.is_stopped:
+                    self.log(f"❌ {e}. Deteniendo la ejecución")
+                    self.stop()
+                raise requests.RequestException(str(e))
+
+            response = send(key_state.key)
+            status = api_response_status(response)
+            if status not in FAILOVER_STATUSES:
+                self.key_pool.record_call(key_state, call_cost(endpoint, fields, self.backend), status)
+                return response
+
+            self.key_pool.report_failure(key_state, status)
+            if attempt + 1 < attempts and self.key_pool.has_alternative(key_state):
+                self.log(f"🔑 {key_state.label}: {status}, cambiando de API Key")
+                self.metrics.record_retry(endpoint, status)
+                continue
+            return response
+        return response
+
+    def validate_api_key(self):
+        """Valida las API keys del pool haciendo una petición de prueba con cada una"""
+        if not len(self.key_pool):
+            return False
+
+        valid = 0
+        for key_state in self.key_pool.keys:
+            label = f" ({key_state.label})" if len(self.key_pool) > 1 else ""
+            try:
+                self.log(f"🔍 Validando API Key{label}...")
+                if self.backend == BACKEND_NEW:
+                    # Solo el id: nivel IDs Only, sin coste
+                    body = search_body('test', page_size=1)
+                    response = self.http_request(
+                        'POST', ENDPOINT_TEXT_SEARCH, self.url_search_text, request_identity(body=body),
+                        json=body, headers={API_KEY_HEADER: key_state.key, FIELD_MASK_HEADER: 'places.id'},
+                        timeout=10)
+                    data = legacy_status(response)
+                else:
+                    params = {
+                        'query': 'test',
+                        'key': key_state.key
+                    }
+                    response = self.http_get(ENDPOINT_TEXT_SEARCH, self.url_text_search, params=params, timeout=10)
+                    data = response.json()
+
+                status = data.get('status', 'UNKNOWN')
+
+                if status == 'REQUEST_DENIED':
+                    error_msg = data.get('error_message', 'API Key inválida o sin permisos')
+                    self.log(f"❌ API Key inválida{label}: {error_msg}")
+                    self.key_pool.report_failure(key_state, status)
+                elif status == 'INVALID_REQUEST' or status == 'ZERO_RESULTS' or status == 'OK':
+                    # Estos estados significan que la API key es válida
+                    self.log(f"✅ API Key válida{label}")
+                    valid += 1
+                else:
+                    self.log(f"⚠️ Estado inesperado{label}: {status}")
+                    if status == 'OVER_QUERY_LIMIT':
+                        self.key_pool.report_failure(key_state, status)
+
+            except requests.RequestException as e:
+                self.log(f"❌ Error validando API Key{label}: {e}")
+
+        if valid and len(self.key_pool) > 1:
+            self.log(f"🔑 {valid}/{len(self.key_pool)} API Keys disponibles en el pool")
+        return valid > 0
+
+    @property
+    def search_cache(self):
+        """Cache persistente de Text Search en data_dir (None si está desactivada)"""
+        if self._search_cache is None and self.options.search_cache_ttl > 0:
+            self._search_cache = SearchCache(
+                os.path.join(self.options.data_dir, SEARCH_CACHE_FILE),
+                self.options.search_cache_ttl)
+        return self._search_cache
+
+    def output_path(self, filename):
+        """
+        Ruta del dataset: <data_dir>/nombre-archivo/nombre-archivo.ext, con
+        .gz o .xz si ya existe comprimido o si se pide compresión
+        """
+        folder = os.path.splitext(filename)[0]
+        return resolve_dataset_path(os.path.join(self.options.data_dir, folder, filename),
+                                    self.options.compression)
+
+    def run_file_path(self, filename, suffix):
+        """Archivo de la ejecución junto al dataset: <carpeta>-<fecha><suffix>"""
+        folder = os.path.splitext(filename)[0]
+        run_stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.metrics.started_at))
+        return os.path.join(self.options.data_dir, folder, f"{folder}-{run_stamp}{suffix}")
+
+    def open_run_log(self, filename):
+        """Abre el log estructurado de la ejecución si está activado"""
+        if not self.options.run_log or self.run_log is not None:
+            return
+        run_log_path = self.run_file_path(filename, RUN_LOG_SUFFIX)
+        try:
+            os.makedirs(os.path.dirname(run_log_path), exist_ok=True)
+            self.run_log = RunLog(run_log_path, self.run_id)
+        except OSError as e:
+            self.log(f"⚠️ No se pudo abrir el log estructurado: {e}")
+            return
+        self.log(f"🧾 Ejecución {self.run_id}: log estructurado en {run_log_path}")
+
+    def close_run_log(self):
+        run_log, self.run_log = self.run_log, None
+        if run_log is not None:
+            run_log.close()
+
+    def place_scope(self, place_id):
+        """Contexto del log estructurado para los mensajes de un negocio"""
+        return self.run_log.place(place_id) if self.run_log is not None else nullcontext()
+
+    def save_run_metrics(self, filename):
+        """Guarda las métricas de la ejecución junto al dataset y cierra su log estructurado"""
+        metrics_path = self.run_file_path(filename, '.metrics.json')
+        self.key_pool.save_usage()
+        if self.http_archive is not None:
+            self.http_archive.flush()
+            stats = self.http_archive.stats()
+            if self.http_archive.recording:
+                self.log(f"🎞️ Grabadas {stats['responses']} respuestas HTTP "
+                         f"({stats['compressed_bytes'] / 1024:.0f} KB) en: {self.http_archive.filepath}")
+            elif stats['missing']:
+                self.log(f"⚠️ Reproducción: {stats['missing']} peticiones no estaban grabadas")
+        extra = {'run_id': self.run_id, 'hosts': self.host_breaker.stats(),
+                 'cost': {'usd': round(self.estimated_cost, 4), 'budget': self.options.budget,
+                          'calls': dict(self.calls_by_type), 'skus': dict(self.sku_calls)}}
+        if self.run_info:
+            extra['run'] = self.run_info
+        if extra['hosts']['skipped_requests']:
+            self.log(f"🔌 {extra['hosts']['skipped_requests']} peticiones a sitios web caídos evitadas")
+        if self.profiler:
+            extra['phases'] = self.profiler.snapshot()
+        try:
+            self.metrics.save(metrics_path, extra)
+            self.log(f"📈 Métricas guardadas en: {metrics_path}")
+        except (IOError, OSError) as e:
+            self.log(f"⚠️ Error guardando métricas: {e}")
+        if self.profiler:
+            self.save_profile(self.run_file_path(filename, '.prof'))
+        self.close_run_log()
+
+    def save_profile(self, profile_path):
+        """Registra los tiempos por fase y guarda el volcado de cProfile"""
+        self.log("🔬 Perfilado por fase (tiempo real / CPU del hilo):")
+        for line in self.profiler.summary_lines():
+            self.log(f"   {line}")
+        try:
+            hottest = self.profiler.dump(profile_path)
+        except (IOError, OSError) as e:
+            self.log(f"⚠️ Error guardando el perfil: {e}")
+            return
+        if hottest:
+            self.log("   Funciones con más tiempo propio:")
+            for func, seconds in hottest:
+                self.log(f"     {seconds:7.3f} s  {func}")
+            self.log(f"🔬 Perfil de CPU guardado en: {profile_path} (python -m pstats)")
+
+    def save_checkpoint(self, filename, processed_count):
+        """Guarda checkpoint del progreso actual"""
+        checkpoint_file = os.path.join(get_app_dir(), '.scraper_checkpoint.json')
+
+        checkpoint_data = {
+            'filename': filename,
+            'processed_count': processed_count,
+            'timestamp': time.time(),
+            'scraped_data_count': len(self.scraped_data)
+        }
+
+        try:
+            with open(checkpoint_file, 'w', encoding='utf-8') as f:
+                json.dump(checkpoint_data, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            self.log(f"⚠️ Error guardando checkpoint: {e}")
+
+    def clear_checkpoint(self):
+        """Elimina el archivo de checkpoint"""
+        checkpoint_file = os.path.join(get_app_dir(), '.scraper_checkpoint.json')
+
+        try:
+            if os.path.exists(checkpoint_file):
+                os.remove(checkpoint_file)
+        except Exception as e:
+            self.log(f"⚠️ Error eliminando checkpoint: {e}")
+
+    def load_existing_place_ids(self, filename, output_format):
+        """Carga place_ids existentes del archivo para evitar duplicados"""
+        # El archivo está en data/nombre-archivo/nombre-archivo.ext
+        filepath = self.output_path(filename)
+        existing_place_ids = set()
+
+        if not os.path.exists(filepath):
+            return existing_place_ids
+
+        try:
+            if output_format == "csv":
+                with open_dataset(filepath, 'r', encoding='utf-8') as csvfile:
+                    reader = csv.DictReader(csvfile)
+                    for row in reader:
+                        if 'place_id' in row and row['place_id']:
+                            existing_place_ids.add(row['place_id'])
+                        # place_ids fusionados como duplicados: no volver a procesarlos
+                        existing_place_ids.update(i for i in (row.get(MERGED_IDS_FIELD) or '').split(';') if i)
+            else:  # JSON (leído por partes: la memoria no crece con el archivo)
+                with open_dataset(filepath, 'r', encoding='utf-8') as f:
+                    for item in iter_json_array(f):
+                        if 'place_id' in item and item['place_id']:
+                            existing_place_ids.add(item['place_id'])
+                        existing_place_ids.update(i for i in (item.get(MERGED_IDS_FIELD) or '').split(';') if i)
+        except DATASET_READ_ERRORS + (csv.Error,) as e:
+            self.log(f"⚠️ Error leyendo archivo existente: {e}")
+            return set()
+
+        return existing_place_ids
+
+    @profiled(PHASE_EMAIL)
+    def extract_email_from_website(self, website_url):
+        """
+        Extrae emails del sitio web del negocio. La URL se canonicaliza y, con
+        email_scope 'domain' o 'location', el resultado se comparte entre
+        todas las sucursales con el mismo host (ver scraper_websites).
+        """
+        url = self.resolve_website(website_url)
+        domain = site_domain(url) if self.options.email_scope != EMAIL_SCOPE_URL else None
+        if domain is None:
+            return self._site_email(url, url)
+
+        root = f"{origin_of(url)}/"
+        if self.options.email_scope == EMAIL_SCOPE_LOCATION and url != root:
+            # Página propia de la sucursal, sin probar páginas de contacto
+            email = self._site_email(url, url, search_contact=False)
+            if email:
+                return email
+        return self._site_email(domain, root)
+
+    def resolve_website(self, website_url):
+        """URL canónica de la web con las redirecciones conocidas; los acortadores se resuelven una vez"""
+        url = self.websites.resolve(website_url)
+        if self.http_archive is not None or not self.websites.needs_lookup(url):
+            return url
+
+        def lookup():
+            try:
+                response = self.http_request('HEAD', ENDPOINT_WEBSITE, url, allow_redirects=True,
+                                             timeout=CONTACT_PAGE_TIMEOUT)
+                self.websites.record(url, response.url)
+            except requests.RequestException:
+                self.websites.record(url, url)  # No se vuelve a intentar
+
+        self.inflight.do(('redirect', url), lookup)
+        return self.websites.resolve(url)
+
+    def _site_email(self, key, url, search_contact=True):
+        """
+        Email de un sitio (key: dominio o URL canónica). Se recorre una sola
+        vez: los siguientes negocios reciben el resultado guardado y, si el
+        recorrido sigue en curso, esperan a que termine.
+        """
+        if key in self.website_emails:
+            self.metrics.record_cache_hit(ENDPOINT_WEBSITE)
+            self.log(f"   ♻️ Email de {key} ya encontrado: {self.website_emails[key]}")
+            return self.website_emails[key]
+        # Verificar si ya intentamos buscar en esta URL sin éxito
+        if key in self.visited_websites_no_email:
+            return None
+        email, shared = self.inflight.do(('website', key), self._crawl_website, url, key, search_contact)
+        if shared:
+            self.metrics.record_shared(ENDPOINT_WEBSITE)
+            self.log(f"   ♻️ {key} ya se estaba recorriendo: {email or 'sin email'}")
+        elif email:
+            self.website_emails[key] = email
+        return email
+
+    def _crawl_website(self, website_url, key, search_contact=True):
+        """Extrae emails del sitio web del negocio con búsqueda inteligente mejorada"""
+        host = host_of(website_url)
+        breaker = self.host_breaker
+        if breaker.is_open(host):
+            self.log(f"   🔌 {host} no respondía hace poco, se salta")
+            return None
+
+        from bs4 import BeautifulSoup
+
+        # Presupuesto de tiempo del sitio completo
+        budget = self.options.site_budget
+        deadline = time.monotonic() + budget
+        contact_deadline = deadline - min(HOMEPAGE_TIMEOUT, budget / 3)  # Reserva para la página principal
+
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+        }
+
+        # Patrón de email mejorado que incluye más TLDs
+        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,10}\b'
+
+        # Filtros menos restrictivos - solo excluir emails claramente no válidos
+        exclude_patterns = [
+            'noreply', 'no-reply', 'donotreply', 'example.com', 'test.com',
+            'placeholder', 'yourname', 'youremail', 'sample', 'demo'
+        ]
+
+        def filter_emails(emails_list):
+            """Filtra emails no válidos con criterios menos restrictivos"""
+            filtered = []
+            for email in emails_list:
+                email_lower = email.lower()
+                # Solo excluir si contiene patrones claramente no válidos
+                if not any(pattern in email_lower for pattern in exclude_patterns):
+                    # Validar que tenga formato básico correcto
+                    if '@' in email and '.' in email.split('@')[1]:
+                        filtered.append(email)
+            return filtered
+
+        def extract_from_soup(soup):
+            """Extrae emails de BeautifulSoup object con estrategias mejoradas"""
+            found_emails = []
+
+            # 1. Buscar mailto: links (más confiable)
+            mailto_links = soup.find_all('a', href=re.compile(r'^mailto:', re.I))
+            for link in mailto_links:
+                email = link['href'].replace('mailto:', '').split('?')[0].split('&')[0]
+                found_emails.append(email)
+
+            # 2. Buscar en elementos específicos de contacto (prioridad alta)
+            contact_selectors = [
+                'footer', '.footer', '#footer',
+                '.contact', '#contact', '.contact-info', '.contact-details',
+                '.email', '.email-address', '.mail',
+                '.info', '.information', '.datos-contacto',
+                'address', '.address', '.direccion'
+            ]
+
+            for selector in contact_selectors:
+                try:
+                    elements = soup.select(selector)
+                    for elem in elements:
+                        emails = re.findall(email_pattern, elem.get_text())
+                        found_emails.extend(emails)
+                except:
+                    continue
+
+            # 3. Buscar en meta tags y structured data
+            meta_tags = soup.find_all('meta', attrs={'name': re.compile(r'email|contact', re.I)})
+            for meta in meta_tags:
+                content = meta.get('content', '')
+                emails = re.findall(email_pattern, content)
+                found_emails.extend(emails)
+
+            # 4. Buscar en JSON-LD structured data
+            json_scripts = soup.find_all('script', type='application/ld+json')
+            for script in json_scripts:
+                try:
+                    data = json.loads(script.string)
+                    if isinstance(data, dict):
+                        # Buscar email en diferentes campos
+                        for key in ['email', 'contactPoint', 'contact']:
+                            if key in data:
+                                if isinstance(data[key], str):
+                                    emails = re.findall(email_pattern, data[key])
+                                    found_emails.extend(emails)
+                except:
+                    continue
+
+            # 5. Buscar en texto completo (última opción)
+            if not found_emails:
+                text_content = soup.get_text()
+                emails = re.findall(email_pattern, text_content)
+                found_emails.extend(emails)
+
+            # Filtrar y devolver el mejor email
+            filtered = filter_emails(found_emails)
+            if filtered:
+                # Priorizar emails que no sean de servicios gratuitos
+                business_emails = [e for e in filtered if not any(domain in e.lower()
+                                 for domain in ['gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com'])]
+                return business_emails[0] if business_emails else filtered[0]
+
+            return None
+
+        def site_get(url, timeout, until):
+            """GET acotado por el presupuesto del sitio y el cortacircuitos de su host"""
+            remaining = until - time.monotonic()
+            if remaining < MIN_SITE_TIMEOUT:
+                raise SiteSkipped(f"presupuesto de {budget:g} s agotado")
+            if breaker.is_open(host):
+                raise SiteSkipped("el host no responde")
+            try:
+                response = self.http_get(ENDPOINT_WEBSITE, url, headers=headers,
+                                         timeout=min(timeout, remaining))
+            except requests.ConnectionError as e:
+                # Conexión rechazada, DNS o timeout de conexión: el host está caído
+                breaker.record_failure(host)
+                raise SiteSkipped(f"el host no responde ({type(e).__name__})")
+            except requests.Timeout:
+                if breaker.record_failure(host, timeout=True):
+                    raise SiteSkipped("el host no responde (timeouts repetidos)")
+                raise
+            breaker.record_success(host)
+            if self.http_archive is None:
+                # Al grabar o reproducir no se aprenden, para repetir las mismas peticiones
+                self.websites.record(url, response.url)
+            return response
+
+        try:
+            # Parse base URL
+            parsed_url = urlparse(website_url)
+            base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
+
+            # 1. Intentar páginas de contacto ampliadas (timeout 8s)
+            contact_pages = [
+                '/contact', '/contacto', '/contact-us', '/contactenos', '/en/contact',
+                '/contact.html', '/contacto.html', '/contact.php', '/contacto.php',
+                '/about', '/sobre-nosotros', '/about-us', '/acerca-de',
+                '/info', '/informacion', '/information',
+                '/team', '/equipo', '/staff', '/personal'
+            ] if search_contact else []
+
+            if contact_pages:
+                self.log(f"   🔍 Buscando email en páginas de contacto...")
+            for contact_path in contact_pages:
+                if time.monotonic() + MIN_SITE_TIMEOUT > contact_deadline:
+                    break  # El resto del presupuesto es para la página principal
+                try:
+                    contact_url = urljoin(base_url, contact_path)
+                    response = site_get(contact_url, CONTACT_PAGE_TIMEOUT, contact_deadline)
+                    if response.status_code == 200:
+                        soup = BeautifulSoup(response.text, 'html.parser')
+                        email = extract_from_soup(soup)
+                        if email:
+                            self.log(f"   ✅ Email encontrado en {contact_path}: {email}")
+                            return email
+                except SiteSkipped:
+                    raise
+                except:
+                    continue
+
+            # 2. Buscar en página principal con análisis más profundo
+            self.log(f"   🔍 Buscando email en página principal...")
+            response = site_get(website_url, HOMEPAGE_TIMEOUT, deadline)
+            response.raise_for_status()
+            soup = BeautifulSoup(response.text, 'html.parser')
+            email = extract_from_soup(soup)
+
+            if email:
+                self.log(f"   ✅ Email encontrado en página principal: {email}")
+                return email
+            else:
+                # Agregar a cache de URLs sin email
+                self.visited_websites_no_email.add(key)
+                self.log(f"   ❌ No se encontró email válido en {website_url}")
+                return None
+
+        except SiteSkipped as e:
+            self.visited_websites_no_email.add(key)
+            self.log(f"   ⏭️ Se deja {website_url}: {e}")
+            return None
+        except Exception as e:
+            # Agregar a cache en caso de error
+            self.visited_websites_no_email.add(key)
+            self.log(f"   ⚠️ Error extrayendo email de {website_url}: {str(e)[:100]}")
+            return None
+
+    def _cached_search(self, business_name, location, radius, limit):
+        """Resultados desde la cache de búsquedas si cubren el límite, o None"""
+        cache = self.search_cache
+        if cache is None or self.options.refresh_search:
+            return None
+        try:
+            cached = cache.get(business_name, location, radius)
+        except sqlite3.Error as e:
+            self.log(f"⚠️ Error leyendo la cache de búsquedas: {e}")
+            return None
+        if cached is None:
+            return None
+
+        cached_results, has_more = cached
+        if has_more and (limit is None or len(cached_results) < limit):
+            return None
+        cached_results = cached_results[:limit] if limit is not None else cached_results
+        self.metrics.record_cache_hit(ENDPOINT_TEXT_SEARCH)
+        self.metrics.record_items('search', len(cached_results))
+        return cached_results
+
+    def _store_search(self, business_name, results, has_more, location=None, radius=None):
+        """Guarda una búsqueda completa en la cache"""
+        cache = self.search_cache
+        if cache is None:
+            return
+        try:
+            cache.put(business_name, results, has_more, location, radius)
+        except sqlite3.Error as e:
+            self.log(f"⚠️ Error guardando la cache de búsquedas: {e}")
+
+    def text_search(self, params, body=None, mask=None):
+        """
+        Una petición de Text Search con el backend de la ejecución: params en
+        la API legacy, body y máscara de campos en Places API (New)
+        """
+        if self.backend == BACKEND_NEW:
+            return self.places_request(ENDPOINT_TEXT_SEARCH, self.url_search_text, mask, body=body, timeout=10)
+        return self.api_get(ENDPOINT_TEXT_SEARCH, self.url_text_search, params, timeout=10)
+
+    def search_json(self, response):
+        """JSON de una respuesta de Text Search en el formato legacy"""
+        data = response.json()
+        return legacy_search_response(data) if self.backend == BACKEND_NEW else data
+
+    def search_page_size(self, limit):
+        """pageSize de una búsqueda: no más resultados por página de los que se van a usar"""
+        return min(self.options.page_size, limit) if limit else self.options.page_size
+
+    def _request_search_page(self, business_name, page_token=None, location=None, radius=None, page_size=None):
+        """Una petición a Text Search; devuelve el JSON (formato legacy) o None si la petición falló"""
+        params = {
+            'query': business_name,
+            'fields': 'place_id,name'
+        }
+        if location:
+            params['location'] = f"{location[0]},{location[1]}"
+            params['radius'] = int(radius)
+
+        if page_token:
+            params['pagetoken'] = page_token
+
+        mask = body = None
+        if self.backend == BACKEND_NEW:
+            # Todos los campos seleccionados en la búsqueda: no hace falta Place Details
+            extra = ([PHOTOS_FIELD] if self.options.wants('imagen') else []) + ([LOCATION_FIELD] if location else [])
+            mask = field_mask(self.search_covers, extra, search=True)
+            body = search_body(business_name, page_token, location, radius, page_size or self.options.page_size)
+
+        try:
+            response = self.text_search(params, body, mask)
+
+            # Manejar Rate Limiting (429)
+            if response.status_code == 429:
+                self.log("⚠️ Rate limit alcanzado en búsqueda. Esperando 60 segundos...")
+                self.metrics.record_retry(ENDPOINT_TEXT_SEARCH, 429)
+                time.sleep(60)
+                # Reintentar la misma petición
+                response = self.text_search(params, body, mask)
+
+            response.raise_for_status()
+            data = self.search_json(response)
+
+            # Incrementar contador de API calls
+            self.increment_api_calls(CALL_SEARCH, mask)
+            return data
+
+        except requests.exceptions.HTTPError as e:
+            if e.response.status_code == 403:
+                self.log(f"❌ Error 403: API Key sin permisos o Places API no habilitada")
+            else:
+                self.log(f"❌ Error HTTP {e.response.status_code}: {e}")
+        except requests.RequestException as e:
+            self.log(f"⚠️ Error buscando '{business_name}': {e}")
+        return None
+
+    def _parse_search_results(self, data, with_location=False):
+        """Convierte una página de Text Search en dicts de place_id y nombre"""
+        businesses = []
+        for result in data.get('results', []):
+            if result.get('place_id'):
+                business = {
+                    'place_id': result.get('place_id'),
+                    'name': result.get('name', 'Sin nombre'),
+                    'search': search_payload(result, self.search_covers)  # Evita pedir estos campos a Details
+                }
+                coords = result.get('geometry', {}).get('location')
+                if with_location and coords:
+                    business['lat'] = coords.get('lat')
+                    business['lng'] = coords.get('lng')
+                businesses.append(business)
+        self.metrics.record_items('search', len(businesses))
+        return businesses
+
+    def _page_token_not_ready(self, data, page_token, attempts):
+        """INVALID_REQUEST con pagetoken suele indicar que el token aún no está activo"""
+        if data.get('status') != 'INVALID_REQUEST' or not page_token:
+            return False
+        if attempts >= PAGE_TOKEN_MAX_RETRIES:
+            return False
+        self.metrics.record_retry(ENDPOINT_TEXT_SEARCH, 'INVALID_REQUEST')
+        return True
+
+    def search_businesses(self, business_name: str, location=None, radius=None,
+                          limit=-1) -> List[Dict]:
+        """
+        Busca múltiples negocios y retorna lista de place_ids con nombres.
+
+        Con location (lat, lng) y radius (metros) la búsqueda se centra en
+        esa zona; cada resultado incluye entonces sus coordenadas (lat, lng).
+        limit=-1 usa options.max_results y None recorre todas las páginas.
+        Los resultados se reutilizan desde la cache de búsquedas si hay una
+        entrada vigente que cubra el límite (salvo con refresh_search).
+        """
+        if limit == -1:
+            limit = self.options.max_results
+        return self._search_pages(business_name, location, radius, limit)[0]
+
+    @profiled(PHASE_SEARCH)
+    def _search_pages(self, business_name, location, radius, limit):
+        """Recorre las páginas de una búsqueda; devuelve (resultados, completa sin errores)"""
+        cached = self._cached_search(business_name, location, radius, limit)
+        if cached is not None:
+            if location is None:
+                self.log(f"   ♻️ Resultados desde la cache de búsquedas (sin llamadas a la API)")
+            return cached, True
+
+        all_results = []
+        next_page_token = None
+        complete = True  # Solo se guardan en cache búsquedas sin errores
+        attempts = 0
+        page_size = self.search_page_size(limit)
+
+        while limit is None or len(all_results) < limit:
+            data = self._request_search_page(business_name, next_page_token, location, radius, page_size)
+            if data is None:
+                complete = False
+                break
+
+            if self._page_token_not_ready(data, next_page_token, attempts):
+                attempts += 1
+                time.sleep(PAGE_TOKEN_RETRY_DELAY)
+                continue
+            if data.get('status') not in API_OK_STATUSES:
+                self.metrics.record_error(ENDPOINT_TEXT_SEARCH, data.get('status'))
+                complete = False
+
+            all_results.extend(self._parse_search_results(data, with_location=bool(location)))
+
+            # Verificar si hay más páginas
+            next_page_token = data.get('next_page_token')
+            attempts = 0
+            if not next_page_token or (limit is not None and len(all_results) >= limit):
+                break
+
+            # Delay requerido antes de usar next_page_token (solo en la API legacy)
+            time.sleep(self.page_token_delay)
+
+        if complete:
+            self._store_search(business_name, all_results, bool(next_page_token), location, radius)
+
+        return all_results, complete
+
+    @profiled(PHASE_SEARCH)
+    def search_keywords(self, keywords) -> Dict[str, List[Dict]]:
+        """
+        Busca varias keywords intercalando su paginación.
+
+        Mientras el next_page_token de una keyword se activa (~2 s), se
+        lanzan las primeras páginas de las demás; las páginas listas tienen
+        prioridad para terminar antes cada keyword. Las llamadas se espacian
+        según options.search_qps. Si el token aún no está activo la API
+        responde INVALID_REQUEST y la página se reintenta.
+
+        Returns:
+            Dict keyword -> lista de negocios (mismo formato que search_businesses)
+        """
+        limit = self.options.max_results
+        searched = {}
+        pending = deque()
+        for keyword in dict.fromkeys(keywords):
+            cached = self._cached_search(keyword, None, None, limit)
+            if cached is not None:
+                searched[keyword] = cached
+            else:
+                pending.append(keyword)
+
+        if searched:
+            self.log(f"♻️ {len(searched)} búsquedas desde la cache (sin llamadas a la API)")
+        total_searches = len(searched) + len(pending)
+
+        waiting = []  # heap de (listo_en, orden, estado) con páginas siguientes
+        sequence = 0
+        page_size = self.search_page_size(limit)
+        min_interval = 1.0 / self.options.search_qps
+        next_call_at = time.monotonic()
+
+        def finish(state, has_more=False):
+            results = state['results'][:limit] if limit is not None else state['results']
+            searched[state['keyword']] = results
+            self.progress(f"Buscando negocios {len(searched)}/{total_searches}...")
+            if state['complete']:
+                self._store_search(state['keyword'], results, has_more)
+
+        while (pending or waiting) and not self.is_stopped:
+            now = time.monotonic()
+            if waiting and waiting[0][0] <= now:
+                state = heapq.heappop(waiting)[2]
+            elif pending:
+                state = {'keyword': pending.popleft(), 'results': [], 'token': None,
+                         'attempts': 0, 'complete': True}
+            else:
+                self.stop_event.wait(waiting[0][0] - now)
+                continue
+
+            # Respetar el ritmo máximo de llamadas
+            if next_call_at > now:
+                self.stop_event.wait(next_call_at - now)
+            next_call_at = max(now, next_call_at) + min_interval
+
+            data = self._request_search_page(state['keyword'], state['token'], page_size=page_size)
+            if data is None:
+                state['complete'] = False
+                finish(state)
+                continue
+
+            if self._page_token_not_ready(data, state['token'], state['attempts']):
+                state['attempts'] += 1
+                sequence += 1
+                heapq.heappush(waiting, (time.monotonic() + PAGE_TOKEN_RETRY_DELAY, sequence, state))
+                continue
+            if data.get('status') not in API_OK_STATUSES:
+                self.metrics.record_error(ENDPOINT_TEXT_SEARCH, data.get('status'))
+                state['complete'] = False
+
+            state['results'].extend(self._parse_search_results(data))
+            token = data.get('next_page_token')
+            if token and (limit is None or len(state['results']) < limit):
+                state.update(token=token, attempts=0)
+                sequence += 1
+                heapq.heappush(waiting, (time.monotonic() + self.page_token_delay, sequence, state))
+            else:
+                finish(state, has_more=bool(token))
+
+        # Si se detuvo, conservar lo obtenido de las keywords a medias
+        for _, _, state in waiting:
+            state['complete'] = False
+            finish(state)
+
+        return searched
+
+    def resolve_area(self, area):
+        """
+        Convierte la zona de búsqueda en un BoundingBox.
+
+        Acepta "lat1,lng1,lat2,lng2" o el nombre de una ciudad o región, que
+        se resuelve con una búsqueda de texto (geometry.viewport del primer
+        resultado). Devuelve None si no se puede resolver.
+        """
+        if area in self.area_cache:
+            return self.area_cache[area]
+
+        bbox = BoundingBox.parse(area)
+        if bbox is None:
+            mask = field_mask(extra=[VIEWPORT_FIELD], search=True)
+            try:
+                response = self.text_search({'query': area}, search_body(area, page_size=1), mask)
+                response.raise_for_status()
+                data = self.search_json(response)
+                self.increment_api_calls(CALL_SEARCH, mask)
+            except requests.RequestException as e:
+                self.log(f"⚠️ Error resolviendo la zona '{area}': {e}")
+                return None
+
+            results = data.get('results', [])
+            viewport = results[0].get('geometry', {}).get('viewport') if results else None
+            if not viewport:
+                self.log(f"❌ No se encontró la zona '{area}' (estado: {data.get('status')})")
+                return None
+            bbox = BoundingBox.from_viewport(viewport)
+            self.log(f"🗺️ Zona '{area}': {bbox}")
+
+        self.area_cache[area] = bbox
+        return bbox
+
+    @profiled(PHASE_SEARCH)
+    def search_area(self, keyword, bbox) -> List[Dict]:
+        """
+        Búsqueda por cuadrícula adaptativa para superar el límite de 60.
+
+        Empieza con la zona completa y divide en cuatro cada celda que vuelve
+        llena (60 resultados) mientras siga aportando place_ids nuevos. Solo
+        se conservan los negocios situados dentro de la zona, sin duplicados.
+        """
+        limit = self.options.max_results
+        found = []
+        seen = set()
+        searched = 0
+
+        # Celdas iniciales dentro del radio máximo que admite la API
+        pending = [(bbox, 0)]
+        while any(cell.radius_m > MAX_SEARCH_RADIUS_M for cell, _ in pending):
+            pending = [(sub, 0) for cell, _ in pending for sub in cell.split()]
+
+        while pending and not self.is_stopped:
+            if limit is not None and len(found) >= limit:
+                break
+
+            cell, depth = pending.pop(0)
+            results = self.search_businesses(keyword, location=cell.center,
+                                             radius=cell.radius_m, limit=None)
+            searched += 1
+
+            new_in_cell = 0
+            for business in results:
+                lat, lng = business.pop('lat', None), business.pop('lng', None)
+                if lat is not None and not bbox.contains(lat, lng):
+                    continue
+                if business['place_id'] in seen:
+                    continue
+                seen.add(business['place_id'])
+                found.append(business)
+                new_in_cell += 1
+
+            saturated = len(results) >= TEXT_SEARCH_MAX_RESULTS
+            can_split = depth < MAX_TILE_DEPTH and cell.radius_m / 2 >= MIN_TILE_RADIUS_M
+            if saturated and new_in_cell and can_split:
+                pending.extend((sub, depth + 1) for sub in cell.split())
+                self.log(f"   🗺️ Celda {searched} (nivel {depth}, radio {cell.radius_m / 1000:.1f} km): "
+                         f"llena con {new_in_cell} nuevos, se divide en 4")
+            elif saturated and new_in_cell:
+                self.log(f"   ⚠️ Celda {searched} llena pero ya no se puede dividir más")
+
+        self.log(f"   🗺️ {searched} celdas buscadas, {len(found)} negocios únicos en la zona")
+        return found[:limit] if limit is not None else found
+
+    def details_fields(self, search=None):
+        """
+        Campos de Place Details según los campos seleccionados (determinan los
+        SKUs), sin los que ya trae el resultado de búsqueda search
+        """
+        return plan_details_fields(self.options.fields, search)
+
+    @profiled(PHASE_DETAILS)
+    def get_business_details(self, place_id: str, search=None) -> Optional[BusinessData]:
+        """
+        Detalles de un negocio. Con search (datos de su resultado de Text
+        Search) solo se piden a Details los campos que faltan, y si no falta
+        ninguno no se llama a la API.
+        """
+        fields = self.details_fields(search)
+        if not fields:
+            # Todo lo seleccionado venía en la búsqueda
+            self.metrics.record_cache_hit(ENDPOINT_DETAILS)
+            return self.build_business_data(place_id, search)
+
+        # Si el mismo place_id ya se está pidiendo (otra keyword, una tarea de
+        # la cola re-arrendada) se espera a esa respuesta en vez de repetirla
+        business_data, shared = self.inflight.do(('details', place_id, tuple(fields)),
+                                                 self._fetch_details, place_id, fields, search)
+        if not shared:
+            return business_data
+        self.metrics.record_shared(ENDPOINT_DETAILS)
+        return replace(business_data) if business_data else None
+
+    def _fetch_details(self, place_id, fields, search):
+        """Llamada a Place Details con los campos que faltan"""
+        if self.backend == BACKEND_NEW:
+            billed = field_mask(fields)
+            url = f"{self.url_new_api}/places/{place_id}"
+            send = lambda: self.places_request(ENDPOINT_DETAILS, url, billed, timeout=10)
+        else:
+            billed = fields
+            params = {
+                'place_id': place_id,
+                'fields': ','.join(fields)
+            }
+            send = lambda: self.api_get(ENDPOINT_DETAILS, self.url_place_details, params, timeout=10)
+
+        try:
+            response = send()
+
+            # Manejar Rate Limiting (429)
+            if response.status_code == 429:
+                self.log("⚠️ Rate limit alcanzado en detalles. Esperando 60 segundos...")
+                self.metrics.record_retry(ENDPOINT_DETAILS, 429)
+                time.sleep(60)
+                # Reintentar la misma petición
+                response = send()
+
+            response.raise_for_status()
+            payload = response.json()
+            if self.backend == BACKEND_NEW:
+                payload = {'status': 'OK', 'result': legacy_place(payload)}
+
+            # Incrementar contador de API calls
+            self.increment_api_calls(CALL_DETAILS, billed)
+            if payload.get('status') not in API_OK_STATUSES:
+                self.metrics.record_error(ENDPOINT_DETAILS, payload.get('status'))
+
+            # Lo que falte en la respuesta de Details se toma de la búsqueda
+            return self.build_business_data(place_id, dict(search or {}, **payload.get('result', {})))
+
+        except requests.exceptions.HTTPError as e:
+            if e.response.status_code == 403:
+                self.log(f"❌ Error 403: API Key sin permisos")
+            elif e.response.status_code == 404:
+                self.log(f"⚠️ Place ID no encontrado: {place_id}")
+            else:
+                self.log(f"❌ Error HTTP {e.response.status_code} para '{place_id}'")
+            return None
+        except requests.RequestException as e:
+            self.log(f"⚠️ Error obteniendo detalles para place_id '{place_id}': {e}")
+            return None
+
+    def build_business_data(self, place_id, result):
+        """BusinessData con solo los campos seleccionados a partir de un resultado con claves de Details"""
+        wants = self.options.wants
+        return BusinessData(
+            title=result.get('name', ''),
+            phone=result.get('formatted_phone_number') if wants('phone') else None,
+            website=result.get('website') if wants('website') else None,
+            address=result.get('formatted_address') if wants('address') else None,
+            place_id=place_id if wants('place_id') else None,
+            rating=result.get('rating') if wants('rating') else None,
+            total_ratings=result.get('user_ratings_total') if wants('total_ratings') else None,
+            opening_hours=parse_periods(result.get('opening_hours', {}).get('periods')) if wants('opening_hours') else None,
+            price_level=result.get('price_level') if wants('price_level') else None,
+            email=None  # Se llenará después si está habilitado
+        )
+
+    def get_photo_references_by_title(self, title, max_photos=1):
+        """Busca referencias de fotos por título del negocio"""
+        params = {'query': title}
+        mask = field_mask(extra=[PHOTOS_FIELD], search=True)
+        try:
+            resp = self.text_search(params, search_body(title, page_size=1), mask)
+            self.increment_api_calls(CALL_PHOTO_SEARCH, mask)
+            resp.raise_for_status()
+            results = self.search_json(resp).get('results', [])
+        except Exception as e:
+            self.log(f"⚠️ Error buscando fotos para '{title}': {str(e)}")
+            return []
+
+        refs = []
+        for place in results:
+            for photo in place.get('photos', []):
+                ref = photo.get('photo_reference')
+                if ref:
+                    refs.append(ref)
+                    if len(refs) >= max_photos:
+                        return refs
+        return refs
+
+    def fetch_image_data(self, photo_ref):
+        """Descarga el contenido binario de una foto (photo_reference legacy o foto de Places API (New))"""
+        try:
+            if is_photo_name(photo_ref):
+                r = self.places_request(ENDPOINT_PHOTO, f"{self.url_new_api}/{photo_ref}/media",
+                                        params={'maxWidthPx': PHOTO_MAX_WIDTH}, timeout=15)
+            else:
+                params = {'photoreference': photo_ref, 'maxwidth': PHOTO_MAX_WIDTH}
+                r = self.api_get(ENDPOINT_PHOTO, self.url_place_photo, params, timeout=15)
+            self.increment_api_calls(CALL_PHOTO)
+            r.raise_for_status()
+            return r.content
+        except Exception:
+            return None
+
+    def select_featured_image(self, refs):
+        """Selecciona la mejor imagen (preferiblemente apaisada)"""
+        if not refs: return None, None
+
+        from PIL import Image
+
+        for ref in refs:
+            data = self.fetch_image_data(ref)
+            if data:
+                try:
+                    img = Image.open(BytesIO(data))
+                    w, h = img.size
+                    if w >= h: # Preferimos apaisadas
+                        return ref, data
+                except Exception:
+                    pass
+
+        # Fallback a la primera si no hay apaisadas
+        ref = refs[0]
+        return ref, self.fetch_image_data(ref)
+
+    @profiled(PHASE_PHOTO)
+    def save_business_image(self, business_data, filename, photo_refs=None):
+        """
+        Descarga y guarda la imagen principal del negocio en data/<carpeta>/images/.
+        photo_refs son las referencias de su resultado de búsqueda; sin ellas
+        se buscan por título (una llamada más a Text Search).
+        """
+        self.log(f"📸 Buscando imagen para: {business_data.title}...")
+        if not photo_refs:
+            photo_refs = self.get_photo_references_by_title(business_data.title)
+        if not photo_refs:
+            self.log(f"   ❌ No se encontraron fotos")
+            return
+
+        ref, img_data = self.select_featured_image(photo_refs)
+        if not img_data:
+            self.log(f"   ⚠️ No se pudo descargar")
+            return
+
+        # Carpeta de imágenes dentro del directorio de la búsqueda
+        folder = os.path.splitext(filename)[0]
+        img_dir = os.path.join(self.options.data_dir, folder, 'images')
+        os.makedirs(img_dir, exist_ok=True)
+
+        # Nombre de archivo normalizado
+        safe_title = normalize_filename(business_data.title)
+        img_filename = f"{safe_title}.jpg"
+        img_path = os.path.join(img_dir, img_filename)
+
+        with open(img_path, 'wb') as f:
+            f.write(img_data)
+
+        business_data.image_path = os.path.join('images', img_filename)
+        self.metrics.record_items('image')
+        self.log(f"   ✅ Imagen guardada")
+
+    def process_business(self, business, filename):
+        """Obtiene detalles, imagen y email de un negocio encontrado en la búsqueda"""
+        search = business.get('search')  # Ausente en resultados de una cache anterior
+        with self.place_scope(business['place_id']):
+            # Obtener detalles (solo los que no trae la búsqueda)
+            business_data = self.get_business_details(business['place_id'], search)
+            if not business_data:
+                return None
+            return self.enrich_business(business_data, filename, (search or {}).get(SEARCH_PHOTOS_KEY))
+
+    def enrich_business(self, business_data, filename, photo_refs=None):
+        """Añade imagen y email (si están seleccionados) a un negocio con detalles"""
+        # Extraer imagen si está habilitado
+        if self.options.wants('imagen'):
+            self.save_business_image(business_data, filename, photo_refs)
+
+        # Extraer email del sitio web si está habilitado
+        if self.options.wants('email') and business_data.website:
+            self.log(f"   🔍 Buscando email en: {business_data.website}")
+            email = self.extract_email_from_website(business_data.website)
+            self.metrics.record_items('email')
+            if email:
+                business_data.email = email
+                self.log(f"   📧 Email encontrado: {email}")
+            else:
+                self.log(f"   ❌ No se encontró email en el sitio web")
+
+        return business_data
+
+    def _process_with_delay(self, index, total, business, filename):
+        """Tarea de un worker: procesa un negocio y aplica el delay entre peticiones"""
+        if self.is_stopped:
+            return None
+        self.log(f"🔍 Procesando [{index}/{total}]: {business['name']}")
+        business_data = self.process_business(business, filename)
+        self.stop_event.wait(random.uniform(self.options.min_delay, self.options.max_delay))
+        return business_data
+
+    def _record_result(self, business_data, filename):
+        """Acumula un resultado, guarda checkpoint y muestra los datos extraídos"""
+        with self.data_lock:
+            self.scraped_data.append(business_data)
+            processed_count = len(self.scraped_data)
+
+        # Guardar checkpoint cada 10 registros
+        if processed_count % 10 == 0:
+            self.save_checkpoint(filename, processed_count)
+            self.log(f"💾 Checkpoint guardado: {processed_count} registros procesados")
+
+        # Mostrar datos extraídos
+        self.log(f"✅ Datos extraídos para '{business_data.title}'")
+        if business_data.phone:
+            self.log(f"   📞 Teléfono: {business_data.phone}")
+        if business_data.website:
+            self.log(f"   🌐 Sitio web: {business_data.website}")
+        if business_data.address:
+            self.log(f"   📍 Dirección: {business_data.address}")
+        if business_data.rating:
+            self.log(f"   ⭐ Rating: {business_data.rating} ({business_data.total_ratings or 0} reseñas)")
+        if business_data.email:
+            self.log(f"   📧 Email: {business_data.email}")
+
+    def log_limit_settings(self):
+        """Informa del backend y del límite de resultados configurado"""
+        limit_val = self.options.max_results
+        if self.backend == BACKEND_NEW:
+            self.log(f"🆕 Places API (New): los campos seleccionados llegan en la búsqueda "
+                     f"({self.search_page_size(limit_val)} por página), sin Place Details")
+        if self.options.area:
+            self.log(f"🗺️ Búsqueda por cuadrícula en '{self.options.area}': "
+                     f"las celdas con 60 resultados se dividen automáticamente")
+            if limit_val is not None:
+                self.log(f"📋 Configurado para extraer hasta {limit_val} resultados por keyword")
+        elif limit_val is None:
+            self.log(f"📋 Configurado para extraer TODOS los resultados disponibles")
+            self.log(f"⚠️ Nota: Google Places API limita a 60 resultados por búsqueda")
+            self.log(f"💡 Tip: Para más resultados, usa búsquedas específicas (ej: 'restaurantes Madrid Centro')")
+        else:
+            self.log(f"📋 Configurado para extraer hasta {limit_val} resultados")
+            if limit_val > 60:
+                self.log(f"⚠️ Nota: Google Places API limita a 60 resultados por búsqueda")
+                self.log(f"💡 Tip: Para más resultados, usa búsquedas específicas por ubicación o tipo")
+                self.log(f"   Ejemplo: 'restaurantes Madrid Centro', 'restaurantes Madrid Norte', etc.")
+
+    def collect_businesses(self, keywords, existing_place_ids):
+        """
+        Ejecuta las búsquedas de todas las keywords sin duplicados.
+
+        Args:
+            keywords: Lista de palabras clave
+            existing_place_ids: Set de place_ids a omitir; se amplía con los nuevos
+
+        Returns:
+            Tupla (negocios nuevos, total encontrado con duplicados)
+        """
+        self.progress("Buscando negocios...")
+        self.metrics.start_stage('search')
+
+        total_keywords = len(keywords)
+        all_businesses_combined = []
+        total_found = 0
+
+        bbox = None
+        if self.options.area:
+            bbox = self.resolve_area(self.options.area)
+            if bbox is None:
+                return all_businesses_combined, total_found
+        else:
+            # Sin zona, la paginación de todas las keywords se intercala
+            searched = self.search_keywords(keywords)
+
+        for idx, keyword in enumerate(keywords, 1):
+            if self.is_stopped:
+                break
+
+            if total_keywords > 1:
+                self.log(f"\n🔎 Búsqueda {idx}/{total_keywords}: '{keyword}'")
+
+            # Buscar negocios para esta keyword
+            if bbox:
+                keyword_businesses = self.search_area(keyword, bbox)
+            else:
+                keyword_businesses = searched.get(keyword, [])
+            total_found += len(keyword_businesses)
+
+            if not keyword_businesses:
+                self.log(f"❌ No se encontraron resultados para '{keyword}'")
+                continue
+
+            # Filtrar duplicados
+            new_businesses = [b for b in keyword_businesses if b['place_id'] not in existing_place_ids]
+            duplicates = len(keyword_businesses) - len(new_businesses)
+
+            if duplicates > 0:
+                self.log(f"   📋 Encontrados: {len(keyword_businesses)} negocios ({duplicates} duplicados omitidos)")
+            else:
+                self.log(f"   📋 Encontrados: {len(keyword_businesses)} negocios nuevos")
+
+            # Agregar place_ids nuevos al set para evitar duplicados en siguientes búsquedas
+            for b in new_businesses:
+                existing_place_ids.add(b['place_id'])
+
+            all_businesses_combined.extend(new_businesses)
+
+        return all_businesses_combined, total_found
+
+    def iter_details(self, businesses, filename):
+        """
+        Genera un BusinessData por cada negocio en cuanto termina su extracción.
+
+        Con workers > 1 el orden es el de finalización. Si el consumidor deja
+        de iterar, se detiene el trabajo pendiente.
+        """
+        self.progress(f"Procesando 0/{len(businesses)}", 0, len(businesses))
+
+        self.metrics.start_stage('details')
+        if self.options.wants('email'):
+            self.metrics.start_stage('email')
+        if self.options.wants('imagen'):
+            self.metrics.start_stage('image')
+
+        if self.options.workers > 1:
+            results = self._iter_concurrently(businesses, filename)
+        else:
+            results = self._iter_sequentially(businesses, filename)
+
+        try:
+            for business, business_data in results:
+                if not business_data:
+                    if not self.is_stopped:
+                        self.log(f"❌ No se pudieron obtener detalles para '{business['name']}'")
+                    continue
+                self.metrics.record_items('details')
+                yield business_data
+        finally:
+            results.close()
+
+    def iter_businesses(self, keywords, exclude_place_ids=(), filename=None):
+        """
+        API de streaming: busca y genera cada BusinessData según se completa.
+
+        No escribe el dataset ni acumula resultados en memoria; las imágenes
+        (si se seleccionan) se guardan en la carpeta de filename.
+
+        Args:
+            keywords: Palabra clave o lista de palabras clave
+            exclude_place_ids: place_ids que no se deben procesar
+            filename: Nombre de archivo para la carpeta de imágenes
+                      (por defecto: <primera-keyword>-data)
+
+        Yields:
+            BusinessData de cada negocio procesado
+        """
+        if isinstance(keywords, str):
+            keywords = [keywords]
+        filename = filename or build_output_filename(keywords, '', 'json')
+
+        businesses, _ = self.collect_businesses(keywords, set(exclude_place_ids))
+        yield from self.iter_details(businesses, filename)
+
+    async def aiter_businesses(self, keywords, exclude_place_ids=(), filename=None):
+        """Versión asíncrona de iter_businesses (el trabajo corre en un hilo aparte)"""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        results = asyncio.Queue()
+        done = object()
+
+        def produce():
+            try:
+                for business_data in self.iter_businesses(keywords, exclude_place_ids, filename):
+                    loop.call_soon_threadsafe(results.put_nowait, business_data)
+            except Exception as e:
+                loop.call_soon_threadsafe(results.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(results.put_nowait, done)
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = await results.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self.stop()
+
+    def estimate(self, keywords):
+        """CostEstimate de ejecutar run() con estas keywords y opciones (sin llamadas a la API)"""
+        if isinstance(keywords, str):
+            keywords = [keywords]
+        history = load_history(self.options.data_dir)
+        # Los negocios vienen de una búsqueda nueva: Details solo para lo que falte
+        details = self.details_fields(search=search_payload({}, self.search_covers))
+        call_fields = {CALL_DETAILS: details}
+        if self.backend == BACKEND_NEW:
+            # En Places API (New) se factura por la máscara de cada llamada
+            extra = [PHOTOS_FIELD] if self.options.wants('imagen') else []
+            call_fields = {CALL_SEARCH: field_mask(self.search_covers, extra, search=True),
+                           CALL_DETAILS: field_mask(details),
+                           CALL_PHOTO_SEARCH: field_mask(extra=[PHOTOS_FIELD], search=True)}
+        return estimate_run(self.options, len(keywords), details, history, call_fields)
+
+    def log_estimate(self, keywords):
+        """Registra la estimación previa y avisa si supera el presupuesto"""
+        try:
+            estimate = self.estimate(keywords)
+        except OSError as e:
+            self.log(f"⚠️ No se pudo estimar el coste: {e}")
+            return None
+        lines = estimate.summary_lines()
+        self.log(f"💰 Estimación: {lines[1]} ({lines[0]})")
+        budget = self.options.budget
+        if budget and estimate.cost > budget:
+            self.log(f"⚠️ La estimación supera el presupuesto de ${budget:.2f}: "
+                     f"la ejecución se detendrá al alcanzarlo")
+        return estimate
+
+    def run(self, keywords, filename, output_format="json") -> RunSummary:
+        """Ejecuta búsqueda, extracción y guardado completos"""
+        if isinstance(keywords, str):
+            keywords = [keywords]  # Compatibilidad con llamadas antiguas
+
+        summary = RunSummary()
+        self.open_run_log(filename)
+        total_keywords = len(keywords)
+        if total_keywords == 1:
+            self.log(f"🔍 Iniciando scraping para: {keywords[0]}")
+        else:
+            self.log(f"🔍 Iniciando scraping para {total_keywords} palabras clave")
+            for idx, kw in enumerate(keywords, 1):
+                self.log(f"   {idx}. {kw}")
+
+        # Cargar place_ids ya existentes para evitar duplicados
+        existing_place_ids = self.load_existing_place_ids(filename, output_format)
+        if existing_place_ids:
+            self.log(f"📋 Se encontraron {len(existing_place_ids)} registros existentes en el archivo")
+
+        # Verificar límite de resultados
+        self.log_limit_settings()
+        self.log_estimate(keywords)
+
+        # Acumular todos los negocios de todas las búsquedas
+        search_start = time.perf_counter()
+        businesses, total_found = self.collect_businesses(keywords, existing_place_ids)
+        options = self.options
+        self.run_info = {
+            'keywords': total_keywords, 'found': total_found, 'new': len(businesses), 'processed': 0,
+            'search_seconds': round(time.perf_counter() - search_start, 3),
+            'backend': self.backend,
+            'workers': options.workers, 'min_delay': options.min_delay, 'max_delay': options.max_delay,
+            'batch_size': options.batch_size, 'batch_delay': options.batch_delay,
+            'email': options.wants('email'), 'imagen': options.wants('imagen')
+        }
+
+        summary.found = total_found
+        summary.new = len(businesses)
+        summary.stopped = self.is_stopped
+
+        if not businesses:
+            if total_found == 0:
+                self.log(f"\n❌ No se encontraron negocios para ninguna búsqueda")
+            else:
+                self.log(f"\nℹ️ Todos los negocios encontrados ya existen en el archivo")
+            self.save_run_metrics(filename)
+            return summary
+
+        self.log(f"\n📊 Resumen de búsquedas:")
+        self.log(f"   Total encontrado: {total_found} negocios")
+        self.log(f"   Nuevos únicos: {len(businesses)} negocios")
+        self.log(f"✨ Procesando {len(businesses)} negocios...")
+
+        # Procesar cada negocio
+        for business_data in self.iter_details(businesses, filename):
+            self._record_result(business_data, filename)
+
+        summary.processed = len(self.scraped_data)
+        summary.stopped = self.is_stopped
+        processed_count = summary.processed
+        self.run_info['processed'] = processed_count
+
+        # Guardar todos los datos (combinando con existentes)
+        if self.scraped_data:
+            # El archivo se guarda en data/nombre-archivo/nombre-archivo.ext
+            filepath = self.output_path(filename)
+            if output_format == "csv":
+                self.save_data_to_csv(filepath, merge_with_existing=True)
+            else:
+                self.save_data_to_json(filepath, merge_with_existing=True)
+            summary.filepath = filepath
+
+            self.remember_fetched(filename, output_format, self.scraped_data)
+            if self.options.dedup:
+                self.dedup_dataset(filename, output_format, self.options.dedup)
+
+            total_in_file = len(existing_place_ids) + processed_count
+            self.log(f"💾 Datos guardados en: {filepath}")
+            self.log(f"🏁 Completado: {processed_count} negocios nuevos procesados")
+            self.log(f"📊 Total en archivo: {total_in_file} negocios")
+
+            # Limpiar checkpoint al finalizar exitosamente
+            self.clear_checkpoint()
+        else:
+            self.log(f"❌ No se obtuvieron nuevos datos para '{keywords[-1]}'")
+
+        self.save_run_metrics(filename)
+        return summary
+
+    def _iter_sequentially(self, businesses, filename):
+        """Procesa los negocios de uno en uno con delays y pausas entre lotes"""
+        batch_count = 0
+
+        for i, business in enumerate(businesses):
+            if self.is_stopped:
+                break
+
+            self.progress(f"Procesando {i+1}/{len(businesses)}: {business['name']}")
+            self.log(f"🔍 Procesando [{i+1}/{len(businesses)}]: {business['name']}")
+
+            business_data = self.process_business(business, filename)
+            yield business, business_data
+
+            # Actualizar barra de progreso
+            self.progress(f"Procesando {i+1}/{len(businesses)}: {business['name']}", i + 1)
+
+            # Aplicar delay entre peticiones
+            delay = random.uniform(self.options.min_delay, self.options.max_delay)
+            self.stop_event.wait(delay)
+
+            # Aplicar delay entre lotes
+            batch_count += 1
+            if batch_count >= self.options.batch_size and i < len(businesses) - 1:
+                batch_delay = random.uniform(self.options.batch_delay, self.options.batch_delay + 5.0)
+                self.log(f"⏳ Pausa entre lotes: {batch_delay:.1f}s")
+                self.stop_event.wait(batch_delay)
+                batch_count = 0
+
+    def _iter_concurrently(self, businesses, filename):
+        """
+        Procesa los negocios con varios workers. Cada worker aplica su propio
+        delay entre peticiones; las pausas entre lotes no se aplican.
+        """
+        total = len(businesses)
+        requests.Session  # Cargar requests (perezoso) antes de repartirlo entre hilos
+        with ThreadPoolExecutor(max_workers=self.options.workers) as pool:
+            futures = {
+                pool.submit(self._process_with_delay, i, total, business, filename): business
+                for i, business in enumerate(businesses, 1)
+            }
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    business = futures[future]
+                    try:
+                        business_data = future.result()
+                    except Exception as e:
+                        self.log(f"⚠️ Error procesando '{business['name']}': {e}")
+                        business_data = None
+                    yield business, business_data
+                    self.progress(f"Procesando {done}/{total}: {business['name']}", done)
+            except (KeyboardInterrupt, GeneratorExit):
+                # Las tareas pendientes terminan sin hacer peticiones
+                self.stop()
+                raise
+
+    # --- Cola de trabajo persistente (varios procesos sobre un mismo trabajo) ---
+
+    def create_job(self, queue, keywords, filename, output_format="json"):
+        """
+        Registra un trabajo en la cola: configuración, place_ids ya guardados
+        en el dataset y una tarea de búsqueda por keyword. Es idempotente:
+        las keywords ya encoladas no se duplican.
+
+        Returns:
+            Número de búsquedas nuevas encoladas
+        """
+        job = queue.get_meta('job')
+        if job is None:
+            job = {
+                'filename': filename,
+                'output_format': output_format,
+                'fields': sorted(self.options.fields),
+                'max_results': self.options.max_results,
+                'area': self.options.area
+            }
+            queue.set_meta('job', job)
+            existing = self.load_existing_place_ids(filename, output_format)
+            if existing:
+                queue.add_known_places(existing)
+                self.log(f"📋 {len(existing)} registros existentes no se volverán a procesar")
+
+        added = 0
+        for keyword in keywords:
+            if queue.enqueue(TASK_SEARCH, normalize_query(keyword), {'keyword': keyword}):
+                added += 1
+        self.log(f"📥 {added} búsquedas nuevas en la cola ({len(keywords) - added} ya estaban)")
+        return added
+
+    def run_queue(self, queue) -> RunSummary:
+        """
+        Procesa tareas de la cola hasta vaciarla, con options.workers hilos.
+
+        La configuración de campos, límite y zona se toma del trabajo para
+        que todos los workers produzcan el mismo dataset. El worker que
+        encuentra la cola vacía en último lugar exporta los resultados.
+        """
+        summary = RunSummary()
+        job = queue.get_meta('job')
+        if job is None:
+            self.log("❌ La cola no tiene ningún trabajo: añade keywords primero")
+            return summary
+
+        self.options = replace(self.options, fields=job['fields'],
+                               max_results=job['max_results'], area=job['area'])
+        self.search_covers = self.search_covered_fields()  # La máscara depende de los campos del trabajo
+        filename, output_format = job['filename'], job['output_format']
+        self.open_run_log(filename)
+        self.log(f"🧵 Worker de cola: {queue.filepath} ({self.options.workers} hilos)")
+
+        self.metrics.start_stage('search')
+        self.metrics.start_stage('details')
+        if self.options.wants('email'):
+            self.metrics.start_stage('email')
+        if self.options.wants('imagen'):
+            self.metrics.start_stage('image')
+
+        if self.options.workers > 1:
+            requests.Session  # Cargar requests (perezoso) antes de repartirlo entre hilos
+            with ThreadPoolExecutor(max_workers=self.options.workers) as pool:
+                futures = [pool.submit(self._queue_worker, queue, filename, summary)
+                           for _ in range(self.options.workers)]
+                try:
+                    for future in futures:
+                        future.result()
+                except KeyboardInterrupt:
+                    self.stop()
+                    raise
+        else:
+            self._queue_worker(queue, filename, summary)
+
+        summary.stopped = self.is_stopped
+        if not self.is_stopped and queue.claim_export():
+            summary.filepath = self.export_queue(queue, filename, output_format)
+
+        counts = queue.counts()
+        failed = sum(c.get(STATUS_FAILED, 0) for c in counts.values())
+        if failed:
+            self.log(f"⚠️ {failed} tareas fallidas tras {queue.max_attempts} intentos (usa --retry-failed)")
+        self.save_run_metrics(filename)
+        return summary
+
+    def _queue_worker(self, queue, filename, summary):
+        """Bucle de un worker: toma tareas con lease hasta que la cola se vacía"""
+        worker_id = default_worker_id()
+        try:
+            while not self.is_stopped:
+                task = queue.lease(worker_id)
+                if task is None:
+                    if queue.is_drained():
+                        break
+                    # Otras tareas están en curso y pueden generar más trabajo
+                    self.stop_event.wait(QUEUE_POLL_SECONDS)
+                    continue
+
+                try:
+                    # El lease se renueva mientras la tarea sigue en curso
+                    with queue.keep_leased(task):
+                        result, follow_up = self._handle_task(queue, task, filename, summary)
+                except Exception as e:
+                    self.log(f"⚠️ Tarea {task.kind} #{task.id} fallida (intento {task.attempts}): {e}")
+                    queue.fail(task, e)
+                else:
+                    if not queue.complete(task, result, follow_up):
+                        # Otro worker la tomó: su resultado es el que cuenta
+                        self.log(f"⚠️ Tarea {task.kind} #{task.id}: el lease ya no es de este worker, "
+                                 f"se descarta el resultado")
+                    elif task.kind == TASK_DETAILS:
+                        with self.data_lock:
+                            summary.processed += 1
+                self._report_queue_progress(queue)
+        finally:
+            queue.close()
+
+    def _handle_task(self, queue, task, filename, summary):
+        """
+        Ejecuta una tarea; lanza una excepción para reintentarla. Devuelve el
+        resultado (place_id, datos) y la tarea siguiente (tipo, clave, payload),
+        que se guardan al completarla solo si el lease sigue siendo nuestro.
+        """
+        result = follow_up = None
+        if task.kind == TASK_SEARCH:
+            keyword = task.payload['keyword']
+            self.log(f"\n🔎 Búsqueda: '{keyword}'")
+            if self.options.area:
+                bbox = self.resolve_area(self.options.area)
+                if bbox is None:
+                    raise RuntimeError(f"No se pudo resolver la zona '{self.options.area}'")
+                results = self.search_area(keyword, bbox)
+            else:
+                results, complete = self._search_pages(keyword, None, None, self.options.max_results)
+                if not complete:
+                    raise RuntimeError(f"Búsqueda incompleta para '{keyword}'")
+
+            new = sum(1 for b in results if queue.enqueue_place(b['place_id'], b['name'], b.get('search')))
+            with self.data_lock:
+                summary.found += len(results)
+                summary.new += new
+            self.log(f"   📋 Encontrados: {len(results)} negocios ({new} nuevos en la cola)")
+
+        elif task.kind == TASK_DETAILS:
+            place_id = task.payload['place_id']
+            self.log(f"🔍 Procesando: {task.payload.get('name', place_id)}")
+            search = task.payload.get('search')
+            with self.place_scope(place_id):
+                business_data = self.get_business_details(place_id, search)
+            if not business_data:
+                raise RuntimeError(f"Sin detalles para '{place_id}'")
+            result = (place_id, asdict(business_data))
+            self.metrics.record_items('details')
+            if self.options.wants('email') or self.options.wants('imagen'):
+                follow_up = (TASK_ENRICH, place_id,
+                             {'place_id': place_id, 'photos': (search or {}).get(SEARCH_PHOTOS_KEY)})
+            self.stop_event.wait(random.uniform(self.options.min_delay, self.options.max_delay))
+
+        elif task.kind == TASK_ENRICH:
+            place_id = task.payload['place_id']
+            data = queue.get_result(place_id)
+            if data is None:
+                raise RuntimeError(f"Sin resultado guardado para '{place_id}'")
+            with self.place_scope(place_id):
+                business_data = self.enrich_business(BusinessData(**data), filename, task.payload.get('photos'))
+            result = (place_id, asdict(business_data))
+            self.stop_event.wait(random.uniform(self.options.min_delay, self.options.max_delay))
+
+        else:
+            raise ValueError(f"Tipo de tarea desconocido: {task.kind}")
+        return result, follow_up
+
+    def _report_queue_progress(self, queue):
+        counts = queue.counts()
+        total = sum(sum(c.values()) for c in counts.values())
+        finished = sum(c.get(STATUS_DONE, 0) + c.get(STATUS_FAILED, 0) for c in counts.values())
+        self.progress(f"Cola: {finished}/{total} tareas", finished, total)
+
+    def export_queue(self, queue, filename, output_format="json"):
+        """
+        Añade al dataset los resultados de la cola aún no exportados; los que
+        ya se exportaron y han cambiado sustituyen a su fila anterior
+        """
+        rows = list(queue.iter_results(pending_export_only=True))
+        if not rows:
+            self.log("ℹ️ No hay resultados nuevos que exportar")
+            return None
+
+        updated = [(data, previous) for _, data, previous in rows if previous is not None]
+        appended = [data for _, data, previous in rows if previous is None]
+        if updated:
+            appended += self._replace_exported_rows(filename, output_format, updated)
+
+        self.scraped_data = [BusinessData(**data) for data in appended]
+        filepath = self.output_path(filename)
+        if self.scraped_data and output_format == "csv":
+            self.save_data_to_csv(filepath, merge_with_existing=True)
+        elif self.scraped_data:
+            self.save_data_to_json(filepath, merge_with_existing=True)
+        queue.mark_exported(place_id for place_id, _, _ in rows)
+        self.scraped_data = [BusinessData(**data) for _, data, _ in rows]
+        self.remember_fetched(filename, output_format, self.scraped_data)
+        if self.options.dedup:
+            self.dedup_dataset(filename, output_format, self.options.dedup)
+        self.log(f"💾 {len(rows)} negocios exportados a: {filepath}")
+        return filepath
+
+    def _replace_exported_rows(self, filename, output_format, updated):
+        """
+        Sustituye en el dataset las filas de resultados que cambiaron tras
+        exportarse (updated: pares datos nuevos, datos exportados). Devuelve
+        los datos de los que no se encontraron, para añadirlos al final.
+        """
+        if not os.path.exists(self.output_path(filename)):
+            return [data for data, _ in updated]
+        as_text = output_format == "csv"
+        rows, fieldnames = self.load_dataset_rows(filename, output_format)
+        positions = {}
+        for index, row in enumerate(rows):
+            positions.setdefault(content_hash(comparable_row(row, as_text)), []).append(index)
+
+        missing = []
+        for data, previous in updated:
+            old_row = comparable_row(self._business_to_row(BusinessData(**previous), as_text), as_text)
+            matches = positions.get(content_hash(old_row))
+            if matches:
+                rows[matches.pop(0)] = self._business_to_row(BusinessData(**data), as_text)
+            else:
+                missing.append(data)
+        if len(missing) < len(updated):
+            self.write_dataset_rows(filename, output_format, rows, fieldnames)
+        return missing
+
+    # --- Refresco de datasets existentes ---
+
+    def record_state(self, filename):
+        """Estado (fecha de obtención y hash) de los registros del dataset"""
+        folder = os.path.splitext(filename)[0]
+        return RecordState(os.path.join(self.options.data_dir, folder, RECORD_STATE_FILE))
+
+    def remember_fetched(self, filename, output_format, businesses):
+        """Anota como recién obtenidos los negocios guardados en el dataset"""
+        as_text = output_format == "csv"
+        rows = [comparable_row(self._business_to_row(b, as_text), as_text) for b in businesses]
+        if not any(row.get('place_id') for row in rows):
+            return  # Sin place_id no se puede refrescar
+        state = self.record_state(filename)
+        try:
+            state.update(rows)
+        except sqlite3.Error as e:
+            self.log(f"⚠️ Error guardando el estado de los registros: {e}")
+        finally:
+            state.close()
+
+    def load_dataset_rows(self, filename, output_format):
+        """Filas del dataset y, para CSV, sus columnas"""
+        filepath = self.output_path(filename)
+        if output_format == "csv":
+            with open_dataset(filepath, 'r', newline='', encoding='utf-8-sig') as csvfile:
+                reader = csv.DictReader(csvfile)
+                return list(reader), list(reader.fieldnames or [])
+        with open_dataset(filepath, 'r', encoding='utf-8') as f:
+            return list(iter_json_array(f)), None
+
+    def write_dataset_rows(self, filename, output_format, rows, fieldnames=None):
+        """Reescribe el dataset completo de forma atómica"""
+        filepath = self.output_path(filename)
+        if output_format != "csv":
+            write_json_dataset(filepath, rows)
+            return
+        tmp_path = temp_path(filepath)
+        with open_dataset(tmp_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(tmp_path, filepath)
+
+    def _refresh_details(self, place_id):
+        """Tarea de un worker del refresco: solo Place Details, con delay"""
+        if self.is_stopped:
+            return None
+        with self.place_scope(place_id):
+            business_data = self.get_business_details(place_id)
+        self.stop_event.wait(random.uniform(self.options.min_delay, self.options.max_delay))
+        return business_data
+
+    def refresh_stale(self, filename, output_format="json", max_age_days=DEFAULT_REFRESH_AGE_DAYS,
+                      limit=None) -> RunSummary:
+        """
+        Vuelve a pedir Place Details de los registros obtenidos hace más de
+        max_age_days (los de más reseñas primero, como máximo limit) y
+        reescribe el dataset solo si alguna fila ha cambiado. Se refrescan las
+        columnas que ya tiene el dataset, no las de --fields; email e imagen
+        no se vuelven a buscar. Una fila cambia si su hash no coincide con el
+        guardado en el último refresco. Lanza MissingPlaceIds si el dataset
+        se generó sin el campo place_id.
+        """
+        summary = RunSummary()
+        filepath = self.output_path(filename)
+        if not os.path.exists(filepath):
+            self.log(f"❌ No existe el dataset: {filepath}")
+            return summary
+        try:
+            rows, fieldnames = self.load_dataset_rows(filename, output_format)
+        except DATASET_READ_ERRORS + (csv.Error,) as e:
+            self.log(f"❌ Error leyendo el dataset: {e}")
+            return summary
+        if rows and not any(row.get('place_id') for row in rows):
+            # place_id no está seleccionado por defecto: sin él no hay nada que refrescar
+            raise MissingPlaceIds(filepath)
+
+        as_text = output_format == "csv"
+        state = self.record_state(filename)
+        try:
+            states = state.load()
+            stale = select_stale(rows, states, max_age_days, limit)
+            summary.found = len(stale)
+            self.log(f"🔄 {len(stale)} de {len(rows)} registros con más de {max_age_days:g} días "
+                     f"(o sin fecha) para refrescar")
+            if not stale:
+                return summary
+            self.open_run_log(filename)
+
+            # Columnas del dataset que vienen de Place Details (el email no se
+            # refresca): se piden a Details exactamente esos campos
+            columns = set(fieldnames or ()).union(*rows)
+            refresh_fields = [field_name for field_name, name in OUTPUT_FIELD_NAMES.items()
+                              if field_name != 'email' and name in columns]
+            details_keys = {OUTPUT_FIELD_NAMES[field_name] for field_name in refresh_fields} - {'place_id'}
+            run_options, self.options = self.options, replace(self.options, fields=refresh_fields)
+            refreshed = []
+            requests.Session  # Cargar requests (perezoso) antes de repartirlo entre hilos
+            self.metrics.start_stage('details')
+            self.progress(f"Refrescando 0/{len(stale)}", 0, len(stale))
+            try:
+                with ThreadPoolExecutor(max_workers=self.options.workers) as pool:
+                    futures = {pool.submit(self._refresh_details, rows[index]['place_id']): index
+                               for index in stale}
+                    for done, future in enumerate(as_completed(futures), 1):
+                        index = futures[future]
+                        try:
+                            business_data = future.result()
+                        except Exception as e:
+                            self.log(f"⚠️ Error refrescando '{rows[index]['place_id']}': {e}")
+                            business_data = None
+                        self.progress(f"Refrescando {done}/{len(stale)}", done)
+                        if business_data is None:
+                            continue
+                        self.metrics.record_items('details')
+
+                        old = rows[index]
+                        new = {key: value for key, value in old.items() if key not in details_keys}
+                        fetched = self._business_to_row(business_data, as_text)
+                        new.update((key, value) for key, value in fetched.items() if key in details_keys)
+                        # Hash del último refresco; las filas sin estado se comparan con su contenido
+                        comparable = comparable_row(new, as_text)
+                        previous = states.get(old['place_id'])
+                        previous = previous[1] if previous else content_hash(comparable_row(old, as_text))
+                        if content_hash(comparable) != previous:
+                            rows[index] = new
+                            summary.changed += 1
+                            self.log(f"   ✏️ Cambios en: {new.get('titulo') or old.get('place_id')}")
+                        refreshed.append(comparable)
+            finally:
+                self.options = run_options
+
+            summary.processed = len(refreshed)
+            summary.stopped = self.is_stopped
+            if summary.changed:
+                if as_text:
+                    fieldnames = list(dict.fromkeys(fieldnames + [key for row in rows for key in row]))
+                self.write_dataset_rows(filename, output_format, rows, fieldnames)
+                summary.filepath = filepath
+                self.log(f"💾 Dataset reescrito: {filepath}")
+            state.update(refreshed)
+        finally:
+            state.close()
+
+        self.log(f"🏁 Refrescados {summary.processed} registros: {summary.changed} con cambios, "
+                 f"{summary.processed - summary.changed} sin cambios")
+        self.save_run_metrics(filename)
+        return summary
+
+    # --- Duplicados entre place_ids ---
+
+    def find_datasets(self):
+        """Datasets de data_dir como (nombre de archivo, formato): data/<nombre>/<nombre>.json|csv"""
+        datasets = []
+        if not os.path.isdir(self.options.data_dir):
+            return datasets
+        for folder in sorted(os.listdir(self.options.data_dir)):
+            for output_format in ("json", "csv"):
+                filename = f"{folder}.{output_format}"
+                if os.path.isfile(self.output_path(filename)):
+                    datasets.append((filename, output_format))
+        return datasets
+
+    def dedup_dataset(self, filename, output_format, mode):
+        """
+        Busca negocios duplicados (distinto place_id, mismo negocio) en el
+        dataset y los marca o fusiona según mode. Reescribe el archivo solo
+        si algo cambia. Devuelve el DedupResult o None si no se pudo leer.
+        """
+        try:
+            rows, fieldnames = self.load_dataset_rows(filename, output_format)
+        except DATASET_READ_ERRORS + (csv.Error,) as e:
+            self.log(f"⚠️ Error leyendo el dataset para buscar duplicados: {e}")
+            return None
+
+        new_rows, result = apply_dedup(rows, mode)
+        if result.groups:
+            reasons = ', '.join(f"{reason}: {count}" for reason, count in sorted(result.reasons.items()))
+            self.log(f"🧬 {result.duplicates} posibles duplicados en {len(result.groups)} "
+                     f"grupos de {filename} ({reasons})")
+        if result.skipped_blocks:
+            self.log(f"   ℹ️ {result.skipped_blocks} bloques con más de {MAX_BLOCK_SIZE} registros "
+                     f"no se compararon (cadenas o webs compartidas)")
+        if new_rows != rows:
+            if fieldnames is not None:
+                fieldnames = list(dict.fromkeys(
+                    [name for name in fieldnames if any(name in row for row in new_rows)]
+                    + [key for row in new_rows for key in row]))
+            self.write_dataset_rows(filename, output_format, new_rows, fieldnames)
+            action = 'fusionados' if mode == DEDUP_MERGE else 'marcados'
+            self.log(f"💾 Duplicados {action} en: {self.output_path(filename)}")
+        return result
+
+    def _business_to_row(self, business, as_text=False):
+        """
+        Convierte un BusinessData al dict de salida con solo los campos
+        seleccionados; as_text para CSV (horarios como texto)
+        """
+        wants = self.options.wants
+        row = {}
+
+        if wants('title'):
+            row['titulo'] = business.title or ''
+        if wants('phone') and business.phone:
+            row['telefono'] = business.phone
+        if wants('website') and business.website:
+            row['sitio_web'] = business.website
+        if wants('address') and business.address:
+            row['direccion'] = business.address
+        if wants('place_id') and business.place_id:
+            row['place_id'] = business.place_id
+        if wants('rating') and business.rating:
+            row['rating'] = business.rating
+        if wants('total_ratings') and business.total_ratings:
+            row['total_ratings'] = business.total_ratings
+        if wants('opening_hours') and business.opening_hours:
+            row['horarios'] = hours_value(business.opening_hours, as_text)
+        if wants('price_level') and business.price_level:
+            row['nivel_precios'] = business.price_level
+        if wants('email') and business.email:
+            row['email'] = business.email
+
+        return row
+
+    @profiled(PHASE_SAVE)
+    def save_data_to_json(self, filepath, merge_with_existing=False):
+        # Asegurar que el directorio data existe
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+        # Nuevos datos (solo campos seleccionados) tras los existentes si
+        # merge_with_existing=True; los existentes se copian por partes
+        new_rows = [self._business_to_row(business) for business in self.scraped_data]
+        write_json_dataset(filepath, new_rows, merge_existing=merge_with_existing)
+
+    @profiled(PHASE_SAVE)
+    def save_data_to_csv(self, filepath, merge_with_existing=False):
+        # Asegurar que el directorio data existe
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+        # Crear lista de campos seleccionados
+        fieldnames = [csv_name for field_name, csv_name in OUTPUT_FIELD_NAMES.items()
+                      if self.options.wants(field_name)]
+
+        # Preparar nuevas filas
+        new_rows = [self._business_to_row(business, as_text=True) for business in self.scraped_data]
+
+        # Si merge_with_existing=True y el archivo existe, anexar datos
+        if merge_with_existing and os.path.exists(filepath):
+            # Anexar al archivo existente
+            with open_dataset(filepath, 'a', newline='', encoding='utf-8-sig') as csvfile:
+                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                for row in new_rows:
+                    writer.writerow(row)
+        else:
+            # Escribir archivo CSV nuevo
+            with open_dataset(filepath, 'w', newline='', encoding='utf-8-sig') as csvfile:
+                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                writer.writeheader()
+                for row in new_rows:
+                    writer.writerow(row)
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# Google My Business Scraper - Coste por SKU y estimación previa de una ejecución
+#
+# Google no factura todas las llamadas igual: Text Search, Place Details y
+# Place Photo son SKUs distintos y Details suma además un SKU por cada
+# categoría de campos pedida (contacto: teléfono, web, horarios; ambiente:
+# rating, reseñas, nivel de precios). Aquí se calcula el coste de cada
+# llamada con la tabla de precios y, antes de ejecutar, se estima cuántas
+# llamadas de cada SKU hará una ejecución, su coste y su duración a partir
+# de las métricas (*.metrics.json) de las ejecuciones anteriores.
+#
+# Places API (New) factura por niveles (Essentials, Pro, Enterprise): cada
+# llamada paga un solo SKU, el del campo más caro de su máscara
+# (scraper_places_new.mask_tier).
+#
+# Los precios son los de lista (pago por uso, USD por llamada, primer
+# tramo) y cambian con el tiempo: SKU_PRICES se puede ajustar.
+
+import json
+import math
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from scraper_metrics import ENDPOINT_DETAILS, ENDPOINT_PHOTO, ENDPOINT_TEXT_SEARCH
+from scraper_places_new import (BACKEND_LEGACY, BACKEND_NEW, TIER_ESSENTIALS, TIER_ENTERPRISE, TIER_IDS,
+                                TIER_PRO, mask_tier)
+
+SKU_TEXT_SEARCH = 'text_search'
+SKU_DETAILS = 'details'                  # Place Details con datos básicos
+SKU_CONTACT_DATA = 'contact_data'        # Teléfono, web, horarios
+SKU_ATMOSPHERE_DATA = 'atmosphere_data'  # Rating, reseñas, nivel de precios
+SKU_PHOTO = 'photo'
+# Places API (New)
+SKU_SEARCH_PRO = 'text_search_pro'
+SKU_SEARCH_ENTERPRISE = 'text_search_enterprise'
+SKU_DETAILS_ESSENTIALS = 'details_essentials'
+SKU_DETAILS_PRO = 'details_pro'
+SKU_DETAILS_ENTERPRISE = 'details_enterprise'
+
+SKU_PRICES = {
+    SKU_TEXT_SEARCH: 0.032,
+    SKU_DETAILS: 0.017,
+    SKU_CONTACT_DATA: 0.003,
+    SKU_ATMOSPHERE_DATA: 0.005,
+    SKU_PHOTO: 0.007,
+    SKU_SEARCH_PRO: 0.032,
+    SKU_SEARCH_ENTERPRISE: 0.035,
+    SKU_DETAILS_ESSENTIALS: 0.005,
+    SKU_DETAILS_PRO: 0.017,
+    SKU_DETAILS_ENTERPRISE: 0.020
+}
+
+SKU_LABELS = {
+    SKU_TEXT_SEARCH: 'Text Search',
+    SKU_DETAILS: 'Place Details',
+    SKU_CONTACT_DATA: 'Contact Data',
+    SKU_ATMOSPHERE_DATA: 'Atmosphere Data',
+    SKU_PHOTO: 'Place Photo',
+    SKU_SEARCH_PRO: 'Text Search Pro',
+    SKU_SEARCH_ENTERPRISE: 'Text Search Enterprise',
+    SKU_DETAILS_ESSENTIALS: 'Place Details Essentials',
+    SKU_DETAILS_PRO: 'Place Details Pro',
+    SKU_DETAILS_ENTERPRISE: 'Place Details Enterprise'
+}
+
+# Nivel de la máscara -> SKU en Places API (New). searchText no tiene nivel
+# Essentials: por debajo de Enterprise se factura como Pro
+NEW_API_SKUS = {
+    ENDPOINT_TEXT_SEARCH: {TIER_IDS: SKU_SEARCH_PRO, TIER_ESSENTIALS: SKU_SEARCH_PRO, TIER_PRO: SKU_SEARCH_PRO,
+                           TIER_ENTERPRISE: SKU_SEARCH_ENTERPRISE},
+    ENDPOINT_DETAILS: {TIER_IDS: SKU_DETAILS_ESSENTIALS, TIER_ESSENTIALS: SKU_DETAILS_ESSENTIALS,
+                       TIER_PRO: SKU_DETAILS_PRO, TIER_ENTERPRISE: SKU_DETAILS_ENTERPRISE}
+}
+
+CONTACT_FIELDS = frozenset({'formatted_phone_number', 'international_phone_number', 'website',
+                            'opening_hours', 'current_opening_hours'})
+ATMOSPHERE_FIELDS = frozenset({'rating', 'user_ratings_total', 'price_level', 'reviews'})
+
+# Tipos de llamada del motor (increment_api_calls) y su endpoint
+CALL_SEARCH = 'search'              # Página de Text Search
+CALL_DETAILS = 'details'            # Place Details de un negocio
+CALL_PHOTO_SEARCH = 'photo_search'  # Text Search por título para encontrar fotos
+CALL_PHOTO = 'photo'                # Descarga de una foto
+CALL_TYPE_ENDPOINTS = {
+    CALL_SEARCH: ENDPOINT_TEXT_SEARCH,
+    CALL_DETAILS: ENDPOINT_DETAILS,
+    CALL_PHOTO_SEARCH: ENDPOINT_TEXT_SEARCH,
+    CALL_PHOTO: ENDPOINT_PHOTO
+}
+
+# Sin historial: resultados de una keyword sin límite (3 páginas de 20)
+# y tiempos aproximados por fase
+RESULTS_PER_PAGE = 20
+MAX_RESULTS_PER_KEYWORD = 60
+DEFAULT_SEARCH_SECONDS_PER_PAGE = 2.5  # Latencia + espera del next_page_token
+DEFAULT_NEW_SEARCH_SECONDS_PER_PAGE = 0.5  # Places API (New): el token se usa en el acto
+DEFAULT_DETAILS_SECONDS = 0.5
+DEFAULT_EMAIL_SECONDS = 8.0
+DEFAULT_IMAGE_SECONDS = 2.0
+HISTORY_RUNS = 20  # Ejecuciones recientes que se usan para estimar
+
+
+def call_skus(endpoint, fields=None, backend=BACKEND_LEGACY) -> List[str]:
+    """
+    SKUs facturados por una llamada al endpoint. fields son los campos de
+    Details en la API legacy y la máscara de campos en Places API (New).
+    """
+    if endpoint == ENDPOINT_PHOTO:
+        return [SKU_PHOTO]
+    if backend == BACKEND_NEW:
+        skus = NEW_API_SKUS.get(endpoint)
+        return [skus[mask_tier(fields)]] if skus else []
+    if endpoint == ENDPOINT_TEXT_SEARCH:
+        # Text Search devuelve todos los campos: factura también contacto y ambiente
+        return [SKU_TEXT_SEARCH, SKU_CONTACT_DATA, SKU_ATMOSPHERE_DATA]
+    if endpoint == ENDPOINT_DETAILS:
+        if isinstance(fields, str):
+            fields = fields.split(',')
+        fields = set(fields or ())
+        skus = [SKU_DETAILS]
+        if fields & CONTACT_FIELDS:
+            skus.append(SKU_CONTACT_DATA)
+        if fields & ATMOSPHERE_FIELDS:
+            skus.append(SKU_ATMOSPHERE_DATA)
+        return skus
+    return []
+
+
+def call_cost(endpoint, fields=None, backend=BACKEND_LEGACY):
+    """Coste en USD de una llamada"""
+    return sum(SKU_PRICES[sku] for sku in call_skus(endpoint, fields, backend))
+
+
+def load_history(data_dir, limit=HISTORY_RUNS):
+    """
+    Datos de las ejecuciones anteriores para estimar (sección run de sus
+    *.metrics.json con la duración y las llamadas por tipo), las más
+    recientes primero
+    """
+    found = []
+    for root, _, filenames in os.walk(data_dir):
+        for name in filenames:
+            if name.endswith('.metrics.json'):
+                path = os.path.join(root, name)
+                found.append((os.path.getmtime(path), path))
+    runs = []
+    for _, path in sorted(found, reverse=True):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        run = data.get('run') or {}
+        if run.get('keywords') and 'cost' in data:
+            runs.append(dict(run, elapsed_s=data.get('elapsed_s', 0), calls=data['cost'].get('calls', {})))
+            if len(runs) >= limit:
+                break
+    return runs
+
+
+def _ratio(runs, numerator, denominator):
+    """Cociente de las sumas (None si no hay denominador)"""
+    total = sum(denominator(run) for run in runs)
+    return sum(numerator(run) for run in runs) / total if total > 0 else None
+
+
+def _mean_delay(run):
+    return (run.get('min_delay', 0) + run.get('max_delay', 0)) / 2
+
+
+def _batch_overhead(run):
+    """Segundos por negocio de las pausas entre lotes (solo con un worker)"""
+    if run.get('workers', 1) > 1 or not run.get('batch_size'):
+        return 0.0
+    return (run.get('batch_delay', 0) + 2.5) / run['batch_size']
+
+
+def _business_seconds(run):
+    """Segundos de worker por negocio sin los delays configurados"""
+    search = run.get('search_seconds', 0)
+    worker_seconds = max(0.0, run.get('elapsed_s', 0) - search) * run.get('workers', 1)
+    processed = run.get('processed', 0)
+    if not processed:
+        return 0.0
+    return max(0.0, worker_seconds - processed * (_mean_delay(run) + _batch_overhead(run)))
+
+
+@dataclass
+class CostEstimate:
+    """Predicción de una ejecución: llamadas por tipo y SKU, coste y duración"""
+    keywords: int
+    businesses: int
+    calls: Dict[str, int] = field(default_factory=dict)
+    skus: Dict[str, int] = field(default_factory=dict)
+    cost: float = 0.0
+    seconds: float = 0.0
+    history_runs: int = 0  # Ejecuciones anteriores usadas (0 = valores por defecto)
+    notes: List[str] = field(default_factory=list)
+
+    def summary_lines(self):
+        minutes = self.seconds / 60
+        duration = f"{minutes:.0f} min" if minutes >= 1 else f"{self.seconds:.0f} s"
+        if self.history_runs == 1:
+            source = "según la ejecución anterior"
+        elif self.history_runs:
+            source = f"según {self.history_runs} ejecuciones anteriores"
+        else:
+            source = "sin historial, valores por defecto"
+        lines = [f"{self.keywords} keywords → ~{self.businesses} negocios nuevos ({source})",
+                 f"Coste estimado: ${self.cost:.2f} | Duración estimada: {duration}"]
+        for sku, count in self.skus.items():
+            if count:
+                lines.append(f"   {SKU_LABELS[sku]}: {count} × ${SKU_PRICES[sku]:.3f} = ${count * SKU_PRICES[sku]:.2f}")
+        lines.extend(self.notes)
+        return lines
+
+
+def estimate_run(options, keyword_count, details_fields, history=(), call_fields=None) -> CostEstimate:
+    """
+    Estima una ejecución de keyword_count keywords con las opciones dadas
+    (campos, workers, delays, max_results, backend). details_fields son los
+    campos que se pedirán a Place Details y call_fields, si se indica, los
+    campos con que se factura cada tipo de llamada (las máscaras en Places
+    API (New)). Las proporciones (resultados por keyword, negocios nuevos,
+    fotos, segundos por negocio) salen de las ejecuciones de history con el
+    mismo backend y, sin historial comparable, de valores por defecto.
+    """
+    wants_email = options.wants('email')
+    wants_image = options.wants('imagen')
+    new_api = options.backend == BACKEND_NEW
+    runs = [run for run in history if run.get('backend', BACKEND_LEGACY) == options.backend]
+    call_fields = call_fields or {CALL_DETAILS: details_fields}
+    # El tiempo por negocio depende sobre todo del email y la imagen
+    similar_runs = [run for run in runs
+                    if bool(run.get('email')) == wants_email and bool(run.get('imagen')) == wants_image]
+    estimate = CostEstimate(keyword_count, 0, history_runs=len(runs))
+
+    per_keyword_cap = min(options.max_results or MAX_RESULTS_PER_KEYWORD, MAX_RESULTS_PER_KEYWORD)
+    page_size = options.page_size if new_api else RESULTS_PER_PAGE
+    found_per_keyword = _ratio(runs, lambda r: r.get('found', 0), lambda r: r.get('keywords', 0))
+    found_per_keyword = min(found_per_keyword if found_per_keyword is not None else per_keyword_cap,
+                            per_keyword_cap)
+    new_ratio = _ratio(runs, lambda r: r.get('new', 0), lambda r: r.get('found', 0))
+    new_ratio = 1.0 if new_ratio is None else new_ratio
+    pages = _ratio(runs, lambda r: r.get('calls', {}).get(CALL_SEARCH, 0), lambda r: r.get('keywords', 0))
+    if pages is None:
+        pages = max(1, math.ceil(found_per_keyword / page_size))
+    search_seconds = _ratio(runs, lambda r: r.get('search_seconds', 0), lambda r: r.get('keywords', 0))
+    if search_seconds is None:
+        page_seconds = DEFAULT_NEW_SEARCH_SECONDS_PER_PAGE if new_api else DEFAULT_SEARCH_SECONDS_PER_PAGE
+        search_seconds = pages * page_seconds
+
+    businesses = round(keyword_count * found_per_keyword * new_ratio)
+    estimate.businesses = businesses
+    # Sin campos que pedir a Details (todo viene en la búsqueda) no hay llamadas de detalles
+    calls = Counter({CALL_SEARCH: math.ceil(keyword_count * pages),
+                     CALL_DETAILS: businesses if details_fields else 0})
+    if wants_image:
+        # Las referencias de fotos suelen venir en la búsqueda: sin historial, solo la descarga
+        for call_type, default in ((CALL_PHOTO_SEARCH, 0.0), (CALL_PHOTO, 1.0)):
+            per_business = _ratio(similar_runs, lambda r: r.get('calls', {}).get(call_type, 0),
+                                  lambda r: r.get('processed', 0))
+            calls[call_type] = round(businesses * (default if per_business is None else per_business))
+    estimate.calls = dict(calls)
+
+    skus = Counter()
+    for call_type, count in calls.items():
+        for sku in call_skus(CALL_TYPE_ENDPOINTS[call_type], call_fields.get(call_type), options.backend):
+            skus[sku] += count
+    estimate.skus = {sku: skus[sku] for sku in SKU_PRICES if skus[sku]}
+    estimate.cost = sum(SKU_PRICES[sku] * count for sku, count in skus.items())
+
+    business_seconds = _ratio(similar_runs, _business_seconds, lambda r: r.get('processed', 0))
+    if business_seconds is None:
+        business_seconds = ((DEFAULT_DETAILS_SECONDS if calls[CALL_DETAILS] else 0)
+                            + (DEFAULT_EMAIL_SECONDS if wants_email else 0)
+                            + (DEFAULT_IMAGE_SECONDS if wants_image else 0))
+    current = {'workers': options.workers, 'batch_size': options.batch_size,
+               'batch_delay': options.batch_delay}
+    per_business = business_seconds + (options.min_delay + options.max_delay) / 2 + _batch_overhead(current)
+    estimate.seconds = keyword_count * search_seconds + businesses * per_business / options.workers
+
+    if options.area:
+        estimate.notes.append("⚠️ Con Zona cada keyword se busca en varias celdas: la estimación se queda corta")
+    return estimate
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# Google My Business Scraper - Detección de negocios duplicados
+#
+# Un mismo negocio físico aparece a veces con varios place_id (fichas
+# repetidas, traslados, sucursales mal dadas de alta). Compararlo todo con
+# todo es O(n²); aquí cada registro se coloca en unos pocos bloques (mismo
+# teléfono normalizado, mismo dominio web, mismo token del nombre con el
+# mismo número de la dirección) y solo se comparan los registros que
+# comparten bloque, así que el coste es prácticamente lineal. Los bloques
+# demasiado grandes (cadenas con cientos de sucursales) no se comparan.
+#
+# Dos registros son duplicados si comparten teléfono o web y además se
+# parecen en nombre o dirección, o si nombre y dirección casi coinciden.
+# Si las direcciones son claramente distintas (o la misma calle con otro
+# número) nunca se consideran duplicados: son sucursales de una cadena.
+#
+# Trabaja sobre las filas de salida (dicts con titulo, telefono, sitio_web,
+# direccion, place_id...), igual para JSON que para CSV.
+
+import ipaddress
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from urllib.parse import urlparse
+
+DEDUP_FLAG = 'flag'    # Marcar los duplicados con duplicado_de
+DEDUP_MERGE = 'merge'  # Fusionar cada grupo en un solo registro
+DEDUP_MODES = (DEDUP_FLAG, DEDUP_MERGE)
+
+DUPLICATE_OF_FIELD = 'duplicado_de'  # place_id (o título) del registro principal
+MERGED_IDS_FIELD = 'duplicados'      # place_ids fusionados, separados por ';'
+
+MAX_BLOCK_SIZE = 50      # Bloques mayores (cadenas, webs compartidas) no se comparan
+PHONE_DIGITS = 9         # Dígitos finales que identifican un teléfono (sin prefijo de país)
+MIN_PHONE_DIGITS = 7
+MAX_NAME_TOKENS = 3      # Tokens del nombre (los más largos) usados como bloque
+
+# Umbrales de parecido (índice de Jaccard entre tokens)
+SAME_CONTACT_MIN_SIMILARITY = 0.5  # Nombre o dirección con teléfono/web iguales
+SAME_WEB_MIN_ADDRESS = 0.6
+NAME_MIN_SIMILARITY = 0.8          # Sin teléfono ni web en común
+ADDRESS_MIN_SIMILARITY = 0.7
+DIFFERENT_ADDRESS_MAX = 0.3        # Por debajo son sucursales distintas
+
+# Dominios compartidos por muchos negocios: no identifican a ninguno
+SHARED_DOMAINS = frozenset({
+    'facebook.com', 'instagram.com', 'google.com', 'sites.google.com', 'business.site',
+    'linktr.ee', 'wa.me', 'twitter.com', 'x.com', 'youtube.com', 'linkedin.com',
+    'tripadvisor.com', 'tripadvisor.es', 'booking.com', 'wixsite.com', 'blogspot.com'
+})
+
+STOPWORDS = frozenset({
+    'de', 'del', 'la', 'las', 'el', 'los', 'y', 'e', 'en', 'a', 'al', 'the', 'and', 'of',
+    'sl', 'sa', 'slu', 'sociedad', 'limitada', 'calle', 'c', 'av', 'avda', 'avenida',
+    'plaza', 'pl', 'paseo', 'no', 'n', 'num', 'local', 'bajo', 'espana', 'spain'
+})
+
+
+def normalize_tokens(text) -> FrozenSet[str]:
+    """Tokens en minúsculas, sin acentos ni palabras vacías"""
+    text = unicodedata.normalize('NFD', str(text or '').lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return frozenset(t for t in re.findall(r'[a-z0-9]+', text) if t not in STOPWORDS)
+
+
+def phone_key(phone) -> Optional[str]:
+    """Últimos dígitos del teléfono (ignora prefijos, espacios y guiones)"""
+    digits = re.sub(r'\D', '', str(phone or ''))
+    return digits[-PHONE_DIGITS:] if len(digits) >= MIN_PHONE_DIGITS else None
+
+
+def website_domain(url) -> Optional[str]:
+    """Dominio del sitio web sin www; None para dominios compartidos o IPs"""
+    url = str(url or '').strip()
+    if not url:
+        return None
+    host = (urlparse(url if '//' in url else f'//{url}').hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if not host or any(host == d or host.endswith('.' + d) for d in SHARED_DOMAINS):
+        return None
+    try:
+        ipaddress.ip_address(host)
+        return None  # Un servidor con IP puede alojar muchos sitios
+    except ValueError:
+        return host
+
+
+def jaccard(a, b) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass(frozen=True)
+class RecordKeys:
+    """Claves normalizadas de un registro para los bloques y la comparación"""
+    phone: Optional[str]
+    domain: Optional[str]
+    name: FrozenSet[str]
+    address: FrozenSet[str]
+
+    @property
+    def street_numbers(self):
+        """Números de la dirección sin los códigos postales (5 dígitos)"""
+        return {t for t in self.address if t.isdigit() and len(t) < 5}
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(phone_key(row.get('telefono')), website_domain(row.get('sitio_web')),
+                   normalize_tokens(row.get('titulo')), normalize_tokens(row.get('direccion')))
+
+    def blocks(self):
+        """Bloques a los que pertenece el registro"""
+        if self.phone:
+            yield f"tel:{self.phone}"
+        if self.domain:
+            yield f"web:{self.domain}"
+        if self.name:
+            numbers = sorted(t for t in self.address if t.isdigit()) or ['']
+            for token in sorted(self.name, key=lambda t: (-len(t), t))[:MAX_NAME_TOKENS]:
+                for number in numbers:
+                    yield f"nom:{token}:{number}"
+
+
+def duplicate_reason(a: RecordKeys, b: RecordKeys) -> Optional[str]:
+    """Motivo por el que a y b son el mismo negocio, o None"""
+    address = jaccard(a.address, b.address)
+    if a.address and b.address and address < DIFFERENT_ADDRESS_MAX:
+        return None  # Otra dirección: sucursal distinta
+    numbers_a, numbers_b = a.street_numbers, b.street_numbers
+    if numbers_a and numbers_b and not numbers_a & numbers_b:
+        return None  # Misma calle, otro número
+    name = jaccard(a.name, b.name)
+    if a.phone and a.phone == b.phone and max(name, address) >= SAME_CONTACT_MIN_SIMILARITY:
+        return 'telefono'
+    if a.domain and a.domain == b.domain and (address >= SAME_WEB_MIN_ADDRESS
+                                              or name >= SAME_CONTACT_MIN_SIMILARITY):
+        return 'web'
+    if name >= NAME_MIN_SIMILARITY and address >= ADDRESS_MIN_SIMILARITY:
+        return 'nombre_direccion'
+    return None
+
+
+@dataclass
+class DedupResult:
+    """Grupos de duplicados encontrados (índices de fila, el principal primero)"""
+    groups: List[List[int]] = field(default_factory=list)
+    reasons: Dict[str, int] = field(default_factory=dict)
+    skipped_blocks: int = 0  # Bloques demasiado grandes para compararse
+    comparisons: int = 0
+
+    @property
+    def duplicates(self):
+        return sum(len(group) - 1 for group in self.groups)
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _principal_order(rows, index):
+    """Registro principal del grupo: más reseñas, más campos rellenos, el primero"""
+    row = rows[index]
+    filled = sum(1 for value in row.values() if value not in (None, ''))
+    return -_number(row.get('total_ratings')), -filled, index
+
+
+def find_duplicates(rows) -> DedupResult:
+    """Agrupa las filas duplicadas comparando solo las que comparten bloque"""
+    keys = [RecordKeys.from_row(row) for row in rows]
+    blocks = defaultdict(list)
+    for index, record in enumerate(keys):
+        for block in record.blocks():
+            blocks[block].append(index)
+
+    parent = list(range(len(rows)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    result = DedupResult()
+    reasons = Counter()
+    for members in blocks.values():
+        if len(members) < 2:
+            continue
+        if len(members) > MAX_BLOCK_SIZE:
+            result.skipped_blocks += 1
+            continue
+        for pos, i in enumerate(members):
+            for j in members[pos + 1:]:
+                root_i, root_j = find(i), find(j)
+                if root_i == root_j:
+                    continue
+                result.comparisons += 1
+                reason = duplicate_reason(keys[i], keys[j])
+                if reason:
+                    parent[root_j] = root_i
+                    reasons[reason] += 1
+
+    groups = defaultdict(list)
+    for index in range(len(rows)):
+        groups[find(index)].append(index)
+    result.groups = [sorted(members, key=lambda i: _principal_order(rows, i))
+                     for members in groups.values() if len(members) > 1]
+    result.groups.sort(key=lambda group: min(group))
+    result.reasons = dict(reasons)
+    return result
+
+
+def _identifier(row):
+    return row.get('place_id') or row.get('titulo') or ''
+
+
+def apply_dedup(rows, mode) -> Tuple[List[dict], DedupResult]:
+    """
+    Detecta duplicados y devuelve las filas resultantes (sin modificar las
+    originales) y el resultado. En modo flag se marca cada duplicado con el
+    place_id del principal (las marcas anteriores se recalculan); en modo
+    merge el principal se completa con los campos que le falten y anota los
+    place_ids fusionados, y el resto desaparece.
+    """
+    if mode not in DEDUP_MODES:
+        raise ValueError(f"Modo de duplicados desconocido: {mode}")
+    rows = [{k: v for k, v in row.items() if k != DUPLICATE_OF_FIELD} for row in rows]
+    result = find_duplicates(rows)
+
+    if mode == DEDUP_FLAG:
+        for principal, *others in result.groups:
+            for index in others:
+                rows[index][DUPLICATE_OF_FIELD] = _identifier(rows[principal])
+        return rows, result
+
+    removed = set()
+    for principal, *others in result.groups:
+        target = rows[principal]
+        merged = [i for i in str(target.get(MERGED_IDS_FIELD) or '').split(';') if i]
+        for index in others:
+            row = rows[index]
+            for key, value in row.items():
+                if value not in (None, '') and target.get(key) in (None, ''):
+                    target[key] = value
+            merged.extend(i for i in [row.get('place_id'), *str(row.get(MERGED_IDS_FIELD) or '').split(';')] if i)
+            removed.add(index)
+        merged = sorted(set(merged) - {target.get('place_id')})
+        if merged:
+            target[MERGED_IDS_FIELD] = ';'.join(merged)
+    return [row for index, row in enumerate(rows) if index not in removed], result
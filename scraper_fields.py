@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# Google My Business Scraper - Plan de campos: búsqueda frente a Place Details
+#
+# Text Search ya devuelve nombre, dirección, rating, número de reseñas,
+# nivel de precios y referencias de fotos de cada negocio. Antes solo se
+# guardaban place_id y nombre, y cada negocio costaba después una llamada a
+# Place Details. Aquí se decide, según los campos seleccionados, qué sale
+# de la búsqueda y qué hay que pedir a Details: si todo está en la búsqueda
+# no se llama a Details, y si falta algo (teléfono, web, horarios) solo se
+# piden esos campos, lo que además evita los SKUs de datos que ya se
+# tienen (ver scraper_cost).
+#
+# Los datos de la búsqueda se guardan con los mismos nombres que usa
+# Details, así que el negocio se construye igual venga de donde venga.
+
+# Campo seleccionable -> campos de Place Details que lo rellenan
+DETAILS_FIELDS = {
+    'title': ('name',),
+    'phone': ('formatted_phone_number',),
+    'website': ('website',),
+    'address': ('formatted_address',),
+    'place_id': (),  # Ya se conoce
+    'rating': ('rating',),
+    'total_ratings': ('user_ratings_total',),
+    'opening_hours': ('opening_hours',),  # La búsqueda solo trae open_now, no los periodos
+    'price_level': ('price_level',),
+    'email': (),     # Se busca en la web (requiere el campo website)
+    'imagen': ()     # Se descarga con Place Photo
+}
+
+# Campos de Details que también trae cada resultado de Text Search
+SEARCH_RESULT_FIELDS = ('name', 'formatted_address', 'rating', 'user_ratings_total', 'price_level')
+SEARCH_PHOTOS_KEY = 'photos'  # Referencias de fotos de la búsqueda (para la imagen)
+# Campos de Details que cubre la búsqueda si no son SEARCH_RESULT_FIELDS
+# (Places API (New) pide en la búsqueda todos los seleccionados)
+SEARCH_FIELDS_KEY = 'fields'
+
+
+def search_payload(result, covered=SEARCH_RESULT_FIELDS):
+    """
+    Datos de un resultado de Text Search que evitan pedirlos a Details.
+    covered son los campos de Details que trae la búsqueda: uno que falta
+    en el resultado es que el negocio no lo tiene.
+    """
+    covered = tuple(covered)
+    payload = {key: result[key] for key in covered if result.get(key) is not None}
+    if covered != SEARCH_RESULT_FIELDS:
+        payload[SEARCH_FIELDS_KEY] = list(covered)
+    refs = [photo['photo_reference'] for photo in result.get('photos') or [] if photo.get('photo_reference')]
+    if refs:
+        payload[SEARCH_PHOTOS_KEY] = refs
+    return payload
+
+
+def plan_details_fields(selected, search=None):
+    """
+    Campos a pedir a Place Details para los campos seleccionados. Con los
+    datos de la búsqueda (search) se omiten los que ya trae; una lista vacía
+    significa que no hace falta llamar a Details. Sin search (resultados de
+    una cache antigua, refresco) se piden todos, con el nombre siempre.
+    """
+    fields = [] if search is not None else ['name']
+    covered = search.get(SEARCH_FIELDS_KEY, SEARCH_RESULT_FIELDS) if search is not None else ()
+    for name in sorted(selected, key=list(DETAILS_FIELDS).index):
+        for details_field in DETAILS_FIELDS[name]:
+            if details_field in fields or details_field in covered:
+                continue
+            fields.append(details_field)
+    return fields
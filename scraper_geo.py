@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# Google My Business Scraper - Geometría para la búsqueda por cuadrícula
+#
+# Text Search devuelve como máximo 60 resultados (3 páginas) por consulta.
+# Para cubrir una zona completa se busca por celdas (location + radius) y
+# cada celda que vuelve llena se divide en cuatro, como un quadtree. Este
+# módulo solo contiene la geometría; las búsquedas las hace ScraperEngine.
+
+import math
+from dataclasses import dataclass
+from typing import Optional
+
+EARTH_RADIUS_M = 6371000.0
+
+# Resultados máximos de Text Search por consulta (3 páginas de 20)
+TEXT_SEARCH_MAX_RESULTS = 60
+
+# Límites de la subdivisión: radio mínimo de celda y profundidad máxima
+MIN_TILE_RADIUS_M = 250
+MAX_TILE_DEPTH = 6
+
+# Radio máximo admitido por el parámetro radius de Text Search
+MAX_SEARCH_RADIUS_M = 50000
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    """Distancia en metros entre dos coordenadas"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+@dataclass(frozen=True)
+class BoundingBox:
+    """Rectángulo geográfico (grados decimales)"""
+    south: float
+    west: float
+    north: float
+    east: float
+
+    @classmethod
+    def parse(cls, text) -> Optional['BoundingBox']:
+        """
+        Interpreta "lat1,lng1,lat2,lng2" (dos esquinas opuestas).
+
+        Devuelve None si el texto no son cuatro números (p. ej. el nombre de
+        una ciudad) y lanza ValueError si las coordenadas no son válidas.
+        """
+        parts = [p.strip() for p in str(text).split(',')]
+        if len(parts) != 4:
+            return None
+        try:
+            lat1, lng1, lat2, lng2 = (float(p) for p in parts)
+        except ValueError:
+            return None
+
+        if not (-90 <= lat1 <= 90 and -90 <= lat2 <= 90):
+            raise ValueError("Las latitudes deben estar entre -90 y 90")
+        if not (-180 <= lng1 <= 180 and -180 <= lng2 <= 180):
+            raise ValueError("Las longitudes deben estar entre -180 y 180")
+        if lat1 == lat2 or lng1 == lng2:
+            raise ValueError("La zona debe tener ancho y alto")
+        return cls(min(lat1, lat2), min(lng1, lng2), max(lat1, lat2), max(lng1, lng2))
+
+    @classmethod
+    def from_viewport(cls, viewport) -> 'BoundingBox':
+        """Construye la zona a partir de geometry.viewport de la API de Places"""
+        ne, sw = viewport['northeast'], viewport['southwest']
+        return cls(sw['lat'], sw['lng'], ne['lat'], ne['lng'])
+
+    @property
+    def center(self):
+        return (self.south + self.north) / 2, (self.west + self.east) / 2
+
+    @property
+    def radius_m(self):
+        """Radio del círculo que contiene la celda completa"""
+        lat, lng = self.center
+        return haversine_m(lat, lng, self.north, self.east)
+
+    def contains(self, lat, lng):
+        return self.south <= lat <= self.north and self.west <= lng <= self.east
+
+    def split(self):
+        """Divide la celda en cuatro cuadrantes"""
+        mid_lat, mid_lng = self.center
+        return [
+            BoundingBox(mid_lat, self.west, self.north, mid_lng),  # NO
+            BoundingBox(mid_lat, mid_lng, self.north, self.east),  # NE
+            BoundingBox(self.south, self.west, mid_lat, mid_lng),  # SO
+            BoundingBox(self.south, mid_lng, mid_lat, self.east)   # SE
+        ]
+
+    def __str__(self):
+        return f"{self.south:.5f},{self.west:.5f},{self.north:.5f},{self.east:.5f}"
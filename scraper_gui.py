@@ -36,181 +36,27 @@ from tkinter import ttk, messagebox, filedialog, scrolledtext
 import json
 import csv
 import os
-import sys
+import shutil
+import itertools
 import threading
-import requests
+import queue
+from collections import deque
+from contextlib import nullcontext
 import time
-import random
-import re
-from io import BytesIO
-from PIL import Image
 import webbrowser
-from dataclasses import dataclass
-from typing import List, Optional, Dict
-import unicodedata
-from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
-import base64
-import hashlib
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-import platform
-import logging
-from logging.handlers import RotatingFileHandler
-
-def normalize_filename(filename):
-    """Normaliza nombres de archivos: espacios -> guiones, minúsculas, sin caracteres especiales"""
-    # Convertir a minúsculas
-    filename = filename.lower()
-    # Reemplazar espacios con guiones
-    filename = filename.replace(' ', '-')
-    # Normalizar caracteres unicode (quitar acentos)
-    filename = unicodedata.normalize('NFD', filename)
-    filename = ''.join(c for c in filename if not unicodedata.combining(c))
-    # Remover caracteres no válidos para nombres de archivo
-    filename = re.sub(r'[^a-z0-9\-_.]', '', filename)
-    # Evitar guiones múltiples
-    filename = re.sub(r'-+', '-', filename)
-    # Quitar guiones al inicio/final
-    filename = filename.strip('-')
-    return filename
-
-def parse_keywords(text):
-    """Parsea texto con múltiples keywords y retorna lista limpia"""
-    # Reemplazar comas y punto y coma por saltos de línea
-    text = text.replace(',', '\n').replace(';', '\n')
-
-    # Dividir por líneas y limpiar
-    keywords = []
-    for line in text.split('\n'):
-        line = line.strip()
-        if line:  # Ignorar líneas vacías
-            keywords.append(line)
-
-    return keywords
-
-def setup_logging():
-    """Configura el sistema de logging con rotación de archivos"""
-    # Obtener directorio del script o ejecutable
-    if getattr(sys, 'frozen', False):
-        # Si está compilado con PyInstaller
-        script_dir = os.path.dirname(sys.executable)
-    else:
-        # Si se ejecuta como script Python
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-    
-    log_file = os.path.join(script_dir, 'scraper.log')
-
-    # Configurar logging con rotación (max 5 archivos de 1MB cada uno)
-    handler = RotatingFileHandler(
-        log_file,
-        maxBytes=1024*1024,  # 1MB
-        backupCount=5,
-        encoding='utf-8'
-    )
-
-    # Formato del log
-    formatter = logging.Formatter(
-        '%(asctime)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    handler.setFormatter(formatter)
-
-    # Configurar logger
-    logger = logging.getLogger('GMBScraper')
-    logger.setLevel(logging.INFO)
-    logger.addHandler(handler)
-
-    return logger
-
-# Configuración por defecto
-DEFAULT_API_KEY_FILE = '.gmb_config.enc'  # Archivo cifrado
-URL_TEXT_SEARCH = 'https://maps.googleapis.com/maps/api/place/textsearch/json'
-URL_PLACE_DETAILS = 'https://maps.googleapis.com/maps/api/place/details/json'
-URL_PLACE_PHOTO = 'https://maps.googleapis.com/maps/api/place/photo'
-APP_VERSION = "1.3.2"
-
-class SecureConfig:
-    """Gestión segura de configuración con cifrado"""
-
-    def __init__(self):
-        # Usar ruta absoluta basada en el directorio del script o ejecutable
-        if getattr(sys, 'frozen', False):
-            # Si está compilado con PyInstaller
-            script_dir = os.path.dirname(sys.executable)
-        else:
-            # Si se ejecuta como script Python
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-        
-        self.config_file = os.path.join(script_dir, DEFAULT_API_KEY_FILE)
-        self._key = self._get_machine_key()
-        self.fernet = Fernet(self._key)
-
-    def _get_machine_key(self):
-        """Genera una clave de cifrado única basada en la máquina"""
-        # Obtener un identificador único de la máquina
-        machine_id = platform.node() + platform.system() + os.path.expanduser("~")
-
-        # Derivar una clave de cifrado usando PBKDF2HMAC
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=b'gmb_scraper_salt_v1',  # Salt fijo para consistencia
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(machine_id.encode()))
-        return key
-
-    def save_api_key(self, api_key: str) -> bool:
-        """Guarda la API Key cifrada"""
-        try:
-            encrypted_key = self.fernet.encrypt(api_key.encode())
-            with open(self.config_file, 'wb') as f:
-                f.write(encrypted_key)
-            return True
-        except Exception as e:
-            print(f"Error guardando API Key: {e}")
-            return False
-
-    def load_api_key(self) -> Optional[str]:
-        """Carga y descifra la API Key"""
-        try:
-            if not os.path.exists(self.config_file):
-                return None
-
-            with open(self.config_file, 'rb') as f:
-                encrypted_key = f.read()
-
-            decrypted_key = self.fernet.decrypt(encrypted_key)
-            return decrypted_key.decode()
-        except Exception as e:
-            print(f"Error cargando API Key: {e}")
-            return None
-
-    def delete_api_key(self) -> bool:
-        """Elimina el archivo de configuración"""
-        try:
-            if os.path.exists(self.config_file):
-                os.remove(self.config_file)
-            return True
-        except Exception as e:
-            print(f"Error eliminando API Key: {e}")
-            return False
-
-@dataclass
-class BusinessData:
-    title: str
-    phone: Optional[str] = None
-    website: Optional[str] = None
-    address: Optional[str] = None
-    place_id: Optional[str] = None
-    rating: Optional[float] = None
-    total_ratings: Optional[int] = None
-    opening_hours: Optional[str] = None
-    price_level: Optional[int] = None
-    email: Optional[str] = None
-    image_path: Optional[str] = None
+from scraper_core import (parse_keywords, build_output_filename, setup_logging, get_app_dir, find_api_key,
+                          find_api_keys, SecureConfig, ScrapeOptions, ScraperEngine, DEFAULT_FIELDS, APP_VERSION)
+from scraper_metrics import RunMetrics
+from scraper_keys import parse_key_entry, format_key_entry
+from scraper_profile import PHASE_GUI
+from scraper_storage import open_dataset, iter_json_array, dataset_format, is_dataset_file
+from scraper_index import DatasetIndex
+from scraper_places_new import BACKENDS, BACKEND_LEGACY
+
+# Refresco de la GUI desde el hilo de scraping
+UI_POLL_INTERVAL_MS = 100  # Cada cuánto drena el hilo principal la cola de la GUI
+LOG_MAX_LINES = 2000  # Líneas máximas que conserva el área de log
+METRICS_REFRESH_SECONDS = 1.0  # Refresco del resumen de métricas aunque no haya llamadas a la API
 
 class GoogleMyBusinessScraperGUI:
     def __init__(self, root):
@@ -226,9 +72,24 @@ class GoogleMyBusinessScraperGUI:
         self.scraped_data = []
         self.secure_config = SecureConfig()
         self.scraping_thread = None
+        self.engine = None
         self.api_calls_count = 0
         self.estimated_cost = 0.0
         self.visited_websites_no_email = set()  # Cache de URLs sin email
+        self.key_pool_entries = []  # API Keys adicionales (pool cifrado y GOOGLE_PLACES_API_KEYS)
+        self.dataset_index = None  # Índice de búsqueda de data/ (se crea al buscar por primera vez)
+
+        # Cola de actualizaciones de la GUI: el hilo de scraping nunca toca Tk,
+        # solo encola líneas de log y llamadas que el hilo principal ejecuta
+        self.log_buffer = deque(maxlen=LOG_MAX_LINES)
+        self.ui_calls = queue.Queue()
+        self.stats_lock = threading.Lock()
+        self.stats_dirty = False
+        self.metrics_refreshed_at = 0.0  # time.monotonic() del último refresco de metrics_var
+        self.metrics_live = False  # Había un scraping en curso en el último ciclo
+
+        # Métricas por endpoint y por etapa de la ejecución actual
+        self.metrics = RunMetrics()
 
         # Inicializar logger
         self.logger = setup_logging()
@@ -237,6 +98,7 @@ class GoogleMyBusinessScraperGUI:
         self.setup_ui()
         self.load_api_key()
         self.refresh_json_files()
+        self.root.after(UI_POLL_INTERVAL_MS, self.process_ui_queue)
         
     def setup_styles(self):
         style = ttk.Style()
@@ -332,19 +194,7 @@ class GoogleMyBusinessScraperGUI:
         fields_frame.pack(side='left', fill='both', expand=True, padx=(0,5))
         
         # Checkboxes para campos
-        self.field_vars = {
-            'title': tk.BooleanVar(value=True),
-            'phone': tk.BooleanVar(value=True),
-            'website': tk.BooleanVar(value=True),
-            'address': tk.BooleanVar(value=True),
-            'place_id': tk.BooleanVar(value=False),
-            'rating': tk.BooleanVar(value=True),
-            'total_ratings': tk.BooleanVar(value=True),
-            'opening_hours': tk.BooleanVar(value=False),
-            'price_level': tk.BooleanVar(value=False),
-            'email': tk.BooleanVar(value=False),
-            'imagen': tk.BooleanVar(value=False)
-        }
+        self.field_vars = {field: tk.BooleanVar(value=enabled) for field, enabled in DEFAULT_FIELDS.items()}
         
         field_labels = {
             'title': 'Título',
@@ -424,9 +274,38 @@ class GoogleMyBusinessScraperGUI:
                                command=self.show_60_limit_info, bg=self.primary_color, fg='white',
                                cursor='hand2', padx=3, pady=0, relief='flat')
         info_button.grid(row=2, column=2, sticky='w', padx=2)
+
+        # Negocios procesados en paralelo
+        tk.Label(api_grid, text="Workers:", bg=self.bg_color, font=('Segoe UI', 9)).grid(row=2, column=3, sticky='w')
+        self.workers_var = tk.IntVar(value=1)
+        tk.Spinbox(api_grid, from_=1, to=16, width=5,
+                  textvariable=self.workers_var).grid(row=2, column=4, sticky='w', padx=2)
+
+        # Zona para la búsqueda por cuadrícula (vacío = búsqueda normal)
+        tk.Label(api_grid, text="Zona:", bg=self.bg_color, font=('Segoe UI', 9)).grid(row=3, column=0, sticky='w', pady=1)
+        self.area_var = tk.StringVar(value="")
+        tk.Entry(api_grid, textvariable=self.area_var, width=24,
+                 font=('Segoe UI', 9)).grid(row=3, column=1, columnspan=4, sticky='we', padx=2)
+
+        # Las búsquedas repetidas se reutilizan 24 h desde la cache
+        self.refresh_search_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(api_grid, text="Refrescar búsquedas (ignorar cache)", variable=self.refresh_search_var,
+                       bg=self.bg_color, font=('Segoe UI', 8)).grid(row=4, column=0, columnspan=5, sticky='w')
+
+        # Presupuesto máximo de la ejecución (vacío = sin límite)
+        tk.Label(api_grid, text="Presupuesto $:", bg=self.bg_color, font=('Segoe UI', 9)).grid(row=5, column=0, sticky='w', pady=1)
+        self.budget_var = tk.StringVar(value="")
+        tk.Entry(api_grid, textvariable=self.budget_var, width=8,
+                 font=('Segoe UI', 9)).grid(row=5, column=1, sticky='w', padx=2)
+
+        # API de Places: legacy o Places API (New) (campos en la búsqueda, sin Place Details)
+        tk.Label(api_grid, text="API:", bg=self.bg_color, font=('Segoe UI', 9)).grid(row=5, column=2, sticky='w')
+        self.backend_var = tk.StringVar(value=BACKEND_LEGACY)
+        ttk.Combobox(api_grid, textvariable=self.backend_var, values=list(BACKENDS),
+                     state="readonly", width=7).grid(row=5, column=3, columnspan=2, sticky='w', padx=2)
         
         # Advertencia del límite de 60 (más pequeña)
-        warning_label = tk.Label(api_frame, text="⚠️ Máx 60 resultados por keyword automática",
+        warning_label = tk.Label(api_frame, text="⚠️ Máx 60 resultados por keyword (sin límite si indicas Zona)",
                                 fg='#FF9800', font=('Segoe UI', 8), bg=self.bg_color)
         warning_label.pack(anchor='w', pady=(5, 0))
         
@@ -448,6 +327,10 @@ class GoogleMyBusinessScraperGUI:
                                        command=self.refresh_scraper, bg=self.warning_color, fg='white',
                                        font=('Segoe UI', 11, 'bold'), padx=20, cursor='hand2', relief='flat')
         self.refresh_button.pack(side='left', padx=10)
+
+        tk.Button(control_frame, text="Estimar Coste", command=self.estimate_cost,
+                  bg='#9C27B0', fg='white', font=('Segoe UI', 11, 'bold'), padx=20,
+                  cursor='hand2', relief='flat').pack(side='left', padx=10)
         
         # Área de log y progreso combinada para visibilidad
         bottom_frame = tk.Frame(self.scraping_frame, bg=self.bg_color)
@@ -459,6 +342,12 @@ class GoogleMyBusinessScraperGUI:
                                    bg=self.bg_color, font=('Segoe UI', 9), fg='#666666')
         api_stats_label.pack(anchor='e')
 
+        # Latencias y ritmo por endpoint/etapa (se actualiza en vivo)
+        self.metrics_var = tk.StringVar(value="")
+        metrics_label = tk.Label(bottom_frame, textvariable=self.metrics_var,
+                                 bg=self.bg_color, font=('Segoe UI', 8), fg='#888888')
+        metrics_label.pack(anchor='e')
+
         # Barra de progreso con etiqueta
         progress_info_frame = tk.Frame(bottom_frame, bg=self.bg_color)
         progress_info_frame.pack(fill='x', pady=(0, 5))
@@ -509,6 +398,38 @@ class GoogleMyBusinessScraperGUI:
         tk.Button(files_buttons_frame, text="Exportar", command=self.export_file,
                  bg='#9C27B0', fg='white', padx=15, relief='flat', cursor='hand2').pack(side='left', padx=5)
         
+        # Búsqueda en todos los datasets (índice en data/.dataset_index.sqlite3)
+        search_frame = ttk.LabelFrame(self.files_frame, text="Buscar en los Datos", padding=10)
+        search_frame.pack(fill='x', padx=10, pady=5)
+
+        tk.Label(search_frame, text="Texto:", bg=self.bg_color, font=('Segoe UI', 9)).grid(row=0, column=0, sticky='w')
+        self.search_text_var = tk.StringVar(value="")
+        search_entry = tk.Entry(search_frame, textvariable=self.search_text_var, width=30, font=('Segoe UI', 9))
+        search_entry.grid(row=0, column=1, sticky='we', padx=2)
+        search_entry.bind('<Return>', lambda event: self.search_datasets())
+
+        tk.Label(search_frame, text="Rating mín:", bg=self.bg_color, font=('Segoe UI', 9)).grid(row=0, column=2, sticky='w', padx=(8, 0))
+        self.search_rating_var = tk.StringVar(value="")
+        tk.Entry(search_frame, textvariable=self.search_rating_var, width=5,
+                 font=('Segoe UI', 9)).grid(row=0, column=3, sticky='w', padx=2)
+
+        tk.Label(search_frame, text="Reseñas mín:", bg=self.bg_color, font=('Segoe UI', 9)).grid(row=0, column=4, sticky='w', padx=(8, 0))
+        self.search_ratings_var = tk.StringVar(value="")
+        tk.Entry(search_frame, textvariable=self.search_ratings_var, width=7,
+                 font=('Segoe UI', 9)).grid(row=0, column=5, sticky='w', padx=2)
+
+        self.search_email_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(search_frame, text="Con email", variable=self.search_email_var,
+                       bg=self.bg_color, font=('Segoe UI', 9)).grid(row=0, column=6, sticky='w', padx=(8, 0))
+
+        self.search_button = tk.Button(search_frame, text="Buscar", command=self.search_datasets,
+                                       bg=self.primary_color, fg='white', padx=15, relief='flat', cursor='hand2')
+        self.search_button.grid(row=0, column=7, padx=(8, 0))
+        search_frame.columnconfigure(1, weight=1)
+
+        tk.Label(search_frame, text="Título o dirección (p. ej. \"cafetería madrid\"), en todos los archivos de data/",
+                 fg='#666666', bg=self.bg_color, font=('Segoe UI', 8)).grid(row=1, column=0, columnspan=8, sticky='w')
+
         # Área de vista previa
         preview_frame = ttk.LabelFrame(self.files_frame, text="Vista Previa", padding=5)
         preview_frame.pack(fill='both', expand=True, padx=10, pady=5)
@@ -575,6 +496,25 @@ Pasos para obtener tu API Key:
         tk.Button(buttons_frame, text="Limpiar", command=self.clear_api_key,
                  bg=self.danger_color, fg='white', font=('Segoe UI', 11, 'bold'), padx=20, pady=5, relief='flat', cursor='hand2').pack(side='left', padx=5)
 
+        # Pool de API Keys adicionales (reparto y failover entre proyectos)
+        tk.Label(api_config_frame, text="API Keys adicionales (pool, una por línea):",
+                 font=('Arial', 10, 'bold')).pack(anchor='w', pady=(10, 0))
+        tk.Label(api_config_frame, text="Formato: KEY,qps,presupuesto_diario_USD,etiqueta (vacío = sin límite)",
+                 font=('Segoe UI', 8), bg=self.bg_color, fg=self.text_color).pack(anchor='w')
+        self.key_pool_text = tk.Text(api_config_frame, height=4, font=('Consolas', 9))
+        self.key_pool_text.pack(fill='x', pady=5)
+        tk.Button(api_config_frame, text="Guardar pool", command=self.save_key_pool,
+                 bg=self.primary_color, fg='white', font=('Segoe UI', 10, 'bold'), padx=15, relief='flat',
+                 cursor='hand2').pack(anchor='w')
+
+        # Diagnóstico de rendimiento
+        self.profile_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(api_config_frame, text="Perfilar ejecuciones (tiempo por fase y volcado de CPU junto al dataset)",
+                       variable=self.profile_var).pack(anchor='w', pady=(10, 0))
+        self.run_log_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(api_config_frame, text="Guardar log estructurado (JSON Lines) de cada ejecución junto al dataset",
+                       variable=self.run_log_var).pack(anchor='w')
+
         # Actualizar el estado inicial
         self.update_api_status()
 
@@ -633,6 +573,26 @@ Pasos para obtener tu API Key:
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo guardar la API Key:\n{e}")
 
+    def save_key_pool(self):
+        """Guarda cifrado el pool de API Keys adicionales"""
+        try:
+            entries = [entry for entry in map(parse_key_entry, self.key_pool_text.get("1.0", tk.END).splitlines())
+                       if entry]
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+
+        if self.secure_config.save_key_pool(entries):
+            self.key_pool_entries = entries
+            self.log(f"🔑 Pool de API Keys guardado: {len(entries)} keys adicionales")
+            messagebox.showinfo("Éxito", f"✅ Pool guardado de forma cifrada ({len(entries)} keys)")
+        else:
+            messagebox.showerror("Error", "No se pudo guardar el pool de API Keys")
+
+    def update_key_pool_text(self):
+        self.key_pool_text.delete("1.0", tk.END)
+        self.key_pool_text.insert("1.0", '\n'.join(format_key_entry(e) for e in self.key_pool_entries))
+
     def load_api_from_file(self):
         """Carga la API Key desde un archivo seleccionado"""
         filepath = filedialog.askopenfilename(
@@ -676,36 +636,31 @@ Pasos para obtener tu API Key:
                 messagebox.showerror("Error", f"No se pudo eliminar la API Key:\n{e}")
 
     def load_api_key(self):
+        """Carga la API key en segundo plano para no retrasar la apertura de la ventana"""
+        # Descifrar la configuración deriva la clave con PBKDF2 (100.000 iteraciones)
+        threading.Thread(target=self.load_api_key_worker, daemon=True).start()
+
+    def load_api_key_worker(self):
         """Carga la API key desde diferentes fuentes (variables de entorno, archivo cifrado, etc.)"""
         try:
-            # Prioridad 1: Variable de entorno
-            api_key = os.environ.get('GOOGLE_PLACES_API_KEY')
-            if api_key:
-                self.api_key = api_key.strip()
-                self.log("✅ API Key cargada desde variable de entorno")
-                self.update_api_status()
-                return
-
-            # Prioridad 2: Archivo cifrado
-            api_key = self.secure_config.load_api_key()
+            # Prioridad: variable de entorno, archivo cifrado, archivo legacy
+            api_key, source = find_api_key(self.secure_config)
+            self.key_pool_entries = [e for e in find_api_keys(self.secure_config) if e['key'] != api_key]
+            if self.key_pool_entries:
+                self.log(f"🔑 Pool de API Keys: {len(self.key_pool_entries)} keys adicionales")
+                self.ui_call(self.update_key_pool_text)
             if api_key:
                 self.api_key = api_key
-                self.log("✅ API Key cargada desde configuración guardada")
-                self.update_api_status()
+                if source == 'env':
+                    self.log("✅ API Key cargada desde variable de entorno")
+                elif source == 'config':
+                    self.log("✅ API Key cargada desde configuración guardada")
+                else:
+                    self.log("⚠️ API Key cargada desde archivo legacy")
+                    self.log("💡 Se recomienda guardar la API Key desde la pestaña Configuración para usar cifrado")
+                self.ui_call(self.update_api_status)
                 return
 
-            # Prioridad 3: Archivo de texto plano legacy (compatibilidad con versiones anteriores)
-            legacy_file = 'google_api_key.txt'
-            if os.path.isfile(legacy_file):
-                with open(legacy_file, 'r', encoding='utf-8') as f:
-                    api_key = f.read().strip()
-                    if api_key:
-                        self.api_key = api_key
-                        self.log("⚠️ API Key cargada desde archivo legacy")
-                        self.log("💡 Se recomienda guardar la API Key desde la pestaña Configuración para usar cifrado")
-                        self.update_api_status()
-                        return
-
             # No se encontró API key
             self.log("ℹ️ No se encontró API Key configurada")
             self.log("💡 Por favor, configura tu API Key en la pestaña 'Configuración'")
@@ -719,110 +674,101 @@ Pasos para obtener tu API Key:
         timestamp = time.strftime('%H:%M:%S')
         formatted_message = f"{timestamp} - {message}"
 
-        # Log en GUI
-        self.log_text.insert(tk.END, f"{formatted_message}\n")
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
-
-        # Log en archivo
-        # Quitar emojis para el archivo de log
-        clean_message = message.encode('ascii', 'ignore').decode('ascii')
-        self.logger.info(clean_message)
-
-    def increment_api_calls(self, call_type='details'):
-        """Incrementa contador de API calls y actualiza costo"""
-        self.api_calls_count += 1
-
-        # Costos de Places API (por llamada)
-        # Text Search: $0.017
-        # Details: $0.017
-        cost_per_call = 0.017
-        self.estimated_cost += cost_per_call
-
-        # Actualizar GUI
-        self.api_stats_var.set(
-            f"API Calls: {self.api_calls_count} | Costo estimado: ${self.estimated_cost:.3f}"
-        )
-        self.root.update_idletasks()
+        # Log en GUI (se pinta por lotes desde process_ui_queue)
+        self.log_buffer.append(formatted_message)
 
-    def validate_api_key(self):
-        """Valida la API key haciendo una petición de prueba"""
-        if not self.api_key:
-            return False
+        # Log en archivo (se escribe sin emojis en segundo plano)
+        self.logger.info(message)
 
-        try:
-            self.log("🔍 Validando API Key...")
-            params = {
-                'query': 'test',
-                'key': self.api_key
-            }
-
-            response = requests.get(URL_TEXT_SEARCH, params=params, timeout=10)
-            data = response.json()
-
-            status = data.get('status', 'UNKNOWN')
-
-            if status == 'REQUEST_DENIED':
-                error_msg = data.get('error_message', 'API Key inválida o sin permisos')
-                self.log(f"❌ API Key inválida: {error_msg}")
-                return False
-            elif status == 'INVALID_REQUEST' or status == 'ZERO_RESULTS' or status == 'OK':
-                # Estos estados significan que la API key es válida
-                self.log("✅ API Key válida")
-                return True
-            else:
-                self.log(f"⚠️ Estado inesperado: {status}")
-                return False
-
-        except requests.RequestException as e:
-            self.log(f"❌ Error validando API Key: {e}")
-            return False
-
-    def save_checkpoint(self, filename, processed_count):
-        """Guarda checkpoint del progreso actual"""
-        if getattr(sys, 'frozen', False):
-            # Si está compilado con PyInstaller
-            script_dir = os.path.dirname(sys.executable)
-        else:
-            # Si se ejecuta como script Python
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-        
-        checkpoint_file = os.path.join(script_dir, '.scraper_checkpoint.json')
-
-        checkpoint_data = {
-            'filename': filename,
-            'processed_count': processed_count,
-            'timestamp': time.time(),
-            'scraped_data_count': len(self.scraped_data)
-        }
+    def ui_call(self, func, *args):
+        """Encola una llamada a Tk para ejecutarla en el hilo principal"""
+        self.ui_calls.put((func, args))
 
+    def process_ui_queue(self):
+        """Drena la cola de la GUI por lotes (se ejecuta en el hilo principal)"""
+        # Con el perfilado activo, el refresco cuenta como la fase "gui"
+        profiler = self.engine.profiler if self.engine and self.is_scraping else None
         try:
-            with open(checkpoint_file, 'w', encoding='utf-8') as f:
-                json.dump(checkpoint_data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            self.log(f"⚠️ Error guardando checkpoint: {e}")
-
-    def clear_checkpoint(self):
-        """Elimina el archivo de checkpoint"""
-        if getattr(sys, 'frozen', False):
-            # Si está compilado con PyInstaller
-            script_dir = os.path.dirname(sys.executable)
-        else:
-            # Si se ejecuta como script Python
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-        
-        checkpoint_file = os.path.join(script_dir, '.scraper_checkpoint.json')
-
-        try:
-            if os.path.exists(checkpoint_file):
-                os.remove(checkpoint_file)
-        except Exception as e:
-            self.log(f"⚠️ Error eliminando checkpoint: {e}")
+            with profiler.phase(PHASE_GUI) if profiler else nullcontext():
+                self.drain_ui_queue()
+        except tk.TclError:
+            return  # La ventana se ha cerrado
+
+        self.root.after(UI_POLL_INTERVAL_MS, self.process_ui_queue)
+
+    def drain_ui_queue(self):
+        """Vuelca el log pendiente, las llamadas encoladas y los contadores"""
+        # Volcar todas las líneas pendientes con una sola inserción
+        lines = []
+        while self.log_buffer:
+            try:
+                lines.append(self.log_buffer.popleft())
+            except IndexError:
+                break
+        if lines:
+            self.log_text.insert(tk.END, '\n'.join(lines) + '\n')
+            # Mantener acotado el widget descartando las líneas más antiguas
+            line_count = int(self.log_text.index('end-1c').split('.')[0])
+            if line_count > LOG_MAX_LINES:
+                self.log_text.delete('1.0', f'{line_count - LOG_MAX_LINES}.0')
+            self.log_text.see(tk.END)
+
+        # Ejecutar actualizaciones de widgets encoladas por el hilo de scraping
+        while True:
+            try:
+                func, args = self.ui_calls.get_nowait()
+            except queue.Empty:
+                break
+            func(*args)
+
+        # Refrescar contador de API calls como máximo una vez por ciclo
+        if self.stats_dirty:
+            with self.stats_lock:
+                self.stats_dirty = False
+                calls, cost = self.api_calls_count, self.estimated_cost
+            stats_line = f"API Calls: {calls} | Costo estimado: ${cost:.3f}"
+            if self.engine and len(self.engine.key_pool) > 1:
+                stats_line += f" | {self.engine.key_pool.summary_line()}"
+            self.api_stats_var.set(stats_line)
+            self.refresh_metrics()
+
+        # Ritmo y ETA cambian también sin llamadas a la API (emails, cache,
+        # guardado): refresco periódico mientras hay un scraping en curso y
+        # uno final al terminar
+        running = self.scraping_thread is not None and self.scraping_thread.is_alive()
+        if running and time.monotonic() - self.metrics_refreshed_at >= METRICS_REFRESH_SECONDS:
+            self.refresh_metrics()
+        elif self.metrics_live and not running:
+            self.refresh_metrics()
+        self.metrics_live = running
+
+    def refresh_metrics(self):
+        self.metrics_var.set(self.metrics.summary_line())
+        self.metrics_refreshed_at = time.monotonic()
+
+    def increment_api_calls(self, call_type='details', cost_per_call=0.017):
+        """Incrementa contador de API calls y actualiza costo (callback del motor)"""
+        with self.stats_lock:
+            self.api_calls_count += 1
+            self.estimated_cost += cost_per_call
+            # La etiqueta se actualiza en el siguiente ciclo de process_ui_queue
+            self.stats_dirty = True
 
     def show_60_limit_info(self):
         """Muestra información sobre cómo obtener más de 60 resultados"""
         info_message = """Google Places API limita cada búsqueda a 60 resultados máximos.
 
+✅ BÚSQUEDA POR ZONA (CUADRÍCULA AUTOMÁTICA):
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+Escribe una ciudad en "Zona" (ej: Madrid) o un rectángulo
+"lat1,lng1,lat2,lng2" y una keyword sin ubicación:
+
+   restaurantes
+
+La zona se divide en celdas y cada celda con 60 resultados
+se vuelve a dividir en cuatro hasta cubrirla entera.
+
 ✅ BÚSQUEDAS MÚLTIPLES AUTOMÁTICAS:
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
@@ -876,7 +822,7 @@ combinará los resultados sin duplicados.
             files = []
             for root, dirs, filenames in os.walk(data_dir):
                 for f in filenames:
-                    if f.endswith(('.json', '.csv')):
+                    if is_dataset_file(f):  # También .json.gz, .csv.xz...
                         # Obtener ruta relativa desde 'data/'
                         rel_path = os.path.relpath(os.path.join(root, f), data_dir)
                         files.append(rel_path)
@@ -904,13 +850,12 @@ combinará los resultados sin duplicados.
     def view_json_file_content(self, filename):
         try:
             filepath = os.path.join('data', filename)
-            file_ext = os.path.splitext(filename)[1].lower()
             
             self.preview_text.delete(1.0, tk.END)
             
-            if file_ext == '.csv':
-                # Leer archivo CSV
-                with open(filepath, 'r', encoding='utf-8') as f:
+            if dataset_format(filename) == 'csv':
+                # Leer archivo CSV (comprimido o no)
+                with open_dataset(filepath, 'r', encoding='utf-8-sig') as f:
                     csv_reader = csv.reader(f)
                     content = []
                     for i, row in enumerate(csv_reader):
@@ -924,14 +869,66 @@ combinará los resultados sin duplicados.
                             break
                     self.preview_text.insert(1.0, '\n'.join(content))
             else:
-                # Leer archivo JSON
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                self.preview_text.insert(1.0, json.dumps(data, indent=2, ensure_ascii=False))
+                # Leer solo los primeros registros del JSON (comprimido o no)
+                with open_dataset(filepath, 'r', encoding='utf-8') as f:
+                    data = list(itertools.islice(iter_json_array(f), 21))
+                preview = json.dumps(data[:20], indent=2, ensure_ascii=False)
+                if len(data) > 20:
+                    preview += '\n... (archivo truncado para vista previa)'
+                self.preview_text.insert(1.0, preview)
             
         except Exception as e:
             messagebox.showerror("Error", f"Error al leer el archivo: {e}")
             
+    def search_datasets(self):
+        """Lanza la búsqueda en los datasets con los filtros del panel"""
+        try:
+            rating = self.search_rating_var.get().strip().replace(',', '.')
+            min_rating = float(rating) if rating else None
+            ratings = self.search_ratings_var.get().strip()
+            min_ratings = int(ratings) if ratings else None
+        except ValueError:
+            messagebox.showwarning("Advertencia", "El rating y las reseñas mínimas deben ser números")
+            return
+
+        if self.dataset_index is None:
+            self.dataset_index = DatasetIndex('data')
+        self.search_button.config(state='disabled')
+        # La primera vez (o tras cambios en los archivos) hay que indexar: fuera del hilo de Tk
+        threading.Thread(target=self.search_datasets_worker, daemon=True,
+                         args=(self.search_text_var.get(), min_rating, min_ratings,
+                               self.search_email_var.get())).start()
+
+    def search_datasets_worker(self, text, min_rating, min_ratings, with_email):
+        try:
+            sync = self.dataset_index.sync()
+            if sync.indexed or sync.removed:
+                self.log(f"🔎 Índice de búsqueda actualizado: {len(sync.indexed)} archivos "
+                         f"({sync.records} registros), {len(sync.removed)} eliminados")
+            for path in sync.errors:
+                self.log(f"⚠️ No se pudo indexar {path}")
+            start = time.perf_counter()
+            result = self.dataset_index.search(text, min_rating, min_ratings, with_email)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.ui_call(self.show_search_results, result, elapsed_ms)
+        except Exception as e:
+            self.log(f"❌ Error en la búsqueda: {e}")
+            self.ui_call(self.search_button.config, {'state': 'normal'})
+
+    def show_search_results(self, result, elapsed_ms):
+        """Muestra los resultados de la búsqueda en la vista previa"""
+        self.search_button.config(state='normal')
+        content = [f"{result.total} registros encontrados en {elapsed_ms:.0f} ms"
+                   + (f" (se muestran los {len(result.rows)} mejor valorados)" if result.total > len(result.rows) else ""),
+                   '']
+        columns = ('titulo', 'direccion', 'telefono', 'email', 'rating', 'total_ratings')
+        content.append(' | '.join(columns) + ' | archivo')
+        content.append('-' * len(content[-1]))
+        for row, dataset in zip(result.rows, result.datasets):
+            content.append(' | '.join(str(row.get(column) or '') for column in columns) + f" | {dataset}")
+        self.preview_text.delete(1.0, tk.END)
+        self.preview_text.insert(1.0, '\n'.join(content))
+
     def delete_selected_file(self):
         selection = self.files_listbox.curselection()
         if not selection:
@@ -958,9 +955,8 @@ combinará los resultados sin duplicados.
             return
         
         filename = self.files_listbox.get(selection[0])
-        # Determinar extensión del archivo original
-        file_ext = os.path.splitext(filename)[1]
-        if file_ext == '.csv':
+        # Determinar el formato del archivo original (sin la compresión)
+        if dataset_format(filename) == 'csv':
             default_ext = ".csv"
             filetypes = [("CSV files", "*.csv"), ("JSON files", "*.json"), ("All files", "*.*")]
         else:
@@ -976,17 +972,18 @@ combinará los resultados sin duplicados.
         if dest:
             try:
                 filepath = os.path.join('data', filename)
-                # Determinar la codificación apropiada según el tipo de archivo
-                if dest.lower().endswith('.csv'):
+                # Se copia por bloques: el origen se descomprime y el destino
+                # se comprime si termina en .gz o .xz
+                if dataset_format(dest) == 'csv':
                     # Para archivos CSV, usar UTF-8 con BOM para compatibilidad con Excel
-                    with open(filepath, 'r', encoding='utf-8') as src:
-                        with open(dest, 'w', encoding='utf-8-sig', newline='') as dst:
-                            dst.write(src.read())
+                    with open_dataset(filepath, 'r', encoding='utf-8-sig') as src:
+                        with open_dataset(dest, 'w', encoding='utf-8-sig', newline='') as dst:
+                            shutil.copyfileobj(src, dst)
                 else:
                     # Para otros archivos (JSON), usar UTF-8 estándar
-                    with open(filepath, 'r', encoding='utf-8') as src:
-                        with open(dest, 'w', encoding='utf-8') as dst:
-                            dst.write(src.read())
+                    with open_dataset(filepath, 'r', encoding='utf-8') as src:
+                        with open_dataset(dest, 'w', encoding='utf-8') as dst:
+                            shutil.copyfileobj(src, dst)
                 messagebox.showinfo("Éxito", f"Archivo exportado a {dest}")
             except Exception as e:
                 messagebox.showerror("Error", f"Error al exportar: {e}")
@@ -1010,27 +1007,42 @@ combinará los resultados sin duplicados.
         # Obtener formato seleccionado
         output_format = self.format_var.get()
         
-        if not filename:
-            # Usar la primera keyword para el nombre de archivo
-            filename = f"{normalize_filename(keywords[0])}-data"
-        else:
-            # Normalizar nombre de archivo
-            filename = normalize_filename(filename)
-            
-        # Agregar extensión apropiada
-        if output_format == "csv":
-            if not filename.endswith('.csv'):
-                filename += '.csv'
-        else:
-            if not filename.endswith('.json'):
-                filename += '.json'
+        filename = build_output_filename(keywords, filename, output_format)
             
         if not self.api_key:
             messagebox.showerror("Error", "No se ha cargado la API Key")
             return
 
+        # Validar que al menos un campo esté seleccionado
+        if not any(var.get() for var in self.field_vars.values()):
+            messagebox.showerror("Error", "Selecciona al menos un campo para extraer")
+            return
+
+        # Copiar la configuración de Tk antes de lanzar el hilo: el motor
+        # de scraping no lee variables de Tk
+        try:
+            options = self.read_run_options()
+        except ValueError as e:
+            messagebox.showerror("Error", f"Zona no válida: {e}")
+            return
+
+        # Nueva ejecución: métricas desde cero
+        self.metrics.reset()
+
+        key_entries = [{'key': self.api_key, 'label': 'Principal'}] + self.key_pool_entries
+        self.engine = ScraperEngine(
+            key_entries,
+            options,
+            on_log=self.log,
+            on_progress=self.report_progress,
+            on_api_call=self.increment_api_calls,
+            metrics=self.metrics
+        )
+        # Conservar la cache de URLs sin email entre ejecuciones
+        self.engine.visited_websites_no_email = self.visited_websites_no_email
+
         # Validar API Key antes de iniciar
-        if not self.validate_api_key():
+        if not self.engine.validate_api_key():
             messagebox.showerror("Error",
                                "La API Key no es válida o no tiene los permisos necesarios.\n\n"
                                "Verifica que:\n"
@@ -1039,11 +1051,6 @@ combinará los resultados sin duplicados.
                                "3. La facturación esté activada")
             return
 
-        # Validar que al menos un campo esté seleccionado
-        if not any(var.get() for var in self.field_vars.values()):
-            messagebox.showerror("Error", "Selecciona al menos un campo para extraer")
-            return
-            
         self.is_scraping = True
         self.start_button.config(state='disabled')
         self.stop_button.config(state='normal')
@@ -1054,12 +1061,105 @@ combinará los resultados sin duplicados.
         self.scraping_thread.daemon = True
         self.scraping_thread.start()
         
+    def read_run_options(self):
+        """Construye las ScrapeOptions a partir de la GUI (hilo principal)"""
+        try:
+            limit_str = self.max_results_var.get().strip()
+            if limit_str == "":
+                max_results = None  # Sin límite si está vacío
+            else:
+                max_results = int(limit_str)
+                if max_results <= 0:
+                    max_results = None  # Sin límite si es 0 o negativo
+        except (tk.TclError, ValueError):
+            max_results = None  # Sin límite si hay error
+
+        try:
+            min_delay = self.min_delay_var.get() or 1.5
+            max_delay = self.max_delay_var.get() or 3.0
+        except (tk.TclError, ValueError):
+            min_delay, max_delay = 2.0, 2.0
+
+        try:
+            batch_size = self.batch_size_var.get() or 5
+            batch_delay = self.batch_delay_var.get() or 10.0
+        except (tk.TclError, ValueError):
+            batch_size = 5
+            batch_delay = 10.0
+
+        try:
+            workers = max(1, self.workers_var.get())
+        except (tk.TclError, ValueError):
+            workers = 1
+
+        try:
+            budget = float(self.budget_var.get().strip().replace(',', '.') or 0)
+        except ValueError:
+            budget = 0  # Sin límite si hay error
+
+        return ScrapeOptions(
+            fields=frozenset(field for field, var in self.field_vars.items() if var.get()),
+            max_results=max_results,
+            min_delay=min_delay,
+            max_delay=max_delay,
+            batch_size=batch_size,
+            batch_delay=batch_delay,
+            workers=workers,
+            area=self.area_var.get(),
+            refresh_search=self.refresh_search_var.get(),
+            profile=self.profile_var.get(),
+            run_log=self.run_log_var.get(),
+            budget=budget if budget > 0 else None,
+            backend=self.backend_var.get()
+        )
+
+    def estimate_cost(self):
+        """Muestra la estimación de llamadas por SKU, coste y duración sin llamar a la API"""
+        keywords = parse_keywords(self.keyword_entry.get("1.0", tk.END).strip())
+        if not keywords:
+            messagebox.showerror("Error", "Ingresa al menos una palabra clave")
+            return
+        if not any(var.get() for var in self.field_vars.values()):
+            messagebox.showerror("Error", "Selecciona al menos un campo para extraer")
+            return
+        try:
+            options = self.read_run_options()
+        except ValueError as e:
+            messagebox.showerror("Error", f"Zona no válida: {e}")
+            return
+        estimate = ScraperEngine(None, options).estimate(keywords)
+        lines = estimate.summary_lines()
+        if options.budget and estimate.cost > options.budget:
+            lines.append(f"\n⚠️ Supera el presupuesto de ${options.budget:.2f}: la ejecución se detendrá al alcanzarlo")
+        messagebox.showinfo("Estimación", '\n'.join(lines))
+
+    def report_progress(self, message, value=None, maximum=None):
+        """Callback de progreso del motor: encola la actualización de la GUI"""
+        self.ui_call(self.progress_var.set, message)
+        bar_options = {}
+        if maximum is not None:
+            bar_options['maximum'] = maximum
+        if value is not None:
+            bar_options['value'] = value
+        if bar_options:
+            self.ui_call(self.progress_bar.config, bar_options)
+
     def stop_scraping(self):
         self.is_scraping = False
+        if self.engine:
+            self.engine.stop()
         self.start_button.config(state='normal')
         self.stop_button.config(state='disabled')
         self.progress_var.set("Detenido por el usuario")
         self.log("🛑 Scraping detenido por el usuario")
+
+    def finish_scraping(self, status_message):
+        """Restaura la interfaz al terminar el scraping (hilo principal)"""
+        self.is_scraping = False
+        self.progress_var.set(status_message)
+        self.start_button.config(state='normal')
+        self.stop_button.config(state='disabled')
+        self.refresh_json_files()
     
     def refresh_scraper(self):
         """Reinicia el estado del scraper y limpia la interfaz"""
@@ -1078,7 +1178,8 @@ combinará los resultados sin duplicados.
         # Reiniciar variable de thread
         self.scraping_thread = None
 
-        # Limpiar log
+        # Limpiar log (incluidas las líneas aún pendientes de pintar)
+        self.log_buffer.clear()
         self.log_text.delete(1.0, tk.END)
 
         # Reiniciar barra de progreso
@@ -1089,9 +1190,14 @@ combinará los resultados sin duplicados.
         self.scraped_data = []
 
         # Reiniciar contadores de API
-        self.api_calls_count = 0
-        self.estimated_cost = 0.0
+        with self.stats_lock:
+            self.api_calls_count = 0
+            self.estimated_cost = 0.0
+            self.stats_dirty = False
+        self.metrics.reset()
+        self.metrics_live = False
         self.api_stats_var.set("API Calls: 0 | Costo estimado: $0.00")
+        self.metrics_var.set("")
 
         # Limpiar cache de emails
         self.visited_websites_no_email.clear()
@@ -1109,703 +1215,21 @@ combinará los resultados sin duplicados.
         # Log de reinicio
         self.log("🔄 Aplicación reiniciada - Lista para nuevo scraping")
     
-    def load_existing_place_ids(self, filename, output_format):
-        """Carga place_ids existentes del archivo para evitar duplicados"""
-        # El archivo ahora está en data/nombre-archivo/nombre-archivo.ext
-        folder = os.path.splitext(filename)[0]
-        filepath = os.path.join('data', folder, filename)
-        existing_place_ids = set()
-        
-        if not os.path.exists(filepath):
-            return existing_place_ids
-        
-        try:
-            if output_format == "csv":
-                with open(filepath, 'r', encoding='utf-8') as csvfile:
-                    reader = csv.DictReader(csvfile)
-                    for row in reader:
-                        if 'place_id' in row and row['place_id']:
-                            existing_place_ids.add(row['place_id'])
-            else:  # JSON
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    for item in data:
-                        if 'place_id' in item and item['place_id']:
-                            existing_place_ids.add(item['place_id'])
-        except (json.JSONDecodeError, IOError, csv.Error) as e:
-            self.log(f"⚠️ Error leyendo archivo existente: {e}")
-            return set()
-        
-        return existing_place_ids
-    
-    def extract_email_from_website(self, website_url):
-        """Extrae emails del sitio web del negocio con búsqueda inteligente mejorada"""
-        # Verificar si ya intentamos buscar en esta URL sin éxito
-        if website_url in self.visited_websites_no_email:
-            return None
-
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        }
-
-        # Patrón de email mejorado que incluye más TLDs
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,10}\b'
-        
-        # Filtros menos restrictivos - solo excluir emails claramente no válidos
-        exclude_patterns = [
-            'noreply', 'no-reply', 'donotreply', 'example.com', 'test.com',
-            'placeholder', 'yourname', 'youremail', 'sample', 'demo'
-        ]
-
-        def filter_emails(emails_list):
-            """Filtra emails no válidos con criterios menos restrictivos"""
-            filtered = []
-            for email in emails_list:
-                email_lower = email.lower()
-                # Solo excluir si contiene patrones claramente no válidos
-                if not any(pattern in email_lower for pattern in exclude_patterns):
-                    # Validar que tenga formato básico correcto
-                    if '@' in email and '.' in email.split('@')[1]:
-                        filtered.append(email)
-            return filtered
-
-        def extract_from_soup(soup):
-            """Extrae emails de BeautifulSoup object con estrategias mejoradas"""
-            found_emails = []
-            
-            # 1. Buscar mailto: links (más confiable)
-            mailto_links = soup.find_all('a', href=re.compile(r'^mailto:', re.I))
-            for link in mailto_links:
-                email = link['href'].replace('mailto:', '').split('?')[0].split('&')[0]
-                found_emails.append(email)
-
-            # 2. Buscar en elementos específicos de contacto (prioridad alta)
-            contact_selectors = [
-                'footer', '.footer', '#footer',
-                '.contact', '#contact', '.contact-info', '.contact-details',
-                '.email', '.email-address', '.mail',
-                '.info', '.information', '.datos-contacto',
-                'address', '.address', '.direccion'
-            ]
-            
-            for selector in contact_selectors:
-                try:
-                    elements = soup.select(selector)
-                    for elem in elements:
-                        emails = re.findall(email_pattern, elem.get_text())
-                        found_emails.extend(emails)
-                except:
-                    continue
-
-            # 3. Buscar en meta tags y structured data
-            meta_tags = soup.find_all('meta', attrs={'name': re.compile(r'email|contact', re.I)})
-            for meta in meta_tags:
-                content = meta.get('content', '')
-                emails = re.findall(email_pattern, content)
-                found_emails.extend(emails)
-
-            # 4. Buscar en JSON-LD structured data
-            json_scripts = soup.find_all('script', type='application/ld+json')
-            for script in json_scripts:
-                try:
-                    data = json.loads(script.string)
-                    if isinstance(data, dict):
-                        # Buscar email en diferentes campos
-                        for key in ['email', 'contactPoint', 'contact']:
-                            if key in data:
-                                if isinstance(data[key], str):
-                                    emails = re.findall(email_pattern, data[key])
-                                    found_emails.extend(emails)
-                except:
-                    continue
-
-            # 5. Buscar en texto completo (última opción)
-            if not found_emails:
-                text_content = soup.get_text()
-                emails = re.findall(email_pattern, text_content)
-                found_emails.extend(emails)
-
-            # Filtrar y devolver el mejor email
-            filtered = filter_emails(found_emails)
-            if filtered:
-                # Priorizar emails que no sean de servicios gratuitos
-                business_emails = [e for e in filtered if not any(domain in e.lower() 
-                                 for domain in ['gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com'])]
-                return business_emails[0] if business_emails else filtered[0]
-            
-            return None
-
-        try:
-            # Parse base URL
-            from urllib.parse import urlparse, urljoin
-            parsed_url = urlparse(website_url)
-            base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
-
-            # 1. Intentar páginas de contacto ampliadas (timeout 8s)
-            contact_pages = [
-                '/contact', '/contacto', '/contact-us', '/contactenos', '/en/contact',
-                '/contact.html', '/contacto.html', '/contact.php', '/contacto.php',
-                '/about', '/sobre-nosotros', '/about-us', '/acerca-de',
-                '/info', '/informacion', '/information',
-                '/team', '/equipo', '/staff', '/personal'
-            ]
-
-            self.log(f"   🔍 Buscando email en páginas de contacto...")
-            for contact_path in contact_pages:
-                try:
-                    contact_url = urljoin(base_url, contact_path)
-                    response = requests.get(contact_url, headers=headers, timeout=8)
-                    if response.status_code == 200:
-                        soup = BeautifulSoup(response.text, 'html.parser')
-                        email = extract_from_soup(soup)
-                        if email:
-                            self.log(f"   ✅ Email encontrado en {contact_path}: {email}")
-                            return email
-                except:
-                    continue
-
-            # 2. Buscar en página principal con análisis más profundo
-            self.log(f"   🔍 Buscando email en página principal...")
-            response = requests.get(website_url, headers=headers, timeout=12)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            email = extract_from_soup(soup)
-
-            if email:
-                self.log(f"   ✅ Email encontrado en página principal: {email}")
-                return email
-            else:
-                # Agregar a cache de URLs sin email
-                self.visited_websites_no_email.add(website_url)
-                self.log(f"   ❌ No se encontró email válido en {website_url}")
-                return None
-
-        except Exception as e:
-            # Agregar a cache en caso de error
-            self.visited_websites_no_email.add(website_url)
-            self.log(f"   ⚠️ Error extrayendo email de {website_url}: {str(e)[:100]}")
-            return None
-        
-    def search_businesses(self, business_name: str) -> List[Dict]:
-        """Busca múltiples negocios y retorna lista de place_ids con nombres"""
-        all_results = []
-        next_page_token = None
-        
-        try:
-            max_results = getattr(self, 'max_results_var', None)
-            limit_str = max_results.get().strip() if max_results else ""
-            if limit_str == "":
-                limit = None  # Sin límite si está vacío
-            else:
-                limit = int(limit_str)
-                if limit <= 0:
-                    limit = None  # Sin límite si es 0 o negativo
-        except (tk.TclError, ValueError):
-            limit = None  # Sin límite si hay error
-        
-        
-        while limit is None or len(all_results) < limit:
-            params = {
-                'query': business_name,
-                'key': self.api_key,
-                'fields': 'place_id,name'
-            }
-            
-            if next_page_token:
-                params['pagetoken'] = next_page_token
-            
-            try:
-                response = requests.get(URL_TEXT_SEARCH, params=params, timeout=10)
-
-                # Manejar Rate Limiting (429)
-                if response.status_code == 429:
-                    self.log("⚠️ Rate limit alcanzado en búsqueda. Esperando 60 segundos...")
-                    time.sleep(60)
-                    # Reintentar la misma petición
-                    response = requests.get(URL_TEXT_SEARCH, params=params, timeout=10)
-
-                response.raise_for_status()
-                data = response.json()
-
-                # Incrementar contador de API calls
-                self.increment_api_calls('search')
-
-                results = data.get('results', [])
-
-                for result in results:
-                    if result.get('place_id'):
-                        all_results.append({
-                            'place_id': result.get('place_id'),
-                            'name': result.get('name', 'Sin nombre')
-                        })
-
-                # Verificar si hay más páginas
-                next_page_token = data.get('next_page_token')
-                if not next_page_token:
-                    break
-
-                # Delay requerido antes de usar next_page_token
-                time.sleep(2)
-
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 403:
-                    self.log(f"❌ Error 403: API Key sin permisos o Places API no habilitada")
-                else:
-                    self.log(f"❌ Error HTTP {e.response.status_code}: {e}")
-                break
-            except requests.RequestException as e:
-                self.log(f"⚠️ Error buscando '{business_name}': {e}")
-                break
-                
-        return all_results
-            
-    def get_business_details(self, place_id: str) -> Optional[BusinessData]:
-        # Construir campos basados en selección del usuario
-        fields = ['name']
-        if self.field_vars['phone'].get():
-            fields.append('formatted_phone_number')
-        if self.field_vars['website'].get():
-            fields.append('website')
-        if self.field_vars['address'].get():
-            fields.append('formatted_address')
-        if self.field_vars['rating'].get():
-            fields.extend(['rating', 'user_ratings_total'])
-        if self.field_vars['opening_hours'].get():
-            fields.append('opening_hours')
-        if self.field_vars['price_level'].get():
-            fields.append('price_level')
-            
-        params = {
-            'place_id': place_id,
-            'key': self.api_key,
-            'fields': ','.join(fields)
-        }
-        
-        try:
-            response = requests.get(URL_PLACE_DETAILS, params=params, timeout=10)
-
-            # Manejar Rate Limiting (429)
-            if response.status_code == 429:
-                self.log("⚠️ Rate limit alcanzado en detalles. Esperando 60 segundos...")
-                time.sleep(60)
-                # Reintentar la misma petición
-                response = requests.get(URL_PLACE_DETAILS, params=params, timeout=10)
-
-            response.raise_for_status()
-            result = response.json().get('result', {})
-
-            # Incrementar contador de API calls
-            self.increment_api_calls('details')
-
-            # Construir objeto con solo los campos seleccionados
-            business_data = BusinessData(
-                title=result.get('name', ''),
-                phone=result.get('formatted_phone_number') if self.field_vars['phone'].get() else None,
-                website=result.get('website') if self.field_vars['website'].get() else None,
-                address=result.get('formatted_address') if self.field_vars['address'].get() else None,
-                place_id=place_id if self.field_vars['place_id'].get() else None,
-                rating=result.get('rating') if self.field_vars['rating'].get() else None,
-                total_ratings=result.get('user_ratings_total') if self.field_vars['total_ratings'].get() else None,
-                opening_hours=str(result.get('opening_hours', {}).get('weekday_text', [])) if self.field_vars['opening_hours'].get() else None,
-                price_level=result.get('price_level') if self.field_vars['price_level'].get() else None,
-                email=None  # Se llenará después si está habilitado
-            )
-
-            return business_data
-
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 403:
-                self.log(f"❌ Error 403: API Key sin permisos")
-            elif e.response.status_code == 404:
-                self.log(f"⚠️ Place ID no encontrado: {place_id}")
-            else:
-                self.log(f"❌ Error HTTP {e.response.status_code} para '{place_id}'")
-            return None
-        except requests.RequestException as e:
-            self.log(f"⚠️ Error obteniendo detalles para place_id '{place_id}': {e}")
-            return None
-            
-    def get_photo_references_by_title(self, title, max_photos=1):
-        """Busca referencias de fotos por título del negocio"""
-        params = {'query': title, 'key': self.api_key}
-        try:
-            resp = requests.get(URL_TEXT_SEARCH, params=params, timeout=10)
-            self.increment_api_calls()
-            resp.raise_for_status()
-            results = resp.json().get('results', [])
-        except Exception as e:
-            self.log(f"⚠️ Error buscando fotos para '{title}': {str(e)}")
-            return []
-
-        refs = []
-        for place in results:
-            for photo in place.get('photos', []):
-                ref = photo.get('photo_reference')
-                if ref:
-                    refs.append(ref)
-                    if len(refs) >= max_photos:
-                        return refs
-        return refs
-
-    def fetch_image_data(self, photo_ref):
-        """Descarga el contenido binario de una foto"""
-        params = {'photoreference': photo_ref, 'maxwidth': 1200, 'key': self.api_key}
-        try:
-            r = requests.get(URL_PLACE_PHOTO, params=params, timeout=15)
-            self.increment_api_calls()
-            r.raise_for_status()
-            return r.content
-        except Exception:
-            return None
-
-    def select_featured_image(self, refs):
-        """Selecciona la mejor imagen (preferiblemente apaisada)"""
-        if not refs: return None, None
-        
-        for ref in refs:
-            data = self.fetch_image_data(ref)
-            if data:
-                try:
-                    img = Image.open(BytesIO(data))
-                    w, h = img.size
-                    if w >= h: # Preferimos apaisadas
-                        return ref, data
-                except Exception:
-                    pass
-        
-        # Fallback a la primera si no hay apaisadas
-        ref = refs[0]
-        return ref, self.fetch_image_data(ref)
-
     def scrape_data(self, keywords, filename, output_format="json"):
-        if isinstance(keywords, str):
-            keywords = [keywords]  # Compatibilidad con llamadas antiguas
-
-        total_keywords = len(keywords)
-        if total_keywords == 1:
-            self.log(f"🔍 Iniciando scraping para: {keywords[0]}")
-        else:
-            self.log(f"🔍 Iniciando scraping para {total_keywords} palabras clave")
-            for idx, kw in enumerate(keywords, 1):
-                self.log(f"   {idx}. {kw}")
-        
-        # Cargar place_ids ya existentes para evitar duplicados
-        existing_place_ids = self.load_existing_place_ids(filename, output_format)
-        if existing_place_ids:
-            self.log(f"📋 Se encontraron {len(existing_place_ids)} registros existentes en el archivo")
-        
-        # Verificar límite de resultados
+        """Ejecuta el motor de scraping (hilo de scraping)"""
         try:
-            limit_str = self.max_results_var.get().strip()
-            if limit_str == "":
-                self.log(f"📋 Configurado para extraer TODOS los resultados disponibles")
-                self.log(f"⚠️ Nota: Google Places API limita a 60 resultados por búsqueda")
-                self.log(f"💡 Tip: Para más resultados, usa búsquedas específicas (ej: 'restaurantes Madrid Centro')")
+            summary = self.engine.run(keywords, filename, output_format)
+            self.scraped_data = self.engine.scraped_data
+            if summary.new == 0:
+                status_message = "No hay nuevos resultados"
             else:
-                limit_val = int(limit_str)
-                self.log(f"📋 Configurado para extraer hasta {limit_val} resultados")
-                if limit_val > 60:
-                    self.log(f"⚠️ Nota: Google Places API limita a 60 resultados por búsqueda")
-                    self.log(f"💡 Tip: Para más resultados, usa búsquedas específicas por ubicación o tipo")
-                    self.log(f"   Ejemplo: 'restaurantes Madrid Centro', 'restaurantes Madrid Norte', etc.")
-        except (ValueError, tk.TclError):
-            self.log(f"📋 Configurado para extraer TODOS los resultados disponibles")
-            self.log(f"⚠️ Nota: Google Places API limita a 60 resultados por búsqueda")
-        
-        self.progress_var.set("Buscando negocios...")
-
-        # Acumular todos los negocios de todas las búsquedas
-        all_businesses_combined = []
-        total_found = 0
-
-        for idx, keyword in enumerate(keywords, 1):
-            if not self.is_scraping:
-                break
-
-            if total_keywords > 1:
-                self.log(f"\n🔎 Búsqueda {idx}/{total_keywords}: '{keyword}'")
-
-            # Buscar negocios para esta keyword
-            keyword_businesses = self.search_businesses(keyword)
-            total_found += len(keyword_businesses)
-
-            if not keyword_businesses:
-                self.log(f"❌ No se encontraron resultados para '{keyword}'")
-                continue
-
-            # Filtrar duplicados
-            new_businesses = [b for b in keyword_businesses if b['place_id'] not in existing_place_ids]
-            duplicates = len(keyword_businesses) - len(new_businesses)
-
-            if duplicates > 0:
-                self.log(f"   📋 Encontrados: {len(keyword_businesses)} negocios ({duplicates} duplicados omitidos)")
-            else:
-                self.log(f"   📋 Encontrados: {len(keyword_businesses)} negocios nuevos")
-
-            # Agregar place_ids nuevos al set para evitar duplicados en siguientes búsquedas
-            for b in new_businesses:
-                existing_place_ids.add(b['place_id'])
-
-            all_businesses_combined.extend(new_businesses)
-
-        if not all_businesses_combined:
-            if total_found == 0:
-                self.log(f"\n❌ No se encontraron negocios para ninguna búsqueda")
-            else:
-                self.log(f"\nℹ️ Todos los negocios encontrados ya existen en el archivo")
-            self.progress_var.set("No hay nuevos resultados")
-            self.stop_scraping()
-            return
-
-        businesses = all_businesses_combined
-
-        self.log(f"\n📊 Resumen de búsquedas:")
-        self.log(f"   Total encontrado: {total_found} negocios")
-        self.log(f"   Nuevos únicos: {len(businesses)} negocios")
-        self.log(f"✨ Procesando {len(businesses)} negocios...")
-
-        self.progress_bar.config(maximum=len(businesses))
-        self.progress_bar['value'] = 0
-        
-        # Procesar cada negocio
-        processed_count = 0
-        batch_count = 0
-        
-        for i, business in enumerate(businesses):
-            if not self.is_scraping:
-                break
-                
-            self.progress_var.set(f"Procesando {i+1}/{len(businesses)}: {business['name']}")
-            self.log(f"🔍 Procesando [{i+1}/{len(businesses)}]: {business['name']}")
-            
-            # Obtener detalles
-            business_data = self.get_business_details(business['place_id'])
-            
-            # Extraer imagen si está habilitado
-            if business_data and self.field_vars['imagen'].get():
-                self.log(f"📸 Buscando imagen para: {business_data.title}...")
-                photo_refs = self.get_photo_references_by_title(business_data.title)
-                if photo_refs:
-                    ref, img_data = self.select_featured_image(photo_refs)
-                    if img_data:
-                        # Carpeta de imágenes dentro del directorio de la búsqueda
-                        folder = os.path.splitext(filename)[0]
-                        img_dir = os.path.join('data', folder, 'images')
-                        os.makedirs(img_dir, exist_ok=True)
-                        
-                        # Nombre de archivo normalizado
-                        safe_title = normalize_filename(business_data.title)
-                        img_filename = f"{safe_title}.jpg"
-                        img_path = os.path.join(img_dir, img_filename)
-                        
-                        with open(img_path, 'wb') as f:
-                            f.write(img_data)
-                        
-                        business_data.image_path = os.path.join('images', img_filename)
-                        self.log(f"   ✅ Imagen guardada")
-                    else:
-                        self.log(f"   ⚠️ No se pudo descargar")
-                else:
-                    self.log(f"   ❌ No se encontraron fotos")
-            
-            if business_data:
-                # Extraer email del sitio web si está habilitado
-                if self.field_vars['email'].get() and business_data.website:
-                    self.log(f"   🔍 Buscando email en: {business_data.website}")
-                    email = self.extract_email_from_website(business_data.website)
-                    if email:
-                        business_data.email = email
-                        self.log(f"   📧 Email encontrado: {email}")
-                    else:
-                        self.log(f"   ❌ No se encontró email en el sitio web")
-                
-                self.scraped_data.append(business_data)
-                processed_count += 1
-
-                # Guardar checkpoint cada 10 registros
-                if processed_count % 10 == 0:
-                    self.save_checkpoint(filename, processed_count)
-                    self.log(f"💾 Checkpoint guardado: {processed_count} registros procesados")
-
-                # Mostrar datos extraídos
-                self.log(f"✅ Datos extraídos para '{business_data.title}'")
-                if business_data.phone:
-                    self.log(f"   📞 Teléfono: {business_data.phone}")
-                if business_data.website:
-                    self.log(f"   🌐 Sitio web: {business_data.website}")
-                if business_data.address:
-                    self.log(f"   📍 Dirección: {business_data.address}")
-                if business_data.rating:
-                    self.log(f"   ⭐ Rating: {business_data.rating} ({business_data.total_ratings or 0} reseñas)")
-                if business_data.email:
-                    self.log(f"   📧 Email: {business_data.email}")
-            else:
-                self.log(f"❌ No se pudieron obtener detalles para '{business['name']}'")
-            
-            # Actualizar barra de progreso
-            self.progress_bar['value'] = i + 1
-            
-            # Aplicar delay entre peticiones
-            try:
-                min_delay = self.min_delay_var.get() or 1.5
-                max_delay = self.max_delay_var.get() or 3.0
-                delay = random.uniform(min_delay, max_delay)
-            except (tk.TclError, ValueError):
-                delay = 2.0
-            time.sleep(delay)
-            
-            # Aplicar delay entre lotes
-            batch_count += 1
-            try:
-                batch_size = self.batch_size_var.get() or 5
-                batch_delay_base = self.batch_delay_var.get() or 10.0
-            except (tk.TclError, ValueError):
-                batch_size = 5
-                batch_delay_base = 10.0
-                
-            if batch_count >= batch_size and i < len(businesses) - 1:
-                batch_delay = random.uniform(batch_delay_base, batch_delay_base + 5.0)
-                self.log(f"⏳ Pausa entre lotes: {batch_delay:.1f}s")
-                time.sleep(batch_delay)
-                batch_count = 0
-        
-        # Guardar todos los datos (combinando con existentes)
-        if self.scraped_data:
-            # El archivo se guarda en data/nombre-archivo/nombre-archivo.ext
-            folder = os.path.splitext(filename)[0]
-            filepath = os.path.join('data', folder, filename)
-            if output_format == "csv":
-                self.save_data_to_csv(filepath, merge_with_existing=True)
-            else:
-                self.save_data_to_json(filepath, merge_with_existing=True)
-            
-            total_in_file = len(existing_place_ids) + processed_count
-            folder = os.path.splitext(filename)[0]
-            self.log(f"💾 Datos guardados en: data/{folder}/{filename}")
-            self.log(f"🏁 Completado: {processed_count} negocios nuevos procesados")
-            self.log(f"📊 Total en archivo: {total_in_file} negocios")
-
-            # Limpiar checkpoint al finalizar exitosamente
-            self.clear_checkpoint()
-        else:
-            self.log(f"❌ No se obtuvieron nuevos datos para '{keyword}'")
+                status_message = f"Completado: {summary.processed} negocios"
+        except Exception as e:
+            self.log(f"❌ Error inesperado durante el scraping: {e}")
+            status_message = "Error durante el scraping"
 
-        self.progress_var.set(f"Completado: {processed_count} negocios")
         self.is_scraping = False
-        self.start_button.config(state='normal')
-        self.stop_button.config(state='disabled')
-        self.refresh_json_files()
-        
-    def save_data_to_json(self, filepath, merge_with_existing=False):
-        # Asegurar que el directorio data existe
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        
-        json_data = []
-        
-        # Si merge_with_existing=True, cargar datos existentes primero
-        if merge_with_existing and os.path.exists(filepath):
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    json_data = json.load(f)
-            except (json.JSONDecodeError, IOError):
-                json_data = []
-        
-        # Agregar nuevos datos
-        for business in self.scraped_data:
-            data_dict = {}
-            
-            # Solo incluir campos seleccionados
-            if self.field_vars['title'].get():
-                data_dict['titulo'] = business.title
-            if self.field_vars['phone'].get() and business.phone:
-                data_dict['telefono'] = business.phone
-            if self.field_vars['website'].get() and business.website:
-                data_dict['sitio_web'] = business.website
-            if self.field_vars['address'].get() and business.address:
-                data_dict['direccion'] = business.address
-            if self.field_vars['place_id'].get() and business.place_id:
-                data_dict['place_id'] = business.place_id
-            if self.field_vars['rating'].get() and business.rating:
-                data_dict['rating'] = business.rating
-            if self.field_vars['total_ratings'].get() and business.total_ratings:
-                data_dict['total_ratings'] = business.total_ratings
-            if self.field_vars['opening_hours'].get() and business.opening_hours:
-                data_dict['horarios'] = business.opening_hours
-            if self.field_vars['price_level'].get() and business.price_level:
-                data_dict['nivel_precios'] = business.price_level
-            if self.field_vars['email'].get() and business.email:
-                data_dict['email'] = business.email
-                
-            json_data.append(data_dict)
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(json_data, f, ensure_ascii=False, indent=2)
-    
-    def save_data_to_csv(self, filepath, merge_with_existing=False):
-        # Asegurar que el directorio data existe
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        
-        # Crear lista de campos seleccionados
-        fieldnames = []
-        field_mapping = {
-            'title': 'titulo',
-            'phone': 'telefono', 
-            'website': 'sitio_web',
-            'address': 'direccion',
-            'place_id': 'place_id',
-            'rating': 'rating',
-            'total_ratings': 'total_ratings',
-            'opening_hours': 'horarios',
-            'price_level': 'nivel_precios',
-            'email': 'email'
-        }
-        
-        for field, csv_name in field_mapping.items():
-            if self.field_vars[field].get():
-                fieldnames.append(csv_name)
-        
-        # Preparar nuevas filas
-        new_rows = []
-        for business in self.scraped_data:
-            row = {}
-            
-            if self.field_vars['title'].get():
-                row['titulo'] = business.title or ''
-            if self.field_vars['phone'].get() and business.phone:
-                row['telefono'] = business.phone
-            if self.field_vars['website'].get() and business.website:
-                row['sitio_web'] = business.website
-            if self.field_vars['address'].get() and business.address:
-                row['direccion'] = business.address
-            if self.field_vars['place_id'].get() and business.place_id:
-                row['place_id'] = business.place_id
-            if self.field_vars['rating'].get() and business.rating:
-                row['rating'] = business.rating
-            if self.field_vars['total_ratings'].get() and business.total_ratings:
-                row['total_ratings'] = business.total_ratings
-            if self.field_vars['opening_hours'].get() and business.opening_hours:
-                row['horarios'] = business.opening_hours
-            if self.field_vars['price_level'].get() and business.price_level:
-                row['nivel_precios'] = business.price_level
-            if self.field_vars['email'].get() and business.email:
-                row['email'] = business.email
-            
-            new_rows.append(row)
-        
-        # Si merge_with_existing=True y el archivo existe, anexar datos
-        if merge_with_existing and os.path.exists(filepath):
-            # Anexar al archivo existente
-            with open(filepath, 'a', newline='', encoding='utf-8-sig') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                for row in new_rows:
-                    writer.writerow(row)
-        else:
-            # Escribir archivo CSV nuevo
-            with open(filepath, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                for row in new_rows:
-                    writer.writerow(row)
+        self.ui_call(self.finish_scraping, status_message)
 
     def setup_credits_section(self):
         """Añade sección de créditos en la parte inferior"""
@@ -1839,18 +1263,11 @@ combinará los resultados sin duplicados.
 
 def main():
     # Cambiar al directorio del script o ejecutable
-    if getattr(sys, 'frozen', False):
-        # Si está compilado con PyInstaller
-        script_dir = os.path.dirname(sys.executable)
-    else:
-        # Si se ejecuta como script Python
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-    
-    os.chdir(script_dir)
+    os.chdir(get_app_dir())
     
     root = tk.Tk()
     app = GoogleMyBusinessScraperGUI(root)
     root.mainloop()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# Google My Business Scraper - Cortacircuitos por host de los sitios web
+#
+# La búsqueda de email prueba muchas páginas de cada sitio web. Si el
+# servidor no responde, cada página esperaba su propio timeout y un host
+# caído costaba minutos. Este cortacircuitos recuerda los hosts caídos:
+# tras un error de conexión o DNS (o varios timeouts seguidos) el host se
+# abre y el resto de sus URLs se saltan al instante, también para los demás
+# negocios que compartan el host, hasta que pasa el tiempo de enfriamiento.
+# Cualquier respuesta HTTP (aunque sea un 404) demuestra que el host está
+# vivo y reinicia la cuenta de timeouts.
+
+import threading
+import time
+from urllib.parse import urlparse
+
+DEFAULT_HOST_COOLDOWN_SECONDS = 600.0  # Tiempo que un host caído se salta
+TIMEOUTS_TO_OPEN = 2  # Timeouts seguidos que abren el circuito de un host
+
+
+class SiteSkipped(Exception):
+    """Se deja de probar un sitio: host caído o presupuesto de tiempo agotado"""
+
+
+def host_of(url):
+    """Host de una URL en minúsculas, con el puerto si se indica y sin credenciales"""
+    parsed = urlparse(url)
+    host = (parsed.hostname or '').lower()
+    try:
+        port = parsed.port
+    except ValueError:
+        port = None
+    return f"{host}:{port}" if port else host
+
+
+def website_key(url):
+    """
+    La misma web escrita de otra forma da la misma clave: esquema y host en
+    minúsculas, sin credenciales, fragmento ni barra final
+    """
+    url = str(url or '').strip()
+    parsed = urlparse(url if '//' in url else f'http://{url}')
+    path = parsed.path.rstrip('/') or '/'
+    query = f"?{parsed.query}" if parsed.query else ''
+    return f"{(parsed.scheme or 'http').lower()}://{host_of(parsed.geturl())}{path}{query}"
+
+
+class HostCircuitBreaker:
+    """
+    Estado "host caído" compartido entre los hilos de una ejecución.
+
+    Args:
+        cooldown: Segundos que se salta un host tras abrirse su circuito
+        timeouts_to_open: Timeouts seguidos que abren el circuito
+    """
+
+    def __init__(self, cooldown=DEFAULT_HOST_COOLDOWN_SECONDS, timeouts_to_open=TIMEOUTS_TO_OPEN):
+        self.cooldown = cooldown
+        self.timeouts_to_open = timeouts_to_open
+        self.lock = threading.Lock()
+        self.open_until = {}  # host -> time.monotonic() hasta el que se salta
+        self.timeouts = {}    # host -> timeouts seguidos
+        self.skipped = 0      # Peticiones evitadas
+
+    def is_open(self, host):
+        """Indica si el host está caído; al pasar el enfriamiento se vuelve a probar"""
+        with self.lock:
+            until = self.open_until.get(host)
+            if until is None:
+                return False
+            if time.monotonic() >= until:
+                del self.open_until[host]
+                return False
+            self.skipped += 1
+            return True
+
+    def record_success(self, host):
+        """El host respondió (con cualquier código HTTP)"""
+        with self.lock:
+            self.timeouts.pop(host, None)
+
+    def record_failure(self, host, timeout=False):
+        """
+        Anota un fallo del host: un error de conexión o DNS abre el circuito
+        al momento y un timeout solo tras timeouts_to_open seguidos.
+        Devuelve True si el circuito queda abierto.
+        """
+        with self.lock:
+            if timeout:
+                count = self.timeouts.get(host, 0) + 1
+                self.timeouts[host] = count
+                if count < self.timeouts_to_open:
+                    return False
+            self.timeouts.pop(host, None)
+            if self.cooldown > 0:
+                self.open_until[host] = time.monotonic() + self.cooldown
+            return True
+
+    def stats(self):
+        with self.lock:
+            now = time.monotonic()
+            return {'open_hosts': sum(1 for until in self.open_until.values() if until > now),
+                    'skipped_requests': self.skipped}
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# Google My Business Scraper - Horarios de apertura compactos
+#
+# Los horarios se guardan como una tupla de rangos (inicio, fin) en minutos
+# desde el domingo 00:00 de la semana, calculados a partir del campo
+# `periods` de Place Details (día 0 = domingo, como en la API). Es
+# independiente del idioma, ocupa poco y permite responder "¿abre a esta
+# hora?" sin volver a analizar texto. Los horarios idénticos (muy comunes:
+# L-V 9-20) se comparten entre registros.
+#
+# En el dataset se escriben los mismos rangos (hours_value): una lista
+# [[inicio, fin], ...] en JSON y el texto "inicio-fin;inicio-fin" en CSV.
+# parse_hours los lee de vuelta, y también el texto "Lun 09:00-20:00, ..."
+# que escribía la versión anterior. format_hours queda solo para mostrarlos.
+
+import re
+from typing import Optional, Tuple
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+DAY_LABELS = ('Dom', 'Lun', 'Mar', 'Mié', 'Jue', 'Vie', 'Sáb')  # Orden de la API
+
+ALWAYS_OPEN = ((0, MINUTES_PER_WEEK),)
+
+Hours = Tuple[Tuple[int, int], ...]
+
+_interned_hours = {}
+
+_RANGES_TEXT = re.compile(r'\d+-\d+(?:;\d+-\d+)*')
+_DISPLAY_RANGE = re.compile(r'(\w+) (\d\d):(\d\d)-(?:(\w+) )?(\d\d):(\d\d)')
+
+
+def _minute_of_week(point):
+    """{'day': d, 'time': 'HHMM'} -> minutos desde el domingo 00:00"""
+    time_text = str(point.get('time', '0000')).zfill(4)
+    return int(point['day']) * MINUTES_PER_DAY + int(time_text[:2]) * 60 + int(time_text[2:4])
+
+
+def parse_periods(periods) -> Optional[Hours]:
+    """
+    Convierte opening_hours.periods de Place Details en rangos de minutos.
+
+    Un periodo sin cierre significa abierto 24/7. Si el cierre cae antes
+    que la apertura (p. ej. sábado 22:00 - domingo 02:00), el rango pasa del
+    final de la semana. Devuelve None si no hay periodos válidos.
+    """
+    ranges = []
+    for period in periods or ():
+        try:
+            start = _minute_of_week(period['open'])
+            if not period.get('close'):
+                return intern_hours(ALWAYS_OPEN)
+            end = _minute_of_week(period['close'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if end <= start:
+            end += MINUTES_PER_WEEK
+        ranges.append((start, end))
+    return intern_hours(sorted(ranges)) if ranges else None
+
+
+def intern_hours(hours) -> Optional[Hours]:
+    """Normaliza a tupla de tuplas y devuelve la instancia compartida"""
+    if hours is None:
+        return None
+    hours = tuple((int(start), int(end)) for start, end in hours)
+    return _interned_hours.setdefault(hours, hours)
+
+
+def is_open_at(hours: Optional[Hours], when) -> Optional[bool]:
+    """
+    Indica si el negocio está abierto en `when` (datetime en la hora local
+    del negocio). None si no se conocen los horarios.
+    """
+    if hours is None:
+        return None
+    minute = ((when.weekday() + 1) % 7) * MINUTES_PER_DAY + when.hour * 60 + when.minute
+    for start, end in hours:
+        if start <= minute < end or start <= minute + MINUTES_PER_WEEK < end:
+            return True
+    return False
+
+
+def _clock(minute):
+    minute %= MINUTES_PER_DAY
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def format_hours(hours: Optional[Hours]) -> Optional[str]:
+    """
+    Texto legible en español para mostrar, p. ej.
+    "Lun 09:00-20:00, Mar 09:00-20:00" (los días cerrados no aparecen).
+    """
+    if hours is None:
+        return None
+    if hours == ALWAYS_OPEN:
+        return '24h'
+    parts = []
+    for start, end in hours:
+        day = DAY_LABELS[(start // MINUTES_PER_DAY) % 7]
+        if end - start >= MINUTES_PER_DAY:
+            end_day = DAY_LABELS[(end // MINUTES_PER_DAY) % 7]
+            parts.append(f"{day} {_clock(start)}-{end_day} {_clock(end)}")
+        else:
+            parts.append(f"{day} {_clock(start)}-{_clock(end)}")
+    return ', '.join(parts)
+
+
+def hours_value(hours: Optional[Hours], as_text=False):
+    """
+    Horarios para una fila del dataset: lista de rangos [[inicio, fin], ...]
+    en JSON y, con as_text (CSV), el texto "inicio-fin;inicio-fin"
+    """
+    if hours is None:
+        return None
+    if as_text:
+        return ';'.join(f"{start}-{end}" for start, end in hours)
+    return [[start, end] for start, end in hours]
+
+
+def _parse_display(text):
+    """Texto de format_hours ("Lun 09:00-20:00, ...") -> rangos; None si no encaja"""
+    if text == '24h':
+        return ALWAYS_OPEN
+    ranges = []
+    for part in text.split(', '):
+        match = _DISPLAY_RANGE.fullmatch(part)
+        if not match or match[1] not in DAY_LABELS or (match[4] and match[4] not in DAY_LABELS):
+            return None
+        day = DAY_LABELS.index(match[1])
+        start = day * MINUTES_PER_DAY + int(match[2]) * 60 + int(match[3])
+        end_day = DAY_LABELS.index(match[4]) if match[4] else day
+        end = end_day * MINUTES_PER_DAY + int(match[5]) * 60 + int(match[6])
+        if end <= start:
+            # Cruza la medianoche o, con día de cierre, el final de la semana
+            end += MINUTES_PER_WEEK if match[4] else MINUTES_PER_DAY
+        ranges.append((start, end))
+    return ranges
+
+
+def parse_hours(value) -> Optional[Hours]:
+    """
+    Lee los horarios de una fila del dataset: lista de rangos (JSON), texto
+    "inicio-fin;..." (CSV) o el texto "Lun 09:00-20:00, ..." de la versión
+    anterior. Devuelve None si no hay horarios o el valor no se reconoce,
+    como el repr de weekday_text de los datasets antiguos (depende del
+    idioma de la API; un refresco lo reescribe en el formato actual).
+    """
+    if value in (None, ''):
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        if _RANGES_TEXT.fullmatch(value):
+            value = [item.split('-') for item in value.split(';')]
+        else:
+            value = _parse_display(value)
+    try:
+        return intern_hours(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# Google My Business Scraper - Índice de búsqueda sobre los datasets guardados
+#
+# Buscar "negocios con email en Madrid con rating >= 4.5" obligaba a abrir
+# los JSON a mano. Este índice SQLite (data/.dataset_index.sqlite3) guarda
+# una fila por registro de cada dataset con sus columnas numéricas
+# indexadas (rating y total_ratings) y una tabla de tokens del título y la
+# dirección (sin acentos ni palabras vacías, ordenada por token), de modo
+# que una consulta por texto es un recorrido de rango por prefijo y no una
+# lectura de los archivos.
+#
+# Se construye la primera vez y se mantiene al día comparando fecha de
+# modificación y tamaño de cada archivo: solo se vuelven a leer los
+# datasets que han cambiado y se quitan los que ya no existen.
+
+import csv
+import json
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from scraper_dedup import normalize_tokens
+from scraper_storage import DATASET_READ_ERRORS, is_dataset_file, iter_dataset_rows
+
+DATASET_INDEX_FILE = '.dataset_index.sqlite3'
+DEFAULT_SEARCH_LIMIT = 500
+TOKEN_FIELDS = ('titulo', 'direccion')  # Campos con búsqueda por texto
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _int(value):
+    number = _float(value)
+    return int(number) if number is not None else None
+
+
+@dataclass
+class SyncResult:
+    """Cambios aplicados al índice en una sincronización"""
+    indexed: List[str] = field(default_factory=list)  # Datasets (re)indexados
+    removed: List[str] = field(default_factory=list)  # Datasets que ya no existen
+    errors: List[str] = field(default_factory=list)   # Datasets que no se pudieron leer
+    records: int = 0                                  # Registros leídos
+
+
+@dataclass
+class SearchResult:
+    """Registros encontrados (como en el dataset) y total de coincidencias"""
+    rows: List[dict]
+    datasets: List[str]  # Dataset (ruta relativa a data_dir) de cada fila
+    total: int
+
+
+class DatasetIndex:
+    """
+    Índice de los datasets de data_dir (seguro entre hilos).
+
+    Args:
+        data_dir: Carpeta de datos (se recorre con sus subcarpetas)
+        filepath: Base SQLite del índice (por defecto dentro de data_dir)
+    """
+
+    def __init__(self, data_dir, filepath=None):
+        self.data_dir = data_dir
+        self.filepath = filepath or os.path.join(data_dir, DATASET_INDEX_FILE)
+        self.lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def conn(self):
+        # La base se abre en el primer uso
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.filepath) or '.', exist_ok=True)
+            self._conn = sqlite3.connect(self.filepath, check_same_thread=False)
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS files ("
+                " path TEXT PRIMARY KEY,"
+                " mtime REAL NOT NULL,"
+                " size INTEGER NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS records ("
+                " id INTEGER PRIMARY KEY,"
+                " path TEXT NOT NULL,"
+                " has_email INTEGER NOT NULL,"
+                " rating REAL,"
+                " total_ratings INTEGER,"
+                " data TEXT NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS records_path ON records (path);"
+                "CREATE INDEX IF NOT EXISTS records_rating ON records (rating);"
+                "CREATE INDEX IF NOT EXISTS records_total_ratings ON records (total_ratings);"
+                "CREATE TABLE IF NOT EXISTS tokens ("
+                " token TEXT NOT NULL,"
+                " record_id INTEGER NOT NULL,"
+                " PRIMARY KEY (token, record_id)) WITHOUT ROWID;"
+                "CREATE INDEX IF NOT EXISTS tokens_record ON tokens (record_id);")
+            self._conn.commit()
+        return self._conn
+
+    def dataset_files(self):
+        """Datasets de data_dir: ruta relativa -> (mtime, tamaño)"""
+        files = {}
+        for root, _, filenames in os.walk(self.data_dir):
+            for name in filenames:
+                if is_dataset_file(name):
+                    path = os.path.join(root, name)
+                    stat = os.stat(path)
+                    files[os.path.relpath(path, self.data_dir)] = (stat.st_mtime, stat.st_size)
+        return files
+
+    def _remove(self, path):
+        self.conn.execute(
+            "DELETE FROM tokens WHERE record_id IN (SELECT id FROM records WHERE path = ?)", (path,))
+        self.conn.execute("DELETE FROM records WHERE path = ?", (path,))
+        self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def _index_file(self, path, mtime, size):
+        """
+        Sustituye los registros de un dataset; devuelve cuántos tiene. Las
+        filas se leen de una en una: si el archivo está dañado a mitad, sync()
+        quita lo insertado.
+        """
+        self._remove(path)
+        count = 0
+        for row in iter_dataset_rows(os.path.join(self.data_dir, path)):
+            record_id = self.conn.execute(
+                "INSERT INTO records (path, has_email, rating, total_ratings, data) VALUES (?, ?, ?, ?, ?)",
+                (path, int(bool(row.get('email'))), _float(row.get('rating')),
+                 _int(row.get('total_ratings')), json.dumps(row, ensure_ascii=False))).lastrowid
+            words = set()
+            for name in TOKEN_FIELDS:
+                words |= normalize_tokens(row.get(name))
+            self.conn.executemany("INSERT OR IGNORE INTO tokens (token, record_id) VALUES (?, ?)",
+                                  ((word, record_id) for word in words))
+            count += 1
+        self.conn.execute("INSERT INTO files (path, mtime, size) VALUES (?, ?, ?)", (path, mtime, size))
+        return count
+
+    def sync(self) -> SyncResult:
+        """Reindexa los datasets nuevos o modificados y quita los borrados"""
+        result = SyncResult()
+        current = self.dataset_files()
+        with self.lock:
+            known = {path: (mtime, size) for path, mtime, size
+                     in self.conn.execute("SELECT path, mtime, size FROM files")}
+            for path in sorted(set(known) - set(current)):
+                self._remove(path)
+                result.removed.append(path)
+            for path, (mtime, size) in sorted(current.items()):
+                if known.get(path) == (mtime, size):
+                    continue
+                try:
+                    result.records += self._index_file(path, mtime, size)
+                    result.indexed.append(path)
+                except DATASET_READ_ERRORS + (csv.Error,):
+                    # Se reintentará en la próxima sincronización
+                    self._remove(path)
+                    result.errors.append(path)
+                self.conn.commit()
+            self.conn.commit()
+        return result
+
+    def search(self, text='', min_rating=None, min_ratings=None, with_email=False,
+               dataset: Optional[str] = None, limit=DEFAULT_SEARCH_LIMIT) -> SearchResult:
+        """
+        Registros cuyo título o dirección contienen palabras que empiezan por
+        cada palabra de text, con rating y reseñas mínimos y, si with_email,
+        con email. Ordenados por rating y número de reseñas.
+        """
+        conditions, params = [], []
+        for word in sorted(normalize_tokens(text)):
+            # Los tokens son [a-z0-9]: '\x7f' es mayor que cualquier continuación
+            conditions.append("id IN (SELECT record_id FROM tokens WHERE token >= ? AND token < ?)")
+            params += [word, word + '\x7f']
+        if min_rating is not None:
+            conditions.append("rating >= ?")
+            params.append(min_rating)
+        if min_ratings is not None:
+            conditions.append("total_ratings >= ?")
+            params.append(min_ratings)
+        if with_email:
+            conditions.append("has_email = 1")
+        if dataset:
+            conditions.append("path = ?")
+            params.append(dataset)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self.lock:
+            total = self.conn.execute(f"SELECT COUNT(*) FROM records{where}", params).fetchone()[0]
+            found = self.conn.execute(
+                f"SELECT path, data FROM records{where} "
+                "ORDER BY rating IS NULL, rating DESC, total_ratings DESC, id LIMIT ?",
+                params + [limit]).fetchall()
+        return SearchResult([json.loads(data) for _, data in found], [path for path, _ in found], total)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# Google My Business Scraper - Pool de API Keys
+#
+# Reparte las peticiones entre varias API Keys (p. ej. de distintos
+# proyectos de Google Cloud) en turno rotatorio. Cada key tiene su propio
+# límite de peticiones por segundo, presupuesto diario en USD y estado de
+# salud: con REQUEST_DENIED se desactiva y con OVER_QUERY_LIMIT (o HTTP
+# 429) descansa un minuto mientras las demás siguen trabajando.
+#
+# El consumo diario se guarda por huella SHA-256 de la key (nunca la key)
+# para que el presupuesto se respete entre ejecuciones.
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+# Estados de la API que indican un problema de la key y no de la petición
+FAILOVER_STATUSES = ('REQUEST_DENIED', 'OVER_QUERY_LIMIT')
+
+KEY_COOLDOWN_SECONDS = 60  # Descanso de una key tras OVER_QUERY_LIMIT / 429
+KEY_USAGE_FILE = '.gmb_key_usage.json'
+USAGE_SAVE_EVERY = 20  # Llamadas entre escrituras del consumo diario
+
+
+class NoApiKeyAvailable(Exception):
+    """Todas las keys están desactivadas o han agotado su presupuesto diario"""
+
+
+def key_fingerprint(key):
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def mask_key(key):
+    return f"{key[:6]}...{key[-4:]}" if len(key) > 12 else "***"
+
+
+def parse_key_entry(text):
+    """
+    Interpreta una línea "KEY[,qps[,presupuesto_diario[,etiqueta]]]".
+
+    Los valores vacíos significan sin límite. Devuelve None en líneas
+    vacías o comentarios (#).
+    """
+    text = text.strip()
+    if not text or text.startswith('#'):
+        return None
+    parts = [p.strip() for p in text.split(',')]
+    entry = {'key': parts[0]}
+    try:
+        if len(parts) > 1 and parts[1]:
+            entry['qps'] = float(parts[1])
+        if len(parts) > 2 and parts[2]:
+            entry['daily_budget'] = float(parts[2])
+    except ValueError:
+        raise ValueError(f"QPS y presupuesto deben ser números: '{mask_key(parts[0])}'")
+    if len(parts) > 3 and parts[3]:
+        entry['label'] = parts[3]
+    return entry
+
+
+def format_key_entry(entry):
+    """Inverso de parse_key_entry"""
+    values = [entry['key'], entry.get('qps') or '', entry.get('daily_budget') or '', entry.get('label') or '']
+    while values and values[-1] == '':
+        values.pop()
+    return ','.join(f"{v:g}" if isinstance(v, float) else str(v) for v in values)
+
+
+@dataclass
+class ApiKeyState:
+    """Estado de una key del pool"""
+    key: str
+    label: str
+    qps: Optional[float] = None           # Peticiones por segundo (None = sin límite)
+    daily_budget: Optional[float] = None  # USD por día (None = sin límite)
+    day: str = ''
+    calls_today: int = 0
+    cost_today: float = 0.0
+    run_calls: int = 0
+    next_slot: float = 0.0       # time.monotonic() del próximo hueco según qps
+    cooldown_until: float = 0.0  # time.monotonic() hasta el que descansa
+    disabled: bool = False
+    last_status: Optional[str] = None
+
+    @property
+    def over_budget(self):
+        return self.daily_budget is not None and self.cost_today >= self.daily_budget
+
+    def usable(self, now):
+        return not self.disabled and not self.over_budget and self.cooldown_until <= now
+
+
+class ApiKeyPool:
+    """
+    Reparto rotatorio de peticiones entre API Keys (seguro entre hilos).
+
+    Args:
+        entries: Lista de keys (str) o dicts con key, qps, daily_budget y label
+        usage_file: JSON donde se guarda el consumo diario (None = solo en memoria)
+    """
+
+    def __init__(self, entries, usage_file=None):
+        self.lock = threading.Lock()
+        self.usage_file = usage_file
+        self.keys = []
+        by_key = {}
+        for entry in entries:
+            if isinstance(entry, str):
+                entry = {'key': entry}
+            key = (entry.get('key') or '').strip()
+            if not key:
+                continue
+            state = by_key.get(key)
+            if state is None:
+                state = by_key[key] = ApiKeyState(key=key, label=entry.get('label') or f"Key {len(self.keys) + 1}")
+                self.keys.append(state)
+            # La misma key en varias fuentes: se combinan sus límites
+            if entry.get('qps'):
+                state.qps = entry['qps']
+            if entry.get('daily_budget') is not None:
+                state.daily_budget = entry['daily_budget']
+        self.cursor = 0
+        self.unsaved_calls = 0
+        # El consumo solo se persiste si alguna key tiene presupuesto diario
+        if not any(s.daily_budget is not None for s in self.keys):
+            self.usage_file = None
+        self._load_usage()
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def primary_key(self):
+        return self.keys[0].key if self.keys else None
+
+    # --- Consumo diario persistente ---
+
+    def _load_usage(self):
+        today = time.strftime('%Y-%m-%d')
+        usage = {}
+        if self.usage_file and os.path.exists(self.usage_file):
+            try:
+                with open(self.usage_file, 'r', encoding='utf-8') as f:
+                    usage = json.load(f)
+            except (json.JSONDecodeError, IOError):
+                usage = {}
+        for state in self.keys:
+            record = usage.get(key_fingerprint(state.key), {})
+            state.day = today
+            if record.get('day') == today:
+                state.calls_today = record.get('calls', 0)
+                state.cost_today = record.get('cost', 0.0)
+
+    def save_usage(self):
+        if not self.usage_file:
+            return
+        with self.lock:
+            usage = {}
+            if os.path.exists(self.usage_file):
+                try:
+                    with open(self.usage_file, 'r', encoding='utf-8') as f:
+                        usage = json.load(f)
+                except (json.JSONDecodeError, IOError):
+                    usage = {}
+            for state in self.keys:
+                usage[key_fingerprint(state.key)] = {
+                    'day': state.day, 'calls': state.calls_today, 'cost': round(state.cost_today, 4)
+                }
+            self.unsaved_calls = 0
+        try:
+            with open(self.usage_file, 'w', encoding='utf-8') as f:
+                json.dump(usage, f, indent=2)
+        except (IOError, OSError):
+            pass
+
+    def _roll_day(self):
+        today = time.strftime('%Y-%m-%d')
+        for state in self.keys:
+            if state.day != today:
+                state.day, state.calls_today, state.cost_today = today, 0, 0.0
+
+    # --- Reparto ---
+
+    def acquire(self, stop_event=None) -> ApiKeyState:
+        """
+        Devuelve la siguiente key sana con hueco según su qps, esperando si
+        hace falta. Lanza NoApiKeyAvailable si ninguna puede volver a usarse
+        en esta ejecución.
+        """
+        while True:
+            with self.lock:
+                self._roll_day()
+                now = time.monotonic()
+                alive = [s for s in self.keys if not s.disabled and not s.over_budget]
+                if not alive:
+                    raise NoApiKeyAvailable(
+                        "Todas las API Keys están desactivadas o han agotado su presupuesto diario")
+
+                wait = None
+                for offset in range(len(self.keys)):
+                    idx = (self.cursor + offset) % len(self.keys)
+                    state = self.keys[idx]
+                    if not state.usable(now):
+                        if not state.disabled and not state.over_budget:
+                            ready_at = state.cooldown_until
+                            wait = ready_at - now if wait is None else min(wait, ready_at - now)
+                        continue
+                    if state.next_slot > now:
+                        wait = state.next_slot - now if wait is None else min(wait, state.next_slot - now)
+                        continue
+                    if state.qps:
+                        state.next_slot = max(now, state.next_slot) + 1.0 / state.qps
+                    self.cursor = (idx + 1) % len(self.keys)
+                    return state
+
+            if stop_event is not None:
+                if stop_event.wait(max(0.01, wait)):
+                    raise NoApiKeyAvailable("Ejecución detenida")
+            else:
+                time.sleep(max(0.01, wait))
+
+    def record_call(self, state, cost=0.0, status=None):
+        """Anota una llamada hecha con la key"""
+        with self.lock:
+            state.calls_today += 1
+            state.run_calls += 1
+            state.cost_today += cost
+            state.last_status = status
+            self.unsaved_calls += 1
+            save = self.unsaved_calls >= USAGE_SAVE_EVERY
+        if save:
+            self.save_usage()
+
+    def report_failure(self, state, status):
+        """REQUEST_DENIED desactiva la key; OVER_QUERY_LIMIT la deja descansar"""
+        with self.lock:
+            state.last_status = status
+            if status == 'REQUEST_DENIED':
+                state.disabled = True
+            else:
+                state.cooldown_until = time.monotonic() + KEY_COOLDOWN_SECONDS
+
+    def has_alternative(self, state):
+        """Indica si otra key podría atender la petición ahora o tras esperar"""
+        with self.lock:
+            return any(s is not state and not s.disabled and not s.over_budget for s in self.keys)
+
+    def summary_line(self):
+        """Consumo por key para la barra de estado"""
+        parts = []
+        now = time.monotonic()
+        with self.lock:
+            for state in self.keys:
+                if state.disabled:
+                    flag = ' ⛔'
+                elif state.over_budget:
+                    flag = ' 💸'
+                elif state.cooldown_until > now:
+                    flag = ' ⏸'
+                else:
+                    flag = ''
+                budget = f"/{state.daily_budget:g}" if state.daily_budget is not None else ''
+                parts.append(f"{state.label}: {state.run_calls} (${state.cost_today:.2f}{budget} hoy){flag}")
+        return '🔑 ' + ' · '.join(parts)
+
+
+def api_response_status(response):
+    """Estado de la API de Places de una respuesta (también para HTTP 403/429)"""
+    if response.status_code == 429:
+        return 'OVER_QUERY_LIMIT'
+    if response.status_code == 403:
+        return 'REQUEST_DENIED'
+    if response.content[:1] == b'{':
+        try:
+            return response.json().get('status')
+        except ValueError:
+            return None
+    return None
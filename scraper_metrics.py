@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# Google My Business Scraper - Métricas de ejecución
+#
+# Registra, por endpoint (Text Search, Details, Photo, sitios web), el número
+# de llamadas, la latencia (percentiles e histograma), los errores y reintentos
+# por estado y los bytes transferidos; y, por etapa del pipeline, los
+# elementos procesados por segundo. No depende de Tk: la GUI solo lee
+# snapshot() / summary_line() desde su ciclo de refresco.
+
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+
+# Endpoints instrumentados
+ENDPOINT_TEXT_SEARCH = 'text_search'
+ENDPOINT_DETAILS = 'details'
+ENDPOINT_PHOTO = 'photo'
+ENDPOINT_WEBSITE = 'website'
+
+ENDPOINT_LABELS = {
+    ENDPOINT_TEXT_SEARCH: 'Search',
+    ENDPOINT_DETAILS: 'Details',
+    ENDPOINT_PHOTO: 'Photo',
+    ENDPOINT_WEBSITE: 'Web'
+}
+
+# Límites superiores (ms) de los buckets del histograma de latencias
+LATENCY_BUCKETS_MS = [25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+# Muestras de latencia que se conservan por endpoint para los percentiles
+# (muestreo reservoir: la memoria no crece con el tamaño del trabajo)
+MAX_LATENCY_SAMPLES = 10000
+
+# Estados de la API de Places que no cuentan como error
+API_OK_STATUSES = ('OK', 'ZERO_RESULTS')
+
+
+def percentile(sorted_values, pct):
+    """Percentil por interpolación lineal sobre una lista ya ordenada"""
+    if not sorted_values:
+        return None
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+class EndpointStats:
+    """Contadores y latencias de un endpoint"""
+
+    def __init__(self):
+        self.calls = 0
+        self.bytes = 0
+        self.total_latency = 0.0
+        self.errors = Counter()   # estado -> número de errores
+        self.retries = Counter()  # estado -> número de reintentos
+        self.cache_hits = 0       # respuestas servidas sin llamar a la red
+        self.shared = 0           # peticiones que esperaron a otra idéntica en curso
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.samples = []
+
+    def add(self, latency, status=None, nbytes=0):
+        self.calls += 1
+        self.bytes += nbytes
+        self.total_latency += latency
+
+        latency_ms = latency * 1000
+        for idx, bound in enumerate(LATENCY_BUCKETS_MS):
+            if latency_ms <= bound:
+                self.histogram[idx] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+
+        if len(self.samples) < MAX_LATENCY_SAMPLES:
+            self.samples.append(latency)
+        else:
+            slot = random.randrange(self.calls)
+            if slot < MAX_LATENCY_SAMPLES:
+                self.samples[slot] = latency
+
+        if status is not None:
+            self.errors[str(status)] += 1
+
+    def to_dict(self):
+        ordered = sorted(self.samples)
+        to_ms = lambda v: round(v * 1000, 1) if v is not None else None
+        bucket_labels = [f"<={b}ms" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            'calls': self.calls,
+            'errors': dict(self.errors),
+            'retries': dict(self.retries),
+            'cache_hits': self.cache_hits,
+            'shared': self.shared,
+            'bytes': self.bytes,
+            'latency_ms': {
+                'mean': to_ms(self.total_latency / self.calls) if self.calls else None,
+                'p50': to_ms(percentile(ordered, 50)),
+                'p90': to_ms(percentile(ordered, 90)),
+                'p99': to_ms(percentile(ordered, 99)),
+                'max': to_ms(ordered[-1]) if ordered else None
+            },
+            'histogram': dict(zip(bucket_labels, self.histogram))
+        }
+
+
+class StageStats:
+    """Elementos procesados por una etapa del pipeline y su ritmo"""
+
+    def __init__(self, started_at):
+        self.started_at = started_at
+        self.last_at = started_at
+        self.items = 0
+
+    def rate(self, now=None):
+        end = now if now is not None else self.last_at
+        elapsed = end - self.started_at
+        return self.items / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self):
+        return {
+            'items': self.items,
+            'elapsed_s': round(self.last_at - self.started_at, 3),
+            'items_per_s': round(self.rate(), 3)
+        }
+
+
+class RunMetrics:
+    """Métricas de una ejecución de scraping (seguro entre hilos)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started_at = time.time()
+            self.endpoints = {}
+            self.stages = {}
+
+    def _endpoint(self, endpoint):
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = self.endpoints[endpoint] = EndpointStats()
+        return stats
+
+    def record_call(self, endpoint, latency, status=None, nbytes=0):
+        """Registra una llamada; status indica el error (None si fue bien)"""
+        with self.lock:
+            self._endpoint(endpoint).add(latency, status, nbytes)
+
+    def record_error(self, endpoint, status):
+        """Registra un error de aplicación (p. ej. OVER_QUERY_LIMIT con HTTP 200)"""
+        with self.lock:
+            self._endpoint(endpoint).errors[str(status)] += 1
+
+    def record_retry(self, endpoint, status):
+        with self.lock:
+            self._endpoint(endpoint).retries[str(status)] += 1
+
+    def record_cache_hit(self, endpoint):
+        with self.lock:
+            self._endpoint(endpoint).cache_hits += 1
+
+    def record_shared(self, endpoint):
+        """Registra una petición resuelta con el resultado de otra idéntica en curso"""
+        with self.lock:
+            self._endpoint(endpoint).shared += 1
+
+    def start_stage(self, stage):
+        with self.lock:
+            self.stages[stage] = StageStats(time.perf_counter())
+
+    def record_items(self, stage, count=1):
+        with self.lock:
+            stats = self.stages.get(stage)
+            now = time.perf_counter()
+            if stats is None:
+                stats = self.stages[stage] = StageStats(now)
+            stats.items += count
+            stats.last_at = now
+
+    def snapshot(self):
+        """Devuelve todas las métricas como un dict serializable a JSON"""
+        with self.lock:
+            return {
+                'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+                'elapsed_s': round(time.time() - self.started_at, 3),
+                'endpoints': {name: stats.to_dict() for name, stats in self.endpoints.items()},
+                'stages': {name: stats.to_dict() for name, stats in self.stages.items()}
+            }
+
+    def summary_line(self):
+        """Resumen compacto para la barra de estado de la GUI"""
+        parts = []
+        with self.lock:
+            for endpoint, label in ENDPOINT_LABELS.items():
+                stats = self.endpoints.get(endpoint)
+                if not stats or not (stats.calls or stats.cache_hits or stats.shared):
+                    continue
+                if stats.calls:
+                    p50 = percentile(sorted(stats.samples), 50)
+                    part = f"{label} {stats.calls}× p50 {p50 * 1000:.0f}ms"
+                else:
+                    part = f"{label} 0×"
+                errors = sum(stats.errors.values())
+                if errors:
+                    part += f" ({errors} err)"
+                if stats.cache_hits:
+                    part += f" ({stats.cache_hits} cache)"
+                if stats.shared:
+                    part += f" ({stats.shared} compartidas)"
+                parts.append(part)
+
+            now = time.perf_counter()
+            for stage, stats in self.stages.items():
+                if stats.items:
+                    parts.append(f"{stage} {stats.rate(now):.2f}/s")
+        return ' | '.join(parts)
+
+    def save(self, filepath, extra=None):
+        """Escribe las métricas de la ejecución (y las secciones de extra) en un archivo JSON"""
+        os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+        data = self.snapshot()
+        data.update(extra or {})
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
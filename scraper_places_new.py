@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# Google My Business Scraper - Backend de Places API (New)
+#
+# La API legacy (textsearch/json, details/json) solo devuelve en la
+# búsqueda unos pocos campos, y teléfono, web y horarios hay que pedirlos a
+# Place Details negocio a negocio. Places API (New) acepta una máscara de
+# campos (cabecera X-Goog-FieldMask) también en places:searchText, así que
+# una sola llamada trae todos los campos seleccionados de hasta 20 negocios
+# y no hace falta Details. Además el nextPageToken se puede usar en el acto
+# (sin la espera de ~2 s de la legacy) y el tamaño de página (pageSize) es
+# configurable.
+#
+# Aquí están las máscaras, los cuerpos de las peticiones y la conversión de
+# las respuestas al formato legacy (nombres de Details, periods con 'HHMM',
+# photo_reference...), de modo que el resto del motor, la cache de
+# búsquedas y la cola trabajan igual con los dos backends. La facturación
+# va por niveles: cada llamada paga el del campo más caro de su máscara.
+
+import json
+
+BACKEND_LEGACY = 'legacy'
+BACKEND_NEW = 'new'
+BACKENDS = (BACKEND_LEGACY, BACKEND_NEW)
+
+DEFAULT_PLACES_NEW_API_URL = 'https://places.googleapis.com/v1'
+API_KEY_HEADER = 'X-Goog-Api-Key'
+FIELD_MASK_HEADER = 'X-Goog-FieldMask'
+
+MAX_PAGE_SIZE = 20  # Máximo de pageSize en searchText
+PHOTO_MAX_WIDTH = 1200
+
+# Campo de Details (nombre legacy) -> campo de Place en Places API (New)
+NEW_FIELD_NAMES = {
+    'name': 'displayName',
+    'formatted_phone_number': 'nationalPhoneNumber',
+    'website': 'websiteUri',
+    'formatted_address': 'formattedAddress',
+    'rating': 'rating',
+    'user_ratings_total': 'userRatingCount',
+    'opening_hours': 'regularOpeningHours',
+    'price_level': 'priceLevel'
+}
+PHOTOS_FIELD = 'photos'
+LOCATION_FIELD = 'location'
+VIEWPORT_FIELD = 'viewport'
+
+PRICE_LEVELS = {
+    'PRICE_LEVEL_FREE': 0,
+    'PRICE_LEVEL_INEXPENSIVE': 1,
+    'PRICE_LEVEL_MODERATE': 2,
+    'PRICE_LEVEL_EXPENSIVE': 3,
+    'PRICE_LEVEL_VERY_EXPENSIVE': 4
+}
+
+# Niveles de facturación, de menor a mayor precio
+TIER_IDS = 'ids'
+TIER_ESSENTIALS = 'essentials'
+TIER_PRO = 'pro'
+TIER_ENTERPRISE = 'enterprise'
+TIERS = (TIER_IDS, TIER_ESSENTIALS, TIER_PRO, TIER_ENTERPRISE)
+
+FIELD_TIERS = {
+    'id': TIER_IDS,
+    'formattedAddress': TIER_ESSENTIALS,
+    'location': TIER_ESSENTIALS,
+    'viewport': TIER_ESSENTIALS,
+    'photos': TIER_ESSENTIALS,
+    'displayName': TIER_PRO,
+    'nationalPhoneNumber': TIER_ENTERPRISE,
+    'websiteUri': TIER_ENTERPRISE,
+    'rating': TIER_ENTERPRISE,
+    'userRatingCount': TIER_ENTERPRISE,
+    'regularOpeningHours': TIER_ENTERPRISE,
+    'priceLevel': TIER_ENTERPRISE
+}
+
+
+def field_mask(details_fields=(), extra=(), search=False):
+    """
+    Máscara de campos con los campos de Details (nombres legacy) y los
+    campos extra de Place (photos, location...). En searchText los campos
+    van bajo places. y se pide también el nextPageToken.
+    """
+    names = ['id'] + [NEW_FIELD_NAMES[name] for name in details_fields] + list(extra)
+    names = list(dict.fromkeys(names))
+    if not search:
+        return ','.join(names)
+    return ','.join([f'places.{name}' for name in names] + ['nextPageToken'])
+
+
+def mask_tier(mask):
+    """Nivel de facturación de una máscara (los campos desconocidos cuentan como Enterprise)"""
+    tiers = [FIELD_TIERS.get(name.strip().removeprefix('places.'), TIER_ENTERPRISE)
+             for name in (mask or '').split(',') if name.strip() and name.strip() != 'nextPageToken']
+    return max(tiers, key=TIERS.index, default=TIER_IDS)
+
+
+def search_body(query, page_token=None, location=None, radius=None, page_size=MAX_PAGE_SIZE):
+    """Cuerpo de places:searchText; location (lat, lng) y radius (metros) centran la búsqueda"""
+    body = {'textQuery': query, 'pageSize': page_size}
+    if location:
+        body['locationBias'] = {'circle': {
+            'center': {'latitude': location[0], 'longitude': location[1]},
+            'radius': float(radius)
+        }}
+    if page_token:
+        body['pageToken'] = page_token
+    return body
+
+
+def request_identity(params=None, body=None, mask=None):
+    """Parámetros que identifican la petición al grabarla o reproducirla (scraper_replay)"""
+    identity = dict(params or {})
+    for key, value in (body or {}).items():
+        identity[key] = value if isinstance(value, str) else json.dumps(value, sort_keys=True)
+    if mask:
+        identity['fieldMask'] = mask
+    return identity
+
+
+def is_photo_name(ref):
+    """Las fotos de Places API (New) son recursos places/<id>/photos/<ref>, no photo_reference"""
+    return str(ref).startswith('places/')
+
+
+def _legacy_point(point):
+    return {'day': point.get('day', 0), 'time': f"{point.get('hour', 0):02d}{point.get('minute', 0):02d}"}
+
+
+def legacy_place(place):
+    """Un Place de Places API (New) con los nombres y formatos de la API legacy"""
+    result = {
+        'place_id': place.get('id'),
+        'name': (place.get('displayName') or {}).get('text'),
+        'formatted_address': place.get('formattedAddress'),
+        'formatted_phone_number': place.get('nationalPhoneNumber'),
+        'website': place.get('websiteUri'),
+        'rating': place.get('rating'),
+        'user_ratings_total': place.get('userRatingCount'),
+        'price_level': PRICE_LEVELS.get(place.get('priceLevel'))
+    }
+    hours = place.get('regularOpeningHours')
+    if hours:
+        periods = []
+        for period in hours.get('periods') or []:
+            converted = {'open': _legacy_point(period.get('open') or {})}
+            if period.get('close'):
+                converted['close'] = _legacy_point(period['close'])
+            periods.append(converted)
+        result['opening_hours'] = {'periods': periods}
+    if place.get('photos'):
+        result['photos'] = [{'photo_reference': photo['name'], 'width': photo.get('widthPx'),
+                             'height': photo.get('heightPx')}
+                            for photo in place['photos'] if photo.get('name')]
+    geometry = {}
+    if place.get('location'):
+        geometry['location'] = {'lat': place['location'].get('latitude'),
+                                'lng': place['location'].get('longitude')}
+    viewport = place.get('viewport')
+    if viewport:
+        geometry['viewport'] = {
+            'northeast': {'lat': viewport['high']['latitude'], 'lng': viewport['high']['longitude']},
+            'southwest': {'lat': viewport['low']['latitude'], 'lng': viewport['low']['longitude']}
+        }
+    if geometry:
+        result['geometry'] = geometry
+    return {key: value for key, value in result.items() if value is not None}
+
+
+def legacy_search_response(data):
+    """Respuesta de searchText en el formato de textsearch/json"""
+    places = data.get('places') or []
+    result = {'status': 'OK' if places else 'ZERO_RESULTS',
+              'results': [legacy_place(place) for place in places]}
+    if data.get('nextPageToken'):
+        result['next_page_token'] = data['nextPageToken']
+    return result
+
+
+def legacy_status(response):
+    """Estado legacy (OK, REQUEST_DENIED...) y mensaje de error de una respuesta"""
+    if response.status_code < 400:
+        return {'status': 'OK'}
+    try:
+        message = (response.json().get('error') or {}).get('message')
+    except ValueError:
+        message = None
+    status = {400: 'INVALID_REQUEST', 401: 'REQUEST_DENIED', 403: 'REQUEST_DENIED',
+              404: 'NOT_FOUND', 429: 'OVER_QUERY_LIMIT'}.get(response.status_code, 'UNKNOWN_ERROR')
+    return {'status': status, 'error_message': message} if message else {'status': status}
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# Google My Business Scraper - Perfilado de ejecuciones (opcional)
+#
+# Mide, por fase del pipeline (búsqueda, detalles, imagen, email, guardado
+# y refresco de la GUI), el tiempo real frente al tiempo de CPU del hilo
+# que la ejecuta: una fase con poca CPU respecto a su duración está
+# esperando a la red; una con mucha CPU está analizando HTML, serializando
+# o dibujando en Tk. Además se guarda un volcado de cProfile por ejecución
+# (abrible con pstats, snakeviz, etc.) junto al dataset.
+#
+# Desactivado por defecto: sin perfilado el motor no paga ningún coste.
+
+import functools
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+PHASE_SEARCH = 'search'
+PHASE_DETAILS = 'details'
+PHASE_PHOTO = 'photo'
+PHASE_EMAIL = 'email'
+PHASE_SAVE = 'save'
+PHASE_GUI = 'gui'
+
+PHASE_LABELS = {
+    PHASE_SEARCH: 'Búsqueda',
+    PHASE_DETAILS: 'Detalles',
+    PHASE_PHOTO: 'Imagen',
+    PHASE_EMAIL: 'Email',
+    PHASE_SAVE: 'Guardado',
+    PHASE_GUI: 'GUI'
+}
+
+
+class PhaseStats:
+    """Tiempo acumulado de una fase (inclusivo: cuenta también lo anidado)"""
+
+    def __init__(self):
+        self.count = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'wall_s': round(self.wall, 3),
+            'cpu_s': round(self.cpu, 3),
+            'cpu_ratio': round(self.cpu / self.wall, 3) if self.wall > 0 else None
+        }
+
+
+class RunProfiler:
+    """
+    Perfilado por fases de una ejecución (seguro entre hilos).
+
+    Args:
+        cpu_profile: Además de los tiempos por fase, registrar con cProfile
+                     las funciones llamadas dentro de cada fase
+    """
+
+    def __init__(self, cpu_profile=True):
+        self.cpu_profile = cpu_profile
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.phases = {}
+        self.profiles = []  # Un cProfile.Profile por hilo
+
+    def _thread_profile(self):
+        profile = getattr(self.local, 'profile', None)
+        if profile is None and self.cpu_profile:
+            import cProfile
+            profile = self.local.profile = cProfile.Profile()
+            with self.lock:
+                self.profiles.append(profile)
+        return profile
+
+    @contextmanager
+    def phase(self, name):
+        """Mide el bloque como la fase indicada en el hilo actual"""
+        active = getattr(self.local, 'active', None)
+        if active is None:
+            active = self.local.active = set()
+        if name in active:
+            yield  # Ya se está midiendo (p. ej. search_area -> search_businesses)
+            return
+        depth = len(active)
+        profile = self._thread_profile() if depth == 0 else None
+        if profile is not None:
+            try:
+                profile.enable()
+            except ValueError:
+                # Python 3.12+: solo puede haber un perfilador activo a la vez
+                profile = None
+        active.add(name)
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            active.discard(name)
+            if profile is not None:
+                profile.disable()
+            with self.lock:
+                stats = self.phases.get(name)
+                if stats is None:
+                    stats = self.phases[name] = PhaseStats()
+                stats.count += 1
+                stats.wall += wall
+                stats.cpu += cpu
+
+    def snapshot(self):
+        """Tiempos por fase como dict serializable a JSON"""
+        with self.lock:
+            return {name: stats.to_dict() for name, stats in self.phases.items()}
+
+    def summary_lines(self):
+        """Una línea por fase, ordenadas por tiempo real"""
+        lines = []
+        with self.lock:
+            ordered = sorted(self.phases.items(), key=lambda item: item[1].wall, reverse=True)
+            for name, stats in ordered:
+                ratio = f"{stats.cpu / stats.wall:.0%}" if stats.wall > 0 else '-'
+                lines.append(f"{PHASE_LABELS.get(name, name):9} {stats.count:5}× "
+                             f"real {stats.wall:8.2f} s · CPU {stats.cpu:7.2f} s ({ratio})")
+        return lines
+
+    def dump(self, filepath, top=5):
+        """
+        Guarda el volcado de cProfile de todos los hilos en filepath y
+        devuelve las `top` funciones con más tiempo propio. Devuelve None si
+        no se registró nada.
+        """
+        import pstats
+        with self.lock:
+            profiles = list(self.profiles)
+        stats = None
+        for profile in profiles:
+            try:
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+            except TypeError:
+                continue  # Hilo sin datos (su perfilador nunca llegó a activarse)
+        if stats is None:
+            return None
+        stats.dump_stats(filepath)
+
+        hottest = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:top]
+        return [(pstats.func_std_string(func), tottime) for func, (_, _, tottime, _, _) in hottest]
+
+
+def profiled(phase):
+    """
+    Decorador de métodos de ScraperEngine: mide el método como fase si
+    self.profiler está activo y lo anota en el log estructurado (self.run_log)
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profiler, run_log = self.profiler, self.run_log
+            if profiler is None and run_log is None:
+                return method(self, *args, **kwargs)
+            with profiler.phase(phase) if profiler else nullcontext(), \
+                    run_log.stage(phase) if run_log else nullcontext():
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+# Google My Business Scraper - Cola de trabajo persistente
+#
+# Un trabajo grande (búsquedas -> detalles -> email/imagen) se guarda como
+# tareas en un archivo SQLite. Varios procesos toman tareas con un lease:
+# si un worker muere, su tarea vuelve a estar visible al caducar el lease y
+# se reintenta hasta max_attempts veces. Los resultados de todos los
+# workers se guardan en la misma base y se exportan una sola vez al dataset.
+#
+# Modo del journal de SQLite (se guarda en la cola al crearla y los
+# workers que no indican otro lo adoptan):
+#   wal:    el más rápido, pero su índice vive en memoria compartida
+#           (archivo -shm), así que solo sirve para procesos de una misma
+#           máquina (por defecto)
+#   delete: journal clásico con bloqueos de archivo; necesario cuando
+#           varias máquinas comparten el archivo en un disco de red, que
+#           además debe soportar bloqueos fiables (NFS/SMB: compruébalo)
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+# Tipos de tarea
+TASK_SEARCH = 'search'    # payload: {'keyword'}
+TASK_DETAILS = 'details'  # payload: {'place_id', 'name'}
+TASK_ENRICH = 'enrich'    # payload: {'place_id'} -> email e imagen
+
+# Estados
+STATUS_PENDING = 'pending'
+STATUS_LEASED = 'leased'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+DEFAULT_LEASE_SECONDS = 300    # Tiempo de visibilidad de una tarea tomada
+JOURNAL_WAL = 'wal'            # Procesos de una sola máquina
+JOURNAL_DELETE = 'delete'      # Varias máquinas con el archivo en un disco de red
+JOURNAL_MODES = (JOURNAL_WAL, JOURNAL_DELETE)
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 5      # Espera base antes de reintentar (se duplica)
+MAX_RETRY_BACKOFF_SECONDS = 300
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    dedupe_key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    last_error TEXT,
+    updated_at REAL NOT NULL,
+    UNIQUE (kind, dedupe_key)
+);
+CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (status, available_at);
+CREATE TABLE IF NOT EXISTS results (
+    place_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    exported INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    exported_data TEXT  -- Datos ya exportados si el resultado cambió después
+);
+CREATE TABLE IF NOT EXISTS known_places (
+    place_id TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def default_worker_id():
+    """Identificador único del worker: host, proceso e hilo"""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}:{uuid.uuid4().hex[:6]}"
+
+
+@dataclass
+class Task:
+    id: int
+    kind: str
+    payload: dict
+    attempts: int
+    lease_owner: str
+
+
+class JobQueue:
+    """
+    Cola de tareas con leases sobre SQLite (una conexión por hilo).
+
+    Args:
+        filepath: Archivo SQLite del trabajo (se crea si no existe)
+        lease_seconds: Visibilidad de una tarea tomada antes de poder reasignarse
+        max_attempts: Intentos por tarea antes de marcarla como fallida
+        journal_mode: 'wal' o 'delete' (ver JOURNAL_MODES); None = el de la
+            cola o 'wal' si es nueva. Cambiarlo exige que no haya workers
+            con la cola abierta.
+    """
+
+    def __init__(self, filepath, lease_seconds=DEFAULT_LEASE_SECONDS,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, journal_mode=None):
+        if journal_mode is not None and journal_mode not in JOURNAL_MODES:
+            raise ValueError(f"journal_mode debe ser uno de: {', '.join(JOURNAL_MODES)}")
+        self.filepath = filepath
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.journal_mode = None  # Hasta leerlo de la cola, las conexiones no lo cambian
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+        self.conn.executescript(SCHEMA)
+        self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('exported', 'false')")
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(results)")}
+        if 'exported_data' not in columns:  # Colas creadas antes de reexportar resultados
+            self.conn.execute("ALTER TABLE results ADD COLUMN exported_data TEXT")
+        self.journal_mode = journal_mode or self.get_meta('journal_mode', JOURNAL_WAL)
+        try:
+            self._apply_journal_mode(self.conn)
+        except sqlite3.Error:
+            self.close()
+            raise
+        self.set_meta('journal_mode', self.journal_mode)
+
+    @property
+    def conn(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            # Autocommit: las transacciones se abren explícitamente con BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.filepath, timeout=30, isolation_level=None)
+            self.local.conn = conn
+            if self.journal_mode is not None:
+                self._apply_journal_mode(conn)
+        return conn
+
+    def _apply_journal_mode(self, conn):
+        try:
+            mode = conn.execute(f"PRAGMA journal_mode={self.journal_mode.upper()}").fetchone()[0]
+        except sqlite3.OperationalError:
+            mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        if mode.lower() != self.journal_mode:
+            # SQLite no cambia de WAL a DELETE mientras otra conexión tiene la base abierta
+            raise sqlite3.OperationalError(
+                f"La cola {self.filepath} está en modo {mode} y no se pudo pasar a {self.journal_mode}: "
+                f"cierra los demás workers o usa el mismo modo")
+        # En WAL, NORMAL no pierde integridad; en DELETE se deja FULL (el valor por defecto)
+        conn.execute(f"PRAGMA synchronous={'NORMAL' if mode.lower() == JOURNAL_WAL else 'FULL'}")
+
+    def _transaction(self):
+        return _Transaction(self.conn)
+
+    # --- Configuración del trabajo ---
+
+    def set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                          (key, json.dumps(value, ensure_ascii=False)))
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    # --- Tareas ---
+
+    def add_known_places(self, place_ids):
+        """Registra place_ids que ya están en el dataset (no se vuelven a procesar)"""
+        with self._transaction() as conn:
+            conn.executemany("INSERT OR IGNORE INTO known_places (place_id) VALUES (?)",
+                             ((pid,) for pid in place_ids))
+
+    def _insert_task(self, conn, kind, dedupe_key, payload):
+        """INSERT de una tarea dentro de una transacción; False si ya existía"""
+        now = time.time()
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO tasks (kind, dedupe_key, payload, max_attempts, available_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (kind, dedupe_key, json.dumps(payload, ensure_ascii=False), self.max_attempts, now, now))
+        if cursor.rowcount:
+            conn.execute("UPDATE meta SET value = 'false' WHERE key = 'exported'")
+        return cursor.rowcount == 1
+
+    def enqueue(self, kind, dedupe_key, payload):
+        """Añade una tarea; devuelve False si ya existía (misma clase y clave)"""
+        with self._transaction() as conn:
+            return self._insert_task(conn, kind, dedupe_key, payload)
+
+    def enqueue_place(self, place_id, name, search=None):
+        """
+        Encola los detalles de un negocio si no se conocía ya (dedupe entre
+        workers). search son los datos de su resultado de búsqueda.
+        """
+        payload = {'place_id': place_id, 'name': name}
+        if search is not None:
+            payload['search'] = search
+        with self._transaction() as conn:
+            cursor = conn.execute("INSERT OR IGNORE INTO known_places (place_id) VALUES (?)", (place_id,))
+            if not cursor.rowcount:
+                return False
+            now = time.time()
+            conn.execute(
+                "INSERT OR IGNORE INTO tasks (kind, dedupe_key, payload, max_attempts, available_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (TASK_DETAILS, place_id, json.dumps(payload, ensure_ascii=False),
+                 self.max_attempts, now, now))
+            conn.execute("UPDATE meta SET value = 'false' WHERE key = 'exported'")
+            return True
+
+    def lease(self, worker_id, kinds=None) -> Optional[Task]:
+        """
+        Toma la siguiente tarea visible: pendiente y disponible, o con el
+        lease caducado. Las búsquedas se toman antes que los detalles y
+        estos antes que el enriquecimiento.
+        """
+        now = time.time()
+        kinds = kinds or (TASK_SEARCH, TASK_DETAILS, TASK_ENRICH)
+        placeholders = ','.join('?' * len(kinds))
+        order = "CASE kind WHEN 'search' THEN 0 WHEN 'details' THEN 1 ELSE 2 END"
+
+        with self._transaction() as conn:
+            # Leases caducados sin intentos restantes: fallidas
+            conn.execute(
+                "UPDATE tasks SET status = ?, last_error = 'lease caducado', updated_at = ? "
+                "WHERE status = ? AND lease_expires < ? AND attempts >= max_attempts",
+                (STATUS_FAILED, now, STATUS_LEASED, now))
+
+            row = conn.execute(
+                f"SELECT id, kind, payload, attempts FROM tasks "
+                f"WHERE kind IN ({placeholders}) AND ("
+                f"  (status = ? AND available_at <= ?) OR (status = ? AND lease_expires < ?)) "
+                f"ORDER BY {order}, id LIMIT 1",
+                (*kinds, STATUS_PENDING, now, STATUS_LEASED, now)).fetchone()
+            if row is None:
+                return None
+
+            task_id, kind, payload, attempts = row
+            conn.execute(
+                "UPDATE tasks SET status = ?, attempts = attempts + 1, lease_owner = ?, "
+                "lease_expires = ?, updated_at = ? WHERE id = ?",
+                (STATUS_LEASED, worker_id, now + self.lease_seconds, now, task_id))
+        return Task(task_id, kind, json.loads(payload), attempts + 1, worker_id)
+
+    def extend_lease(self, task):
+        """Renueva el lease de una tarea larga (p. ej. una búsqueda por zona)"""
+        now = time.time()
+        cursor = self.conn.execute(
+            "UPDATE tasks SET lease_expires = ?, updated_at = ? WHERE id = ? AND lease_owner = ? AND status = ?",
+            (now + self.lease_seconds, now, task.id, task.lease_owner, STATUS_LEASED))
+        return cursor.rowcount == 1
+
+    def keep_leased(self, task):
+        """Context manager que renueva el lease de la tarea mientras se ejecuta"""
+        return LeaseKeeper(self, task)
+
+    def complete(self, task, result=None, follow_up=None):
+        """
+        Marca la tarea como hecha si el lease sigue siendo de este worker y,
+        en la misma transacción, guarda su resultado (place_id, datos) y
+        encola la tarea siguiente (tipo, clave, payload). Si el lease ya es de
+        otro worker no se escribe nada y devuelve False.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = ?",
+                (STATUS_DONE, now, task.id, task.lease_owner, STATUS_LEASED))
+            if cursor.rowcount != 1:
+                return False
+            if result is not None:
+                self._save_result(conn, *result)
+            if follow_up is not None:
+                self._insert_task(conn, *follow_up)
+            return True
+
+    def fail(self, task, error):
+        """Devuelve la tarea a la cola con espera exponencial, o la marca como fallida"""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT attempts, max_attempts, lease_owner FROM tasks WHERE id = ?",
+                               (task.id,)).fetchone()
+            if row is None or row[2] != task.lease_owner:
+                return
+            attempts, max_attempts, _ = row
+            if attempts >= max_attempts:
+                conn.execute(
+                    "UPDATE tasks SET status = ?, lease_owner = NULL, lease_expires = NULL, "
+                    "last_error = ?, updated_at = ? WHERE id = ?",
+                    (STATUS_FAILED, str(error)[:500], now, task.id))
+            else:
+                backoff = min(MAX_RETRY_BACKOFF_SECONDS, RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1))
+                conn.execute(
+                    "UPDATE tasks SET status = ?, lease_owner = NULL, lease_expires = NULL, "
+                    "available_at = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                    (STATUS_PENDING, now + backoff, str(error)[:500], now, task.id))
+
+    def retry_failed(self):
+        """Vuelve a poner en cola las tareas fallidas con los intentos a cero"""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = ?, attempts = 0, available_at = ?, updated_at = ? WHERE status = ?",
+                (STATUS_PENDING, now, now, STATUS_FAILED))
+            if cursor.rowcount:
+                conn.execute("UPDATE meta SET value = 'false' WHERE key = 'exported'")
+            return cursor.rowcount
+
+    def counts(self):
+        """Número de tareas por tipo y estado: {kind: {status: n}}"""
+        counts = {}
+        for kind, status, total in self.conn.execute(
+                "SELECT kind, status, COUNT(*) FROM tasks GROUP BY kind, status"):
+            counts.setdefault(kind, {})[status] = total
+        return counts
+
+    def is_drained(self):
+        """True si no quedan tareas pendientes ni en curso"""
+        row = self.conn.execute("SELECT COUNT(*) FROM tasks WHERE status IN (?, ?)",
+                                (STATUS_PENDING, STATUS_LEASED)).fetchone()
+        return row[0] == 0
+
+    # --- Resultados ---
+
+    def save_result(self, place_id, data):
+        self._save_result(self.conn, place_id, data)
+
+    def _save_result(self, conn, place_id, data):
+        # Un resultado que cambia tras exportarse (reintento, enriquecimiento
+        # posterior) vuelve a estar pendiente y recuerda la fila exportada
+        # para sustituirla en el dataset en vez de duplicarla
+        conn.execute(
+            "INSERT INTO results (place_id, data, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (place_id) DO UPDATE SET data = excluded.data, exported = 0, "
+            "exported_data = CASE WHEN results.exported = 1 THEN results.data ELSE results.exported_data END, "
+            "updated_at = excluded.updated_at",
+            (place_id, json.dumps(data, ensure_ascii=False), time.time()))
+        conn.execute("UPDATE meta SET value = 'false' WHERE key = 'exported'")
+
+    def get_result(self, place_id):
+        row = self.conn.execute("SELECT data FROM results WHERE place_id = ?", (place_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def iter_results(self, pending_export_only=False):
+        """(place_id, datos, datos ya exportados o None si no se había exportado)"""
+        query = "SELECT place_id, data, exported_data FROM results"
+        if pending_export_only:
+            query += " WHERE exported = 0"
+        for place_id, data, exported in self.conn.execute(query + " ORDER BY rowid").fetchall():
+            yield place_id, json.loads(data), json.loads(exported) if exported else None
+
+    def mark_exported(self, place_ids):
+        with self._transaction() as conn:
+            conn.executemany("UPDATE results SET exported = 1, exported_data = NULL WHERE place_id = ?",
+                             ((pid,) for pid in place_ids))
+
+    def claim_export(self):
+        """Solo un worker exporta el dataset cuando la cola se vacía"""
+        with self._transaction() as conn:
+            if not self.is_drained():
+                return False
+            cursor = conn.execute("UPDATE meta SET value = 'true' WHERE key = 'exported' AND value = 'false'")
+            return cursor.rowcount == 1
+
+    def close(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+
+class LeaseKeeper:
+    """
+    Renueva en segundo plano el lease de una tarea larga (búsqueda por zona,
+    recorrido lento de una web) cada lease_seconds / 3, para que no caduque
+    y otro worker la repita mientras sigue en curso. lost indica que el
+    lease ya era de otro worker al renovarlo.
+    """
+
+    def __init__(self, queue, task, interval=None):
+        self.queue = queue
+        self.task = task
+        self.interval = interval or queue.lease_seconds / 3
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.lost = False
+
+    def _run(self):
+        try:
+            while not self.stop_event.wait(self.interval):
+                try:
+                    if not self.queue.extend_lease(self.task):
+                        self.lost = True
+                        return
+                except sqlite3.Error:
+                    continue  # Base ocupada: se reintenta en el siguiente intervalo
+        finally:
+            self.queue.close()  # Conexión de este hilo
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self._run, name=f"lease-{self.task.id}", daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop_event.set()
+        self.thread.join()
+        return False
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK: toma el bloqueo de escritura al empezar"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("COMMIT" if exc_type is None else "ROLLBACK")
+        return False
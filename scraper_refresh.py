@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# Google My Business Scraper - Estado de los registros para el refresco
+#
+# Junto a cada dataset se guarda, por place_id, cuándo se obtuvieron sus
+# detalles y un hash de su contenido (SQLite .record_state.sqlite3 en la
+# carpeta del dataset). El modo refresco vuelve a pedir Details solo de
+# los registros más antiguos que la edad indicada, empezando por los de
+# más valor (más reseñas y mejor valoración), y reescribe el dataset solo
+# si alguna fila ha cambiado. Los registros sin estado (anteriores a esta
+# versión) se consideran los más antiguos.
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+RECORD_STATE_FILE = '.record_state.sqlite3'
+DEFAULT_REFRESH_AGE_DAYS = 30.0
+
+
+class MissingPlaceIds(ValueError):
+    """El dataset no tiene place_id: sus registros no se pueden volver a pedir a Details"""
+
+    def __init__(self, filepath):
+        super().__init__(f"El dataset {filepath} no tiene la columna place_id: no se puede refrescar. "
+                         f"Genéralo de nuevo incluyendo el campo place_id (--fields ...,place_id)")
+
+
+def content_hash(row):
+    """Hash estable del contenido de una fila de salida"""
+    data = json.dumps(row, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()[:16]
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def record_value(row):
+    """Prioridad de refresco: reseñas y después valoración (mayor primero)"""
+    return _number(row.get('total_ratings')), _number(row.get('rating'))
+
+
+class RecordState:
+    """Fecha de obtención y hash por place_id de un dataset"""
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(filepath)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            " place_id TEXT PRIMARY KEY,"
+            " fetched_at REAL NOT NULL,"
+            " content_hash TEXT NOT NULL)")
+        self.conn.commit()
+
+    def load(self):
+        """place_id -> (fetched_at, content_hash)"""
+        return {place_id: (fetched_at, digest) for place_id, fetched_at, digest
+                in self.conn.execute("SELECT place_id, fetched_at, content_hash FROM records")}
+
+    def update(self, rows, fetched_at=None):
+        """Anota las filas (con place_id) como obtenidas ahora o en fetched_at"""
+        fetched_at = fetched_at or time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO records (place_id, fetched_at, content_hash) VALUES (?, ?, ?)",
+            [(row['place_id'], fetched_at, content_hash(row)) for row in rows if row.get('place_id')])
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def select_stale(rows, states, max_age_days, limit=None, now=None):
+    """
+    Índices de las filas a refrescar: con place_id, obtenidas hace más de
+    max_age_days (o sin estado), ordenadas por valor descendente.
+    """
+    now = now or time.time()
+    max_age = max_age_days * 86400
+    stale = []  # (índice, antigüedad)
+    for index, row in enumerate(rows):
+        place_id = row.get('place_id')
+        if not place_id:
+            continue
+        state = states.get(place_id)
+        age = now - state[0] if state else float('inf')
+        if age >= max_age:
+            stale.append((index, age))
+    # Mayor valor primero; a igual valor, el más antiguo
+    stale.sort(key=lambda item: (record_value(rows[item[0]]), item[1]), reverse=True)
+    indices = [index for index, _ in stale]
+    return indices[:limit] if limit else indices
+
+
+def comparable_row(row, as_text=False):
+    """Fila sin valores vacíos y, para CSV, con todos los valores como texto"""
+    return {key: str(value) if as_text else value
+            for key, value in row.items() if value not in (None, '')}
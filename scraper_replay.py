@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# Google My Business Scraper - Grabación y reproducción de peticiones HTTP
+#
+# En modo grabación se guardan todas las respuestas de la API de Places y
+# de los sitios web de una ejecución real en un archivo SQLite compacto
+# (cuerpos comprimidos con zlib). En modo reproducción el motor lee las
+# respuestas del archivo en lugar de ir a la red, con la latencia original,
+# escalada o ninguna. Sirve para perfilar el análisis, el guardado y la
+# planificación con datos reales sin gastar cuota, y para reproducir
+# exactamente una ejecución lenta.
+#
+# La API Key nunca se guarda: el parámetro key se quita de la petición.
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urlencode
+
+# Parámetros que no forman parte de la identidad de una petición
+IGNORED_PARAMS = ('key',)
+
+COMMIT_EVERY = 50  # Respuestas grabadas entre commits
+
+
+def canonical_request(url, params=None):
+    """Identidad de una petición: URL y parámetros ordenados, sin la API Key"""
+    if not params:
+        return url
+    items = sorted((k, str(v)) for k, v in params.items() if k not in IGNORED_PARAMS)
+    return f"{url}?{urlencode(items)}" if items else url
+
+
+@dataclass
+class RecordedResponse:
+    """Respuesta (o error de red) leída del archivo"""
+    status: int
+    content_type: Optional[str]
+    body: bytes
+    latency: float
+    error: Optional[str] = None  # Nombre de la excepción de requests si falló
+
+
+class HttpArchive:
+    """
+    Archivo de respuestas HTTP para grabar o reproducir una ejecución
+    (seguro entre hilos).
+
+    Args:
+        filepath: Archivo SQLite
+        mode: 'record' (se sobrescribe) o 'replay'
+    """
+
+    def __init__(self, filepath, mode):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Modo de archivo HTTP desconocido: {mode}")
+        if mode == 'replay' and not os.path.exists(filepath):
+            raise FileNotFoundError(f"No existe el archivo de grabación: {filepath}")
+        self.filepath = filepath
+        self.mode = mode
+        self.lock = threading.Lock()
+        self.sequence = {}  # petición -> siguiente número de orden
+        self.pending = 0
+        self.missing = 0    # Peticiones de la reproducción que no estaban grabadas
+        os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(filepath, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " request TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " status INTEGER NOT NULL,"
+            " content_type TEXT,"
+            " body BLOB NOT NULL,"
+            " latency REAL NOT NULL,"
+            " error TEXT,"
+            " recorded_at REAL NOT NULL,"
+            " PRIMARY KEY (request, seq))")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        if mode == 'record':
+            self.conn.execute("DELETE FROM responses")
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('recorded_at', ?)",
+                              (time.strftime('%Y-%m-%dT%H:%M:%S'),))
+        self.conn.commit()
+
+    @property
+    def recording(self):
+        return self.mode == 'record'
+
+    def _next_seq(self, request):
+        seq = self.sequence.get(request, 0)
+        self.sequence[request] = seq + 1
+        return seq
+
+    def record(self, url, params, status, content_type, body, latency, error=None):
+        """Guarda una respuesta (o el nombre de la excepción si no hubo respuesta)"""
+        request = canonical_request(url, params)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (request, self._next_seq(request), status, content_type,
+                 zlib.compress(body or b''), latency, error, time.time()))
+            self.pending += 1
+            if self.pending >= COMMIT_EVERY:
+                self.conn.commit()
+                self.pending = 0
+
+    def replay(self, url, params) -> Optional[RecordedResponse]:
+        """
+        Siguiente respuesta grabada para la petición, en el orden original.
+
+        Si la petición se repite más veces que en la grabación se devuelve
+        la última respuesta; None si nunca se grabó.
+        """
+        request = canonical_request(url, params)
+        with self.lock:
+            seq = self._next_seq(request)
+            row = self.conn.execute(
+                "SELECT status, content_type, body, latency, error FROM responses "
+                "WHERE request = ? AND seq <= ? ORDER BY seq DESC LIMIT 1",
+                (request, seq)).fetchone()
+            if row is None:
+                self.missing += 1
+                return None
+        return RecordedResponse(row[0], row[1], zlib.decompress(row[2]), row[3], row[4])
+
+    def stats(self):
+        """Número de respuestas y bytes (comprimidos) del archivo"""
+        with self.lock:
+            count, size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM responses").fetchone()
+        return {'responses': count, 'compressed_bytes': size, 'missing': self.missing}
+
+    def flush(self):
+        with self.lock:
+            self.conn.commit()
+            self.pending = 0
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
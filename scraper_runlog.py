@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# Google My Business Scraper - Logging en segundo plano y log estructurado
+#
+# log() se llama unas diez veces por negocio desde los hilos de trabajo.
+# Para que el disco nunca frene el scraping, los mensajes solo se encolan
+# (QueueHandler) y un hilo en segundo plano (QueueListener) les da formato,
+# quita los emojis y los escribe en scraper.log.
+#
+# Opcionalmente cada ejecución escribe además un log estructurado en JSON
+# Lines junto al dataset (un archivo por ejecución, rotado por tamaño).
+# Cada línea lleva el id de la ejecución, el place_id y la fase en curso y,
+# al terminar una fase o un negocio, su duración:
+#   {"ts": "...", "run_id": "...", "event": "stage", "stage": "details",
+#    "place_id": "...", "duration_ms": 182.4, "message": ""}
+# Se puede consultar con jq, pandas.read_json(lines=True) o DuckDB.
+
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+RUN_LOG_SUFFIX = '.log.jsonl'
+RUN_LOG_MAX_BYTES = 10 * 1024 * 1024  # Tamaño máximo de cada archivo del log estructurado
+RUN_LOG_BACKUP_COUNT = 5
+
+EVENT_LOG = 'log'      # Mensaje del registro de actividad
+EVENT_STAGE = 'stage'  # Fin de una fase (búsqueda, detalles, email...) con su duración
+EVENT_PLACE = 'place'  # Fin del procesamiento de un negocio con su duración
+
+
+def new_run_id():
+    """Identificador corto de una ejecución"""
+    return uuid.uuid4().hex[:12]
+
+
+class AsciiFormatter(logging.Formatter):
+    """Formato de scraper.log sin emojis (se aplica en el hilo de escritura)"""
+
+    def format(self, record):
+        return super().format(record).encode('ascii', 'ignore').decode('ascii')
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Una línea JSON por registro con los campos estructurados de la ejecución"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'message': record.getMessage()
+        }
+        entry.update(getattr(record, 'fields', {}))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def start_background_logging(logger, handler):
+    """
+    Conecta logger con handler a través de una cola: el registro solo encola
+    y la escritura se hace en un hilo aparte. Devuelve el QueueListener.
+    """
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  # Vaciar la cola al salir
+    return listener
+
+
+class RunLog:
+    """
+    Log estructurado de una ejecución en JSON Lines (seguro entre hilos).
+
+    El place_id y la fase en curso se guardan por hilo, de modo que los
+    mensajes de cada worker se anotan con el negocio que está procesando.
+
+    Args:
+        filepath: Archivo .log.jsonl de la ejecución
+        run_id: Identificador de la ejecución
+        max_bytes: Tamaño a partir del cual se rota el archivo
+        backup_count: Archivos rotados que se conservan
+    """
+
+    def __init__(self, filepath, run_id, max_bytes=RUN_LOG_MAX_BYTES, backup_count=RUN_LOG_BACKUP_COUNT):
+        self.filepath = filepath
+        self.run_id = run_id
+        self.local = threading.local()
+        self.file_handler = RotatingFileHandler(filepath, maxBytes=max_bytes, backupCount=backup_count,
+                                                encoding='utf-8', delay=True)
+        self.file_handler.setFormatter(JsonLinesFormatter())
+        self.queue = queue.SimpleQueue()
+        self.handler = QueueHandler(self.queue)
+        self.listener = QueueListener(self.queue, self.file_handler)
+        self.listener.start()
+        self.closed = False
+
+    def _context(self):
+        context = getattr(self.local, 'context', None)
+        if context is None:
+            context = self.local.context = {'place_id': None, 'stages': []}
+        return context
+
+    def write(self, event, message='', level=logging.INFO, **fields):
+        """Encola un registro con el contexto del hilo actual"""
+        if self.closed:
+            return
+        context = self._context()
+        record = logging.LogRecord('GMBScraper.run', level, __file__, 0, message, None, None)
+        record.fields = {
+            'run_id': self.run_id,
+            'event': event,
+            'place_id': context['place_id'],
+            'stage': context['stages'][-1] if context['stages'] else None,
+            **fields
+        }
+        self.handler.handle(record)
+
+    def message(self, message):
+        """Mensaje del registro de actividad"""
+        self.write(EVENT_LOG, message.strip())
+
+    @contextmanager
+    def place(self, place_id):
+        """Anota los registros del bloque con place_id y registra su duración"""
+        context = self._context()
+        previous = context['place_id']
+        context['place_id'] = place_id
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.write(EVENT_PLACE, duration_ms=round((time.perf_counter() - start) * 1000, 1))
+            context['place_id'] = previous
+
+    @contextmanager
+    def stage(self, name):
+        """Anota los registros del bloque con la fase y registra su duración"""
+        stages = self._context()['stages']
+        if name in stages:
+            yield  # Ya se está midiendo (p. ej. search_area -> search_businesses)
+            return
+        stages.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.write(EVENT_STAGE, duration_ms=round((time.perf_counter() - start) * 1000, 1))
+            stages.pop()
+
+    def close(self):
+        """Vacía la cola y cierra el archivo"""
+        if self.closed:
+            return
+        self.closed = True
+        self.listener.stop()
+        self.file_handler.close()
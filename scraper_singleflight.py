@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# Google My Business Scraper - Peticiones en curso compartidas (single-flight)
+#
+# Con varios workers, dos tareas pueden pedir a la vez lo mismo: los
+# detalles de un place_id (dos keywords que encuentran el mismo negocio, o
+# una tarea de la cola cuyo lease caduca mientras sigue en curso) o el
+# email de una web compartida por las sucursales de una cadena. Aquí la
+# primera llamada con una clave hace el trabajo y las que llegan mientras
+# está en curso esperan su resultado (o su excepción) en lugar de repetir
+# la petición. Al terminar la clave se olvida: no es una cache.
+
+import threading
+
+
+class _Call:
+    """Llamada en curso: su resultado o excepción cuando termina"""
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Agrupa las llamadas concurrentes con la misma clave (seguro entre hilos)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}  # clave -> _Call en curso
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Ejecuta func(*args, **kwargs) o, si ya hay una llamada en curso con
+        la misma clave, espera a que termine. Devuelve (resultado, compartido);
+        compartido indica que el resultado es el de otra llamada.
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self):
+        """Número de llamadas en curso"""
+        with self.lock:
+            return len(self.calls)
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# Google My Business Scraper - Almacenamiento de datasets (opcionalmente comprimidos)
+#
+# Los datasets pueden guardarse comprimidos con gzip (.json.gz, .csv.gz) o
+# xz (.json.xz, .csv.xz), solo con la librería estándar. Todas las lecturas
+# pasan por open_dataset(), que detecta la compresión por la extensión y
+# descomprime sobre la marcha, así que el resto del código no distingue un
+# archivo comprimido de uno normal.
+#
+# Los JSON se leen y escriben elemento a elemento (iter_json_array y
+# write_json_array) para que la memoria no crezca con el tamaño del
+# dataset: añadir negocios a un archivo existente ya no obliga a cargarlo
+# entero.
+
+import csv
+import gzip
+import itertools
+import json
+import lzma
+import os
+
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'xz': '.xz'}
+COMPRESSIONS = tuple(COMPRESSION_SUFFIXES)
+GZIP_LEVEL = 6  # Como la herramienta gzip: casi la misma compresión que 9, mucho más rápido
+XZ_PRESET = 6
+
+DATASET_EXTENSIONS = ('.json', '.csv')
+TEMP_SUFFIX = '.tmp'  # Escrituras atómicas a medio hacer (ver temp_path)
+READ_CHUNK_SIZE = 64 * 1024
+
+# Errores al leer un dataset dañado o truncado (también comprimido)
+DATASET_READ_ERRORS = (ValueError, OSError, EOFError, lzma.LZMAError)
+
+
+def compression_of(path):
+    """Compresión según la extensión ('gzip', 'xz') o None"""
+    for name, suffix in COMPRESSION_SUFFIXES.items():
+        if path.endswith(suffix):
+            return name
+    return None
+
+
+def strip_compression(path):
+    """Ruta sin la extensión de compresión: datos.json.gz -> datos.json"""
+    compression = compression_of(path)
+    return path[:-len(COMPRESSION_SUFFIXES[compression])] if compression else path
+
+
+def dataset_format(path):
+    """'csv' o 'json' según la extensión, ignorando la compresión"""
+    return 'csv' if strip_compression(path).lower().endswith('.csv') else 'json'
+
+
+def is_temp_file(name):
+    """Temporal de una escritura atómica (datos.json.tmp.gz), también si se renombró como datos.tmp.json"""
+    plain = strip_compression(name).lower()
+    return plain.endswith(TEMP_SUFFIX) or os.path.splitext(plain)[0].endswith(TEMP_SUFFIX)
+
+
+def is_dataset_file(name):
+    """Archivo de datos (no métricas, logs ni temporales), comprimido o no"""
+    plain = strip_compression(name).lower()
+    return (plain.endswith(DATASET_EXTENSIONS) and not plain.endswith('.metrics.json')
+            and not is_temp_file(name))
+
+
+def resolve_dataset_path(base_path, compression=None):
+    """
+    Ruta real del dataset base_path (data/x/x.json). Un dataset existente
+    conserva su formato, comprimido o no; uno nuevo usa la compresión pedida.
+    """
+    for candidate in [base_path] + [base_path + suffix for suffix in COMPRESSION_SUFFIXES.values()]:
+        if os.path.exists(candidate):
+            return candidate
+    return base_path + COMPRESSION_SUFFIXES[compression] if compression else base_path
+
+
+def temp_path(path):
+    """Archivo temporal junto a path con la misma compresión"""
+    compression = compression_of(path)
+    suffix = COMPRESSION_SUFFIXES[compression] if compression else ''
+    return f"{strip_compression(path)}{TEMP_SUFFIX}{suffix}"
+
+
+def open_dataset(path, mode='r', encoding='utf-8', newline=None):
+    """open() en modo texto que comprime o descomprime según la extensión"""
+    compression = compression_of(path)
+    if compression is None:
+        return open(path, mode, encoding=encoding, newline=newline)
+    if 'a' in mode and encoding == 'utf-8-sig' and os.path.exists(path):
+        encoding = 'utf-8'  # El BOM solo va al principio, no en cada bloque añadido
+    if compression == 'gzip':
+        return gzip.open(path, mode + 't', compresslevel=GZIP_LEVEL, encoding=encoding, newline=newline)
+    preset = XZ_PRESET if 'r' not in mode else None
+    return lzma.open(path, mode + 't', preset=preset, encoding=encoding, newline=newline)
+
+
+def iter_json_array(f, chunk_size=READ_CHUNK_SIZE):
+    """
+    Recorre los elementos de un array JSON leyendo el archivo por bloques.
+    Un archivo vacío no tiene elementos; lanza json.JSONDecodeError si no es
+    un array válido.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = '', 0, False
+
+    def more():
+        nonlocal buffer, pos, eof
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer, pos = buffer[pos:] + chunk, 0
+
+    def skip(chars):
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            more()
+
+    skip(' \t\r\n\ufeff')
+    if pos >= len(buffer):
+        return  # Archivo vacío
+    if buffer[pos] != '[':
+        raise json.JSONDecodeError("Se esperaba un array JSON", buffer, pos)
+    pos += 1
+    while True:
+        skip(' \t\r\n,')
+        if pos >= len(buffer):
+            raise json.JSONDecodeError("Array JSON sin cerrar", buffer, pos)
+        if buffer[pos] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            more()
+            continue
+        if end >= len(buffer) and not eof:
+            more()  # Podría seguir en el siguiente bloque (p. ej. un número)
+            continue
+        pos = end
+        yield item
+
+
+def iter_dataset_rows(path):
+    """Recorre las filas (dicts) de un dataset JSON o CSV, comprimido o no"""
+    if dataset_format(path) == 'csv':
+        with open_dataset(path, 'r', encoding='utf-8-sig', newline='') as f:
+            yield from csv.DictReader(f)
+    else:
+        with open_dataset(path, 'r', encoding='utf-8') as f:
+            yield from iter_json_array(f)
+
+
+def write_json_array(f, items):
+    """Escribe items como json.dump(list(items), f, indent=2) sin reunirlos en memoria"""
+    first = True
+    for item in items:
+        f.write('[\n  ' if first else ',\n  ')
+        f.write(json.dumps(item, ensure_ascii=False, indent=2).replace('\n', '\n  '))
+        first = False
+    f.write('[]' if first else '\n]')
+
+
+def write_json_dataset(path, rows, merge_existing=False):
+    """
+    Escribe el dataset JSON de forma atómica: primero los registros ya
+    guardados (si merge_existing, leídos en streaming) y después rows (una
+    lista). Si el archivo existente no se puede leer se sustituye solo por
+    rows.
+    """
+    tmp_path = temp_path(path)
+
+    def write(existing):
+        with open_dataset(tmp_path, 'w') as f:
+            write_json_array(f, itertools.chain(existing, rows))
+
+    if merge_existing and os.path.exists(path):
+        try:
+            with open_dataset(path, 'r') as old:
+                write(iter_json_array(old))
+        except DATASET_READ_ERRORS:
+            write(())
+    else:
+        write(())
+    os.replace(tmp_path, path)
+
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# Google My Business Scraper - Webs canónicas y emails compartidos por dominio
+#
+# Las sucursales de una cadena suelen tener en Google la misma web escrita
+# de muchas formas: con ?utm_source=gmb, con /locations/madrid-12, con o sin
+# https. Cada una lanzaba un recorrido completo buscando el email (páginas
+# de contacto y principal), así que una cadena de 300 sucursales costaba 300
+# recorridos del mismo sitio. Aquí se canonicaliza la URL (sin parámetros de
+# seguimiento, host en minúsculas), se recuerdan las redirecciones ya vistas
+# y el email se puede compartir por sitio según la política elegida:
+#
+#   url:      cada URL canónica se recorre una vez, sin compartir entre
+#             rutas distintas (por defecto)
+#   domain:   un recorrido por host (sin www), desde su raíz, para todas
+#             las sucursales
+#   location: primero la página propia de la sucursal (una sola petición)
+#             y, si no tiene email, el del host
+#
+# Se agrupa por el host completo y no por dominio registrable: sin la
+# lista de sufijos públicos no se puede saber si madrid.cadena.com y
+# otra.cadena.com son del mismo negocio. Las IPs, los dominios que
+# comparten muchos negocios (facebook.com, sites.google.com..., ver
+# website_domain en scraper_dedup) y las plataformas de alojamiento
+# (wordpress.com, myshopify.com, webnode.*...) no se agrupan nunca: un
+# email suyo acabaría en negocios que no tienen nada que ver.
+
+import threading
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+from scraper_dedup import website_domain
+from scraper_hosts import host_of, website_key
+
+EMAIL_SCOPE_DOMAIN = 'domain'      # Un recorrido por host
+EMAIL_SCOPE_LOCATION = 'location'  # Página de la sucursal y, si no hay email, el host
+EMAIL_SCOPE_URL = 'url'            # Cada URL por separado
+EMAIL_SCOPES = (EMAIL_SCOPE_DOMAIN, EMAIL_SCOPE_LOCATION, EMAIL_SCOPE_URL)
+DEFAULT_EMAIL_SCOPE = EMAIL_SCOPE_URL
+
+# Parámetros que solo sirven para medir campañas: no cambian la página
+TRACKING_PARAM_PREFIXES = ('utm_',)
+TRACKING_PARAMS = frozenset({
+    'gclid', 'gclsrc', 'dclid', 'gbraid', 'wbraid', 'fbclid', 'msclkid', 'yclid',
+    'igshid', 'mc_cid', 'mc_eid', '_ga', '_gl', 'srsltid', 'ref_src'
+})
+
+# Acortadores: la web real está detrás de una redirección
+SHORTENER_HOSTS = frozenset({
+    'bit.ly', 'goo.gl', 'tinyurl.com', 't.co', 'ow.ly', 'buff.ly', 'rebrand.ly', 'cutt.ly', 'is.gd'
+})
+
+# Plataformas que alojan webs de muchos negocios en subdominios o rutas
+# (sección privada de la lista de sufijos públicos y constructores habituales)
+HOSTING_PLATFORMS = frozenset({
+    'wordpress.com', 'wpcomstaging.com', 'myshopify.com', 'squarespace.com', 'weebly.com',
+    'weeblysite.com', 'jimdosite.com', 'jimdofree.com', 'jimdo.com', 'godaddysites.com',
+    'wixsite.com', 'wixstudio.io', 'editorx.io', 'blogspot.com', 'business.site', 'negocio.site',
+    'ueniweb.com', 'site123.me', 'strikingly.com', 'mystrikingly.com', 'webflow.io',
+    'carrd.co', 'github.io', 'gitlab.io', 'netlify.app', 'vercel.app', 'pages.dev',
+    'herokuapp.com', 'firebaseapp.com', 'web.app', 'azurewebsites.net', 'glitch.me',
+    'tumblr.com', 'over-blog.com', 'hubspotpagebuilder.com', 'hs-sites.com', 'mailchimpsites.com',
+    'ecwid.com', 'company.site', 'square.site', 'tiendanube.com', 'mitiendanube.com',
+    'webcindario.com', 'emprendedorweb.com', 'yolasite.com', 'simplesite.com', 'webself.net',
+    'e-monsite.com', 'bigcartel.com', 'ghost.io', 'substack.com', 'medium.com', 'notion.site'
+})
+# Plataformas con un dominio por país (webnode.es, webnode.com.co...)
+HOSTING_PLATFORM_LABELS = frozenset({'webnode', 'jimdo', 'wix', 'tiendanube'})
+
+
+def is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PARAM_PREFIXES)
+
+
+def canonical_url(url):
+    """URL de la web sin parámetros de seguimiento y normalizada con website_key"""
+    url = str(url or '').strip()
+    parsed = urlparse(url if '//' in url else f'http://{url}')
+    query = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True) if not is_tracking_param(k)]
+    return website_key(parsed._replace(query=urlencode(query), fragment='').geturl())
+
+
+def origin_of(url):
+    """Esquema y host (con puerto) de una URL canónica"""
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{host_of(url)}"
+
+
+def is_hosting_platform(host):
+    """El host es (o cuelga de) una plataforma que aloja webs de muchos negocios"""
+    labels = host.split('.')
+    if any(label in HOSTING_PLATFORM_LABELS for label in labels[:-1]):
+        return True
+    return any('.'.join(labels[i:]) in HOSTING_PLATFORMS for i in range(len(labels)))
+
+
+def site_domain(url):
+    """
+    Host sin www cuyas páginas pueden compartir email; None para IPs, hosts
+    sin punto, dominios compartidos y plataformas de alojamiento
+    """
+    host = website_domain(url)
+    if not host or '.' not in host or is_hosting_platform(host):
+        return None
+    return host
+
+
+class WebsiteResolver:
+    """
+    Redirecciones de las webs ya vistas en la ejecución (seguro entre hilos).
+    Se guardan por origen (http -> https, dominio.es -> dominio.com) y por
+    página, y se aplican a las URLs siguientes sin volver a pedirlas.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.origins = {}  # origen -> origen al que redirige
+        self.pages = {}    # URL canónica -> URL canónica final
+
+    def resolve(self, url):
+        """URL canónica con las redirecciones conocidas aplicadas"""
+        url = canonical_url(url)
+        with self.lock:
+            url = self.pages.get(url, url)
+            origin = origin_of(url)
+            target = self.origins.get(origin)
+        return target + url[len(origin):] if target else url
+
+    def needs_lookup(self, url):
+        """Acortador cuyo destino todavía no se conoce"""
+        with self.lock:
+            return host_of(url) in SHORTENER_HOSTS and url not in self.pages
+
+    def record(self, url, final_url):
+        """Anota la redirección de una petición a url que terminó en final_url"""
+        if not final_url:
+            return
+        url, final_url = canonical_url(url), canonical_url(final_url)
+        source, target = origin_of(url), origin_of(final_url)
+        shortener = host_of(url) in SHORTENER_HOSTS
+        with self.lock:
+            if final_url != url or shortener:
+                self.pages[url] = final_url
+            # Solo las redirecciones que conservan la ruta son de todo el sitio
+            # (http -> https, sin www -> www); un acortador o /contacto que
+            # lleva a un formulario de otro host no lo son
+            same_path = url[len(source):] == final_url[len(target):]
+            if target != source and same_path and not shortener:
+                self.origins[source] = target